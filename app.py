@@ -3,14 +3,31 @@ Flask Application with Multi-LLM Provider Integration
 Test API for Studio Lite LLM functionality
 """
 
-from flask import Flask, request, jsonify
+from contextlib import ExitStack
+from flask import Flask, Response, g, request, jsonify, send_file
 from typing import Dict, Any
+import json
+import os
 import traceback
 import logging
+import time
 
 from llm_providers.factory import LLMProviderFactory
-from llm_providers.base import ChatMessage
-from config.llm_config import LLMConfigManager
+from llm_providers.base import ChatMessage, ChatResponse
+from llm_providers.errors import ProviderError, RequestCancelledError
+from llm_providers.messages import MessageFormatError, parse_messages
+from llm_providers.ollama_context import CONTEXT_STORE
+from llm_providers.retry import RETRY_STATS, Deadline
+from config.llm_config import LLMConfigManager, thaw_config
+from backend.admission import AdmissionController, AdmissionError
+from backend.blobs import BlobError, BlobStore, UploadOffsetError
+from backend.cancellation import CancellationRegistry, DuplicateRequestError, InFlightRequest
+from backend.embeddings import EmbeddingBatcher
+from backend.profiling import PROFILE_HEADER, MemoryTracker, RequestProfiler
+from backend.router import AUTO_PROVIDER, ModelRouter, estimate_tokens
+from backend.sessions import SessionStore
+from backend.usage import UsageLedger, extract_first_token_s, extract_usage
+from backend.warmup import WARMUP_PROVIDER, WarmupManager
 
 # Import version information
 try:
@@ -25,6 +42,375 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 config_manager = LLMConfigManager()
+# Drop cached provider instances as soon as their configuration changes
+config_manager.add_listener(LLMProviderFactory.invalidate)
+config_manager.start_watching()
+session_store = SessionStore()
+model_router = ModelRouter()
+usage_ledger = UsageLedger()
+usage_ledger.start_rollups()
+admission = AdmissionController()
+# Load the configured local models now rather than inside the first user request
+warmup_manager = WarmupManager(config_manager)
+warmup_manager.start()
+
+
+def provider_instance(provider_name: str):
+    """Cached provider instance for the current configuration snapshot"""
+    config_snapshot = config_manager.snapshot()
+    provider_config = config_snapshot.get(provider_name)
+    if not provider_config:
+        raise ValueError(f'Provider config not found: {provider_name}')
+    return LLMProviderFactory.get_provider(
+        provider_name, provider_config, config_snapshot.provider_version(provider_name)
+    )
+
+
+embedding_batcher = EmbeddingBatcher(provider_instance)
+blob_store = BlobStore()
+request_profiler = RequestProfiler()
+memory_tracker = MemoryTracker()
+cancellations = CancellationRegistry()
+
+
+@app.before_request
+def start_request_profile():
+    """Sample this request's stacks if it asked for it or matches an armed rule"""
+    if request_profiler.wants(request.method, request.path, request.headers.get(PROFILE_HEADER)):
+        g.profile = request_profiler.start(request.method, request.path)
+
+
+@app.after_request
+def finish_request_profile(response):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        response.headers['X-Profile-Id'] = profile.id
+        # Streamed bodies are produced after this hook, so stop once the response is closed
+        response.call_on_close(lambda: request_profiler.stop(profile))
+    return response
+
+
+@app.teardown_request
+def abandon_request_profile(error=None):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        request_profiler.stop(profile)
+
+
+CHAT_DEADLINE_SECONDS = float(os.getenv('CHAT_DEADLINE_SECONDS', '120'))
+
+
+def request_timeout(data: Dict[str, Any]):
+    """
+    Seconds the client allows the request, from ``timeout`` or ``X-Request-Timeout``; None if unset
+
+    Raises:
+        ValueError: If the value is not a positive number
+    """
+    timeout = data.get('timeout', request.headers.get('X-Request-Timeout'))
+    if timeout is None:
+        return None
+    try:
+        seconds = float(timeout)
+    except (TypeError, ValueError):
+        seconds = None
+    if seconds is None or not seconds > 0 or seconds == float('inf'):
+        raise ValueError(f'timeout must be a positive number of seconds, not {timeout!r}')
+    return seconds
+
+
+def request_deadline(data: Dict[str, Any]) -> Deadline:
+    """Deadline for the whole request, queueing and provider retries included"""
+    timeout = request_timeout(data)
+    return Deadline(timeout if timeout is not None else CHAT_DEADLINE_SECONDS)
+
+
+def begin_chat_request(data: Dict[str, Any], stream: bool = False) -> InFlightRequest:
+    """
+    Register a chat request so the cancel API or a client disconnect aborts its provider call
+
+    The ID is the client's ``request_id`` (or ``X-Request-Id`` header) if given, so a
+    blocking request can be cancelled before its response arrives.
+    """
+    # Werkzeug and Gunicorn expose the client connection; other servers only notice at the next write
+    client_socket = request.environ.get('werkzeug.socket') or request.environ.get('gunicorn.socket')
+    return cancellations.begin(
+        data.get('request_id') or request.headers.get('X-Request-Id'),
+        stream=stream,
+        max_tokens=data.get('max_tokens'),
+        agent=data.get('agent'),
+        client_socket=client_socket
+    )
+
+
+def admission_slot(data: Dict[str, Any]):
+    """Concurrency slot for a chat request, honouring its priority class and queue deadline"""
+    priority = data.get('priority') or request.headers.get('X-Priority')
+    return admission.slot(priority, request_timeout(data))
+
+
+def provider_error_response(error: ProviderError):
+    """Classified provider failure, with Retry-After when the provider sent one"""
+    response = jsonify(error.to_dict())
+    response.status_code = error.http_status
+    if error.retry_after is not None:
+        response.headers['Retry-After'] = str(max(1, round(error.retry_after)))
+    return response
+
+
+def admission_error_response(error: AdmissionError):
+    """429/504 response with a Retry-After hint"""
+    response = jsonify({'error': str(error), 'retry_after': error.retry_after})
+    response.status_code = error.status_code
+    if error.retry_after is not None:
+        response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def resolve_chat_target(provider_name: str, model, messages, max_tokens, routing: Dict[str, Any] = None):
+    """
+    Provider instance and model for a chat call, routing ``auto`` requests
+
+    Returns:
+        Tuple of provider name, requested model, provider instance, config snapshot and routing decision
+
+    Raises:
+        ValueError: If the provider has no configuration or no model can be routed to
+    """
+    # Get provider configuration from a single consistent snapshot
+    config_snapshot = config_manager.snapshot()
+    decision = None
+    if provider_name == AUTO_PROVIDER:
+        routing = routing or {}
+        # Ollama's default base_url always validates, so it is only a candidate once it has answered
+        usable = {
+            name: config_snapshot.get(name)
+            for name in LLMProviderFactory.get_available_providers()
+            if config_manager.validate_provider_config(name)
+            and (name != WARMUP_PROVIDER or warmup_manager.reachable())
+        }
+        decision = model_router.route(
+            usable,
+            messages,
+            max_tokens=max_tokens,
+            objective=routing.get('objective', 'balanced'),
+            max_latency_s=routing.get('max_latency_s'),
+            max_cost_usd=routing.get('max_cost_usd')
+        )
+        provider_name, model = decision.provider, decision.model
+        print(f"[DEBUG] Auto-routed to {provider_name}/{model}: {decision.reason}")
+    
+    provider_config = config_snapshot.get(provider_name)
+    
+    if not provider_config:
+        print(f"[DEBUG] Provider config not found for: {provider_name}")
+        raise ValueError(f'Provider config not found: {provider_name}')
+    
+    # Reuse the provider instance unless its configuration changed
+    provider = LLMProviderFactory.get_provider(
+        provider_name, provider_config, config_snapshot.provider_version(provider_name)
+    )
+    return provider_name, model, provider, provider_config, decision
+
+
+def record_chat_call(provider_name: str, model: str, agent: str, latency: float, response=None,
+                     first_token_s: float = None, error: Exception = None):
+    """Feed a finished (``response``) or failed call into the router, usage ledger and warm-up stats"""
+    if response is None:
+        model_router.record(provider_name, model, latency, error=True)
+        usage_ledger.record(provider_name, model, agent, latency=latency, error=True)
+        if provider_name == WARMUP_PROVIDER and error is not None:
+            warmup_manager.observe_failure(error)
+        return
+    token_usage = extract_usage(response.metadata)
+    # Providers that report no usage still teach the router their speed from the reply length
+    output_tokens = token_usage['output_tokens'] or estimate_tokens([ChatMessage(role='assistant', content=response.content)])
+    model_router.record(provider_name, model, latency, output_tokens=output_tokens, first_token_s=first_token_s)
+    if first_token_s is None:
+        first_token_s = extract_first_token_s(response.metadata)
+    usage_ledger.record(provider_name, model, agent, latency=latency, ttft=first_token_s, **token_usage)
+    if provider_name == WARMUP_PROVIDER:
+        warmup_manager.observe_response(model, response.metadata)
+
+
+def run_chat(provider_name: str, model, messages, temperature: float, max_tokens,
+             routing: Dict[str, Any] = None, agent: str = None, session_id: str = None,
+             deadline: Deadline = None, inflight: InFlightRequest = None):
+    """
+    Run a chat completion against a configured provider
+
+    With ``provider_name == "auto"`` the model router picks the provider and
+    model; the decision is recorded in ``response.metadata['routing']``.
+    Tokens and latency of every call are recorded in the usage ledger under ``agent``.
+    ``session_id`` lets providers that keep server-side context (Ollama) send only the new turn.
+    ``deadline`` bounds the provider call, retries included, and caps its HTTP timeouts.
+    Cancelling ``inflight`` aborts the provider call.
+
+    Returns:
+        Tuple of the ChatResponse and the provider config snapshot used
+
+    Raises:
+        ValueError: If the provider has no configuration or no model can be routed to
+        ProviderError: If the provider call failed and could not be retried
+        RequestCancelledError: If ``inflight`` was cancelled
+    """
+    provider_name, model, provider, provider_config, decision = resolve_chat_target(
+        provider_name, model, messages, max_tokens, routing
+    )
+    target_model = model or provider_config.get('default_model')
+    cancel = None
+    if inflight is not None:
+        inflight.target(provider_name, target_model)
+        cancel = inflight.token
+        # Cancelled while queued for admission: don't start generating at all
+        cancel.check(provider_name)
+    started = time.perf_counter()
+    try:
+        response = provider.chat_completion(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            session_id=session_id,
+            deadline=deadline,
+            cancel=cancel
+        )
+    except RequestCancelledError:
+        raise  # the caller gave up; not a provider failure
+    except Exception as e:
+        record_chat_call(provider_name, target_model, agent, time.perf_counter() - started, error=e)
+        raise
+    record_chat_call(provider_name, target_model, agent, time.perf_counter() - started, response)
+    if inflight is not None:
+        inflight.complete(extract_usage(response.metadata)['output_tokens']
+                          or estimate_tokens([ChatMessage(role='assistant', content=response.content)]))
+    print(f"[DEBUG] Provider response: {response.provider}/{response.model}, {len(response.content)} chars")
+    
+    if decision is not None:
+        if response.metadata is None:
+            response.metadata = {}
+        response.metadata['routing'] = decision.to_dict()
+    return response, provider_config
+
+
+def stream_chat(provider_name: str, model, messages, temperature: float, max_tokens,
+                routing: Dict[str, Any] = None, agent: str = None, session_id: str = None,
+                deadline: Deadline = None, inflight: InFlightRequest = None):
+    """
+    Streaming variant of ``run_chat``: a generator of wire events
+
+    Yields ``{'type': 'delta', 'content': ...}`` per text delta, then one
+    ``{'type': 'done', ...}`` event with the full response, request info and
+    stream statistics (time to first token, tokens/sec), or an ``error`` event.
+    The provider is resolved before the first event, so configuration errors
+    raise here rather than inside the stream. Closing the generator (the client
+    went away) or cancelling ``inflight`` aborts the provider stream.
+    """
+    provider_name, model, provider, provider_config, decision = resolve_chat_target(
+        provider_name, model, messages, max_tokens, routing
+    )
+    target_model = model or provider_config.get('default_model')
+    cancel = inflight.token if inflight is not None else None
+
+    def events():
+        if inflight is not None:
+            inflight.target(provider_name, target_model)
+        started = time.perf_counter()
+        first_token_s = None
+        deltas = 0
+        stream = None
+        try:
+            if cancel is not None:
+                cancel.check(provider_name)
+            stream = provider.stream_completion(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                session_id=session_id,
+                deadline=deadline,
+                cancel=cancel
+            )
+            for item in stream:
+                if isinstance(item, ChatResponse):
+                    response = item
+                    break
+                if first_token_s is None:
+                    first_token_s = time.perf_counter() - started
+                deltas += 1
+                if inflight is not None:
+                    inflight.output_tokens = deltas
+                yield {'type': 'delta', 'content': item}
+            else:
+                raise RuntimeError(f'{provider_name} stream ended without a response')
+        except GeneratorExit:
+            if cancel is not None:
+                cancel.cancel('client_disconnect')
+            raise
+        except RequestCancelledError as e:
+            print(f"[DEBUG] Stream cancelled: {e}")
+            yield {'type': 'error', **e.to_dict()}
+            return
+        except Exception as e:
+            record_chat_call(provider_name, target_model, agent, time.perf_counter() - started, error=e)
+            print(f"[DEBUG] Stream failed: {e}")
+            yield {'type': 'error', **(e.to_dict() if isinstance(e, ProviderError) else {'error': str(e)})}
+            return
+        finally:
+            # Closes the upstream connection if the stream was abandoned
+            if stream is not None:
+                stream.close()
+        latency = time.perf_counter() - started
+        record_chat_call(provider_name, target_model, agent, latency, response, first_token_s)
+        if decision is not None:
+            if response.metadata is None:
+                response.metadata = {}
+            response.metadata['routing'] = decision.to_dict()
+        # One delta per token is the common case when the provider reports no usage
+        output_tokens = extract_usage(response.metadata)['output_tokens'] or deltas
+        if inflight is not None:
+            inflight.complete(output_tokens)
+        generation_s = latency - (first_token_s or 0.0)
+        yield {
+            'type': 'done',
+            'response': response.to_dict(),
+            'request_info': {
+                'provider': provider_name,
+                'model': target_model,
+                'temperature': temperature,
+                'max_tokens': max_tokens,
+                'message_count': len(messages)
+            },
+            'stream': {
+                'first_token_s': round(first_token_s, 3) if first_token_s is not None else None,
+                'latency_s': round(latency, 3),
+                'output_tokens': output_tokens,
+                'tokens_per_s': round(output_tokens / generation_s, 1) if generation_s > 0 else None
+            }
+        }
+
+    return events()
+
+
+def ndjson_response(events, on_close=None):
+    """Stream events as newline-delimited JSON, one flushed line per event"""
+    def lines():
+        try:
+            for event in events:
+                yield json.dumps(event) + '\n'
+        finally:
+            # The server closes this when the client disconnects; pass that on to the events
+            events.close()
+
+    response = Response(
+        lines(),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    if on_close is not None:
+        # Runs even if the client goes away before the first event is sent
+        response.call_on_close(on_close)
+    return response
 
 
 @app.route('/')
@@ -64,7 +450,6 @@ def chat():
     """Chat completion endpoint"""
     try:
         data = request.get_json()
-        print("[DEBUG] Incoming /chat request data:", data)
         if not data:
             print("[DEBUG] No data received in request body.")
             return jsonify({'error': 'Missing request data'}), 400
@@ -75,60 +460,76 @@ def chat():
         messages_data = data.get('messages', [])
         temperature = data.get('temperature', 0.7)
         max_tokens = data.get('max_tokens')
-        print(f"[DEBUG] provider: {provider_name}, model: {model}, messages: {messages_data}, temperature: {temperature}, max_tokens: {max_tokens}")
+        # Log sizes only: formatting the messages would copy every prompt again
+        print(f"[DEBUG] provider: {provider_name}, model: {model}, messages: {len(messages_data)}, temperature: {temperature}, max_tokens: {max_tokens}")
         
         if not messages_data:
             print("[DEBUG] Missing messages field or empty list.")
             return jsonify({'error': 'Missing messages'}), 400
         
         # Convert message data to ChatMessage objects
-        messages = []
-        for msg_data in messages_data:
-            if not isinstance(msg_data, dict) or 'role' not in msg_data or 'content' not in msg_data:
-                print(f"[DEBUG] Invalid message format: {msg_data}")
-                return jsonify({'error': 'Invalid message format'}), 400
-            messages.append(ChatMessage(
-                role=msg_data['role'],
-                content=msg_data['content']
-            ))
-        
-        # Get provider configuration
-        provider_config = config_manager.get_config(provider_name)
-        print(f"[DEBUG] provider_config: {provider_config}")
-        
-        if not provider_config:
-            print(f"[DEBUG] Provider config not found for: {provider_name}")
-            return jsonify({'error': f'Provider config not found: {provider_name}'}), 400
+        try:
+            messages = parse_messages(messages_data, blob_store.text)
+        except MessageFormatError as e:
+            print("[DEBUG] Invalid message format")
+            return jsonify({'error': str(e)}), 400
         
-        # Create provider instance
-        provider = LLMProviderFactory.create_provider(provider_name, provider_config)
-        print(f"[DEBUG] Created provider instance: {provider}")
+        # Queueing counts against the deadline the provider call gets
+        deadline = request_deadline(data)
+        if data.get('stream'):
+            # The slot and the registration are held until the stream finishes or the client disconnects
+            slot = ExitStack()
+            inflight = begin_chat_request(data, stream=True)
+            slot.callback(cancellations.finish, inflight)
+            try:
+                slot.enter_context(admission_slot(data))
+                events = stream_chat(
+                    provider_name, model, messages, temperature, max_tokens,
+                    routing=data.get('routing'), agent=data.get('agent'), deadline=deadline,
+                    inflight=inflight
+                )
+            except Exception:
+                slot.close()
+                raise
+            response = ndjson_response(events, on_close=slot.close)
+            response.headers['X-Request-Id'] = inflight.request_id
+            return response
         
-        # Generate response
-        response = provider.chat_completion(
-            messages=messages,
-            model=model,
-            temperature=temperature,
-            max_tokens=max_tokens
-        )
-        print(f"[DEBUG] Provider response: {response}")
+        inflight = begin_chat_request(data)
+        try:
+            with admission_slot(data):
+                response, provider_config = run_chat(
+                    provider_name, model, messages, temperature, max_tokens,
+                    routing=data.get('routing'), agent=data.get('agent'), deadline=deadline,
+                    inflight=inflight
+                )
+        finally:
+            cancellations.finish(inflight)
+        routing_info = (response.metadata or {}).get('routing')
         
-        return jsonify({
-            'response': {
-                'content': response.content,
-                'model': response.model,
-                'provider': response.provider,
-                'metadata': response.metadata
-            },
+        result = jsonify({
+            'response': response.to_dict(),
             'request_info': {
-                'provider': provider_name,
-                'model': model or provider_config.get('default_model'),
+                'request_id': inflight.request_id,
+                'provider': routing_info['provider'] if routing_info else provider_name,
+                'model': routing_info['model'] if routing_info else model or provider_config.get('default_model'),
                 'temperature': temperature,
                 'max_tokens': max_tokens,
                 'message_count': len(messages)
             }
         })
+        result.headers['X-Request-Id'] = inflight.request_id
+        return result
     
+    except DuplicateRequestError as e:
+        print(f"[DEBUG] {e}")
+        return jsonify({'error': str(e)}), 409
+    except AdmissionError as e:
+        print(f"[DEBUG] Not admitted: {e}")
+        return admission_error_response(e)
+    except ProviderError as e:
+        print(f"[DEBUG] Provider error ({e.kind}): {e}")
+        return provider_error_response(e)
     except ValueError as e:
         print(f"[DEBUG] ValueError: {e}")
         return jsonify({'error': str(e)}), 400
@@ -143,18 +544,419 @@ def chat():
         }), 500
 
 
+@app.route('/chat/<request_id>/cancel', methods=['POST'])
+def cancel_chat(request_id):
+    """Cancel an in-flight chat request and abort its provider call"""
+    cancelled = cancellations.cancel(request_id)
+    if cancelled is None:
+        return jsonify({'error': f'No chat request in flight with ID: {request_id}'}), 404
+    print(f"[DEBUG] Cancelled request {request_id} ({cancelled['provider']}/{cancelled['model']})")
+    return jsonify({'status': 'cancelled', 'request': cancelled})
+
+
+@app.route('/metrics/cancellations', methods=['GET'])
+def cancellation_stats():
+    """In-flight chat requests, cancellations by reason and model, and the generation they saved"""
+    return jsonify(cancellations.stats())
+
+
+@app.route('/routing', methods=['GET'])
+def routing_stats():
+    """Observed latency and error rates the auto router is using"""
+    return jsonify({'models': model_router.stats()})
+
+
+@app.route('/metrics/retries', methods=['GET'])
+def retry_stats():
+    """Per-provider attempts, retries, time spent retrying and classified errors"""
+    return jsonify({'providers': RETRY_STATS.snapshot()})
+
+
+@app.route('/admission', methods=['GET'])
+def admission_stats():
+    """Queue depth, in-flight calls and admission counters"""
+    return jsonify(admission.stats())
+
+
+@app.route('/warmup', methods=['GET', 'POST'])
+def warmup():
+    """Report local model warmth, or load models now"""
+    if request.method == 'GET':
+        return jsonify(warmup_manager.status())
+    
+    data = request.get_json(silent=True) or {}
+    models = data.get('models')
+    results = [warmup_manager.warm(model) for model in models] if models else warmup_manager.warm_all()
+    return jsonify({'results': results, 'status': warmup_manager.status()})
+
+
+@app.route('/warmup/pin', methods=['POST'])
+def pin_model():
+    """Load a local model and keep it resident until unpinned"""
+    data = request.get_json(silent=True) or {}
+    if not data.get('model'):
+        return jsonify({'error': 'Missing model'}), 400
+    result = warmup_manager.pin(data['model'])
+    status = 502 if 'error' in result else 200
+    return jsonify({'pinned': True, **result}), status
+
+
+@app.route('/warmup/unpin', methods=['POST'])
+def unpin_model():
+    """Return a pinned model to its keep_alive policy, optionally unloading it"""
+    data = request.get_json(silent=True) or {}
+    if not data.get('model'):
+        return jsonify({'error': 'Missing model'}), 400
+    try:
+        return jsonify(warmup_manager.unpin(data['model'], unload=bool(data.get('unload'))))
+    except Exception as e:
+        return jsonify({'error': str(e), 'model': data['model']}), 502
+
+
+@app.route('/admin/profiling', methods=['GET', 'POST', 'DELETE'])
+def profiling():
+    """Show, arm or disarm sampled CPU profiling of requests"""
+    if request.method == 'DELETE':
+        return jsonify({'disarmed': request_profiler.disarm(), **request_profiler.status()})
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            rule = request_profiler.arm(
+                path_prefix=data.get('path_prefix', '/'),
+                method=data.get('method'),
+                count=int(data.get('count', 1)),
+                ttl_s=float(data.get('ttl_s', 600))
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'armed': rule, **request_profiler.status()})
+    return jsonify(request_profiler.status())
+
+
+@app.route('/admin/profiling/<profile_id>', methods=['GET'])
+def profile_file(profile_id: str):
+    """Folded stacks of a recent profile, ready for flamegraph.pl or speedscope"""
+    path = request_profiler.profile_path(profile_id)
+    if not path:
+        return jsonify({'error': f'Profile not found: {profile_id}'}), 404
+    return send_file(os.path.abspath(path), mimetype='text/plain', as_attachment=True)
+
+
+@app.route('/admin/memory', methods=['GET', 'POST', 'DELETE'])
+def memory():
+    """Allocation tracing status, or start (POST) and stop (DELETE) tracemalloc"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        frames = data.get('frames')
+        return jsonify(memory_tracker.start(int(frames) if frames else None))
+    if request.method == 'DELETE':
+        return jsonify(memory_tracker.stop())
+    return jsonify(memory_tracker.status())
+
+
+@app.route('/admin/memory/snapshot', methods=['GET'])
+def memory_snapshot():
+    """Top allocation sites right now"""
+    args = request.args
+    try:
+        return jsonify(memory_tracker.top(args.get('limit', 20, type=int), args.get('key_type', 'lineno')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+
+@app.route('/admin/memory/diff', methods=['GET'])
+def memory_diff():
+    """Allocation sites that grew most since the baseline snapshot"""
+    args = request.args
+    try:
+        return jsonify(memory_tracker.diff(
+            args.get('limit', 20, type=int),
+            args.get('key_type', 'lineno'),
+            rebase=args.get('rebase', '').lower() in ('1', 'true', 'yes')
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+
+@app.route('/usage', methods=['GET'])
+def usage():
+    """Aggregate token usage and latency over a time range"""
+    args = request.args
+    try:
+        result = usage_ledger.query(
+            start=args.get('start', type=float),
+            end=args.get('end', type=float),
+            provider=args.get('provider'),
+            model=args.get('model'),
+            agent=args.get('agent'),
+            group_by=[field for field in args.get('group_by', '').split(',') if field],
+            interval=args.get('interval', type=float)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    result['ledger'] = usage_ledger.stats()
+    return jsonify(result)
+
+
+@app.route('/metrics/calls', methods=['GET'])
+def call_metrics():
+    """Latency/TTFT percentiles, tokens/sec, cache hit and error rates of recorded calls"""
+    args = request.args
+    end = args.get('end', type=float) or time.time()
+    window = args.get('window', type=float)
+    try:
+        result = usage_ledger.performance(
+            start=end - window if window else args.get('start', type=float),
+            end=end,
+            provider=args.get('provider'),
+            model=args.get('model'),
+            agent=args.get('agent'),
+            group_by=[field for field in args.get('group_by', '').split(',') if field],
+            points=min(max(args.get('points', 120, type=int), 1), 1000)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+
+def blob_error_response(error: BlobError):
+    body = {'error': str(error)}
+    if isinstance(error, UploadOffsetError):
+        body['offset'] = error.offset
+    return jsonify(body), error.status_code
+
+
+@app.route('/blobs', methods=['GET', 'POST'])
+def blobs():
+    """Store a context blob sent as the raw request body, or report blob store statistics"""
+    if request.method == 'GET':
+        return jsonify(blob_store.stats())
+    try:
+        blob = blob_store.put(request.stream, request.headers.get('X-Content-SHA256'))
+    except BlobError as e:
+        return blob_error_response(e)
+    return jsonify(blob), 201
+
+
+@app.route('/blobs/<blob_id>', methods=['GET', 'HEAD', 'DELETE'])
+def blob(blob_id: str):
+    """Blob size (HEAD/GET, to skip uploading content the server already has) or deletion"""
+    try:
+        if request.method == 'DELETE':
+            blob_store.delete(blob_id)
+            return jsonify({'deleted': blob_id})
+        return jsonify(blob_store.info(blob_id))
+    except BlobError as e:
+        return blob_error_response(e)
+
+
+@app.route('/blobs/uploads', methods=['POST'])
+def begin_blob_upload():
+    """Start a chunked blob upload"""
+    return jsonify({'upload_id': blob_store.begin_upload(), 'offset': 0}), 201
+
+
+@app.route('/blobs/uploads/<upload_id>', methods=['GET', 'PATCH', 'DELETE'])
+def blob_upload(upload_id: str):
+    """Current offset (GET), append the request body as the next chunk (PATCH), or abort (DELETE)"""
+    try:
+        if request.method == 'DELETE':
+            blob_store.abort(upload_id)
+            return jsonify({'aborted': upload_id})
+        if request.method == 'GET':
+            return jsonify({'upload_id': upload_id, 'offset': blob_store.upload_offset(upload_id)})
+        offset = request.headers.get('X-Upload-Offset', type=int)
+        return jsonify({'upload_id': upload_id, 'offset': blob_store.append(upload_id, request.stream, offset)})
+    except BlobError as e:
+        return blob_error_response(e)
+
+
+@app.route('/blobs/uploads/<upload_id>/complete', methods=['POST'])
+def complete_blob_upload(upload_id: str):
+    """Verify the upload's hash and store it as a blob"""
+    data = request.get_json(silent=True) or {}
+    try:
+        blob = blob_store.complete(upload_id, data.get('sha256'))
+    except BlobError as e:
+        return blob_error_response(e)
+    return jsonify(blob), 201
+
+
+@app.route('/embeddings', methods=['GET', 'POST'])
+def embeddings():
+    """Embed one text or a list of texts; concurrent requests are batched and results cached"""
+    if request.method == 'GET':
+        return jsonify(embedding_batcher.stats())
+    
+    data = request.get_json(silent=True) or {}
+    provider_name = data.get('provider', 'openai')
+    texts = data.get('input')
+    if isinstance(texts, str):
+        texts = [texts]
+    if not texts or not all(isinstance(text, str) for text in texts):
+        return jsonify({'error': 'input must be a string or a list of strings'}), 400
+    
+    provider_config = config_manager.snapshot().get(provider_name)
+    if not provider_config:
+        return jsonify({'error': f'Provider config not found: {provider_name}'}), 400
+    model = data.get('model') or provider_config.get('embedding_model')
+    if not model:
+        return jsonify({'error': f'No embedding model configured for {provider_name}'}), 400
+    
+    try:
+        vectors, cached = embedding_batcher.embed(provider_name, model, texts)
+    except NotImplementedError as e:
+        return jsonify({'error': str(e)}), 400
+    except ProviderError as e:
+        print(f"[DEBUG] Embeddings failed ({e.kind}): {e}")
+        return provider_error_response(e)
+    except Exception as e:
+        print(f"[DEBUG] Embeddings failed: {e}")
+        return jsonify({'error': 'Embedding failed', 'details': str(e)}), 502
+    
+    return jsonify({
+        'object': 'list',
+        'data': [{'object': 'embedding', 'index': index, 'embedding': vector} for index, vector in enumerate(vectors.tolist())],
+        'model': model,
+        'provider': provider_name,
+        'usage': {'texts': len(texts), 'cached': cached, 'computed': len(texts) - cached}
+    })
+
+
+@app.route('/sessions', methods=['GET', 'POST'])
+def sessions():
+    """Create a server-side chat session, or report session store statistics"""
+    if request.method == 'GET':
+        return jsonify({**session_store.stats(), 'ollama_context': CONTEXT_STORE.snapshot()})
+    
+    data = request.get_json(silent=True) or {}
+    provider_name = data.get('provider', 'openai')
+    if provider_name != AUTO_PROVIDER and not config_manager.snapshot().get(provider_name):
+        return jsonify({'error': f'Provider config not found: {provider_name}'}), 400
+    try:
+        messages = parse_messages(data.get('messages', []), blob_store.text)
+    except MessageFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    session = session_store.create(
+        provider=provider_name,
+        model=data.get('model'),
+        temperature=data.get('temperature', 0.7),
+        max_tokens=data.get('max_tokens'),
+        messages=messages
+    )
+    print(f"[DEBUG] Created session {session.session_id} for {provider_name}")
+    return jsonify({'session': session.to_dict()}), 201
+
+
+@app.route('/sessions/<session_id>', methods=['GET', 'DELETE'])
+def session_detail(session_id):
+    """Get a session with its history, or delete it"""
+    if request.method == 'DELETE':
+        if not session_store.delete(session_id):
+            return jsonify({'error': f'Session not found: {session_id}'}), 404
+        CONTEXT_STORE.discard(session_id)
+        return jsonify({'status': 'deleted', 'session_id': session_id})
+    
+    session = session_store.get(session_id)
+    if session is None:
+        return jsonify({'error': f'Session not found: {session_id}'}), 404
+    return jsonify({'session': session.to_dict(include_messages=True)})
+
+
+@app.route('/sessions/<session_id>/messages', methods=['POST'])
+def session_messages(session_id):
+    """Append new messages to a session and return only the new reply"""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'Missing request data'}), 400
+    
+    messages_data = data.get('messages')
+    if messages_data is None and 'content' in data:
+        messages_data = [{'role': data.get('role', 'user'), 'content': data['content']}]
+    if not messages_data:
+        return jsonify({'error': 'Missing messages'}), 400
+    try:
+        new_messages = parse_messages(messages_data, blob_store.text)
+    except MessageFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        deadline = request_deadline(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Pinned until the turn is stored, so the session is never spilled and reloaded as a second copy
+    with session_store.use(session_id) as session:
+        if session is None:
+            return jsonify({'error': f'Session not found: {session_id}'}), 404
+        
+        try:
+            inflight = begin_chat_request(data)
+        except DuplicateRequestError as e:
+            return jsonify({'error': str(e)}), 409
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        # One turn at a time per session
+        with session.lock:
+            history = session.messages + new_messages
+            print(f"[DEBUG] Session {session_id}: {len(new_messages)} new, {len(history)} total messages")
+            try:
+                with admission_slot(data):
+                    response, provider_config = run_chat(
+                        session.provider,
+                        data.get('model', session.model),
+                        history,
+                        data.get('temperature', session.temperature),
+                        data.get('max_tokens', session.max_tokens),
+                        routing=data.get('routing'),
+                        agent=data.get('agent'),
+                        session_id=session.session_id,
+                        deadline=deadline,
+                        inflight=inflight
+                    )
+            except AdmissionError as e:
+                return admission_error_response(e)
+            except ProviderError as e:
+                return provider_error_response(e)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            except Exception as e:
+                print(f"[DEBUG] Exception: {e}")
+                print(traceback.format_exc())
+                return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+            finally:
+                cancellations.finish(inflight)
+            
+            # History only grows once the provider succeeded, so a failed turn can be retried
+            session_store.append(session, new_messages + [ChatMessage(role='assistant', content=response.content)])
+        
+        return jsonify({
+            'response': response.to_dict(),
+            'session': session.to_dict(),
+            'request_id': inflight.request_id
+        })
+
+
 @app.route('/test/<provider_name>', methods=['POST'])
 def test_provider(provider_name):
     """Test a specific provider with a simple message"""
     try:
         # Get provider configuration
-        provider_config = config_manager.get_config(provider_name)
+        config_snapshot = config_manager.snapshot()
+        provider_config = config_snapshot.get(provider_name)
         
         if not provider_config:
             return jsonify({'error': f'Provider "{provider_name}" not found'}), 400
         
-        # Create provider instance
-        provider = LLMProviderFactory.create_provider(provider_name, provider_config)
+        # Reuse the provider instance unless its configuration changed
+        provider = LLMProviderFactory.get_provider(
+            provider_name, provider_config, config_snapshot.provider_version(provider_name)
+        )
         
         # Test with a simple message
         test_messages = [ChatMessage(role='user', content='Hello! Please respond with just "Test successful"')]
@@ -186,12 +988,14 @@ def test_provider(provider_name):
 def manage_config(provider_name):
     """Get or update provider configuration"""
     if request.method == 'GET':
-        config = config_manager.get_config(provider_name)
+        config_snapshot = config_manager.snapshot()
+        config = config_snapshot.get(provider_name)
         # Remove sensitive information
-        safe_config = {k: v for k, v in config.items() if 'key' not in k.lower()}
+        safe_config = {k: thaw_config(v) for k, v in config.items() if 'key' not in k.lower()}
         return jsonify({
             'provider': provider_name,
             'config': safe_config,
+            'config_version': config_snapshot.provider_version(provider_name),
             'configured': config_manager.validate_provider_config(provider_name)
         })
     
@@ -203,7 +1007,12 @@ def manage_config(provider_name):
             
             config_manager.update_config(provider_name, data)
             
-            return jsonify({'status': 'success', 'provider': provider_name, 'updated_config': data})
+            return jsonify({
+                'status': 'success',
+                'provider': provider_name,
+                'updated_config': data,
+                'config_version': config_manager.snapshot().provider_version(provider_name)
+            })
         
         except Exception as e:
             return jsonify({'status': 'error', 'provider': provider_name, 'error': str(e)}), 500
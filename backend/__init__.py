@@ -0,0 +1,4 @@
+"""
+Backend Services for Studio Lite
+Stateful helpers used by the Flask API (sessions, routing, usage accounting, ...)
+"""
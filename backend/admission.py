@@ -0,0 +1,196 @@
+"""
+Admission Control
+Bounds how many provider calls run at once and how many may wait, serves
+waiting requests by priority class, rejects early with a retry hint when the
+queue is full, and drops queued requests whose deadline has passed.
+"""
+
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Lower value is served first
+PRIORITY_CLASSES = {'interactive': 0, 'batch': 1, 'evaluation': 2}
+DEFAULT_PRIORITY = os.getenv('ADMISSION_DEFAULT_PRIORITY', 'interactive')
+DEFAULT_MAX_CONCURRENT = int(os.getenv('ADMISSION_MAX_CONCURRENT', '8'))
+DEFAULT_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', '64'))
+DEFAULT_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '30'))
+# Weight of the newest call in the service-time average behind Retry-After
+SERVICE_TIME_ALPHA = 0.2
+
+
+class AdmissionError(Exception):
+    """Base class for requests the backend declined to run"""
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFullError(AdmissionError):
+    """The wait queue is full, or the request was displaced by a higher priority one"""
+    status_code = 429
+
+
+class DeadlineExceededError(AdmissionError):
+    """The request's deadline passed before a slot became free"""
+    status_code = 504
+
+
+class _Waiter:
+    __slots__ = ('priority', 'deadline', 'event', 'granted', 'error')
+
+    def __init__(self, priority: int, deadline: float):
+        self.priority = priority
+        self.deadline = deadline
+        self.event = threading.Event()
+        self.granted = False
+        self.error: Optional[AdmissionError] = None
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded, priority-ordered wait queue"""
+
+    def __init__(
+        self,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        default_timeout: float = DEFAULT_QUEUE_TIMEOUT
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.default_timeout = default_timeout
+        self._lock = threading.Lock()
+        self._queue: List[Any] = []  # heap of (priority, sequence, waiter)
+        self._sequence = itertools.count()
+        self._queued = 0
+        self._in_flight = 0
+        self._service_time = 1.0
+        self._counters = {'admitted': 0, 'rejected': 0, 'displaced': 0, 'expired': 0, 'completed': 0}
+        self._wait_total = 0.0
+
+    @staticmethod
+    def priority_value(priority: Optional[str]) -> int:
+        """Numeric priority of a class name"""
+        name = priority or DEFAULT_PRIORITY
+        if name not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority '{name}', expected one of {', '.join(PRIORITY_CLASSES)}")
+        return PRIORITY_CLASSES[name]
+
+    def retry_after(self) -> int:
+        """Seconds until a rejected caller is likely to be admitted"""
+        backlog = self._queued + self._in_flight
+        return max(1, math.ceil(self._service_time * backlog / self.max_concurrent))
+
+    @contextmanager
+    def slot(self, priority: Optional[str] = None, timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        Hold a concurrency slot for the duration of the block
+
+        Args:
+            priority: Priority class name; defaults to ``ADMISSION_DEFAULT_PRIORITY``
+            timeout: Seconds the caller is willing to wait in the queue
+
+        Raises:
+            QueueFullError: The queue is full of equal or higher priority requests
+            DeadlineExceededError: No slot became free before the deadline
+        """
+        self.acquire(priority, timeout)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def acquire(self, priority: Optional[str] = None, timeout: Optional[float] = None):
+        """Take a slot, waiting in the priority queue if all slots are busy"""
+        rank = self.priority_value(priority)
+        enqueued = time.monotonic()
+        deadline = enqueued + (self.default_timeout if timeout is None else timeout)
+        with self._lock:
+            if self._in_flight < self.max_concurrent and not self._queued:
+                self._in_flight += 1
+                self._counters['admitted'] += 1
+                return
+            if self._queued >= self.max_queue and not self._displace(rank):
+                self._counters['rejected'] += 1
+                raise QueueFullError('Server is at capacity, retry later', self.retry_after())
+            waiter = _Waiter(rank, deadline)
+            heapq.heappush(self._queue, (rank, next(self._sequence), waiter))
+            self._queued += 1
+
+        waiter.event.wait(max(0.0, deadline - time.monotonic()))
+        with self._lock:
+            if waiter.granted:
+                self._wait_total += time.monotonic() - enqueued
+                return
+            if waiter.error is not None:
+                raise waiter.error
+            # Timed out: leave the heap entry behind, it is skipped when popped
+            waiter.error = DeadlineExceededError('Request deadline passed while queued', self.retry_after())
+            self._queued -= 1
+            self._counters['expired'] += 1
+            raise waiter.error
+
+    def release(self, service_time: float = 0.0):
+        """Return a slot and hand it to the most urgent live waiter"""
+        with self._lock:
+            self._counters['completed'] += 1
+            if service_time > 0:
+                self._service_time += SERVICE_TIME_ALPHA * (service_time - self._service_time)
+            now = time.monotonic()
+            while self._queue:
+                _, _, waiter = heapq.heappop(self._queue)
+                if waiter.error is not None:
+                    continue  # displaced or already timed out
+                self._queued -= 1
+                if waiter.deadline <= now:
+                    # The caller has given up; don't spend a provider call on it
+                    waiter.error = DeadlineExceededError('Request deadline passed while queued', self.retry_after())
+                    self._counters['expired'] += 1
+                    waiter.event.set()
+                    continue
+                waiter.granted = True
+                self._counters['admitted'] += 1
+                waiter.event.set()
+                return
+            self._in_flight -= 1
+
+    def _displace(self, rank: int) -> bool:
+        """Reject the newest lowest-priority waiter if it ranks below ``rank``; lock must be held"""
+        live = [entry for entry in self._queue if entry[2].error is None]
+        if not live:
+            return False
+        victim = max(live, key=lambda entry: (entry[0], entry[1]))
+        if victim[0] <= rank:
+            return False
+        victim[2].error = QueueFullError('Displaced by higher priority traffic, retry later', self.retry_after())
+        victim[2].event.set()
+        self._queued -= 1
+        self._counters['displaced'] += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waiting = {name: 0 for name in PRIORITY_CLASSES}
+            names = {value: name for name, value in PRIORITY_CLASSES.items()}
+            for rank, _, waiter in self._queue:
+                if waiter.error is None and not waiter.granted:
+                    waiting[names[rank]] += 1
+            granted_waits = self._counters['admitted']
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'in_flight': self._in_flight,
+                'queued': self._queued,
+                'queued_by_priority': waiting,
+                'mean_service_time_s': round(self._service_time, 3),
+                'mean_queue_wait_s': round(self._wait_total / granted_waits, 4) if granted_waits else 0.0,
+                **self._counters
+            }
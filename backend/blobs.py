@@ -0,0 +1,275 @@
+"""
+Content-Addressed Blob Store
+Large message contexts uploaded once, in chunks, stored on disk under their
+SHA-256 and referenced from chat messages by that hash. Blobs are read through
+a memory map and the decoded text is kept in a size-bounded LRU, so a context
+reused across many requests is neither re-sent nor re-parsed.
+"""
+
+import codecs
+import hashlib
+import mmap
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Optional
+
+DEFAULT_BLOB_DIR = os.getenv('BLOB_STORE_DIR', './.blobs')
+DEFAULT_MAX_BLOB_BYTES = int(float(os.getenv('BLOB_MAX_MB', '256')) * 1024 * 1024)
+DEFAULT_CACHE_CHARS = int(float(os.getenv('BLOB_CACHE_MB', '256')) * 1024 * 1024)
+DEFAULT_UPLOAD_TTL_S = float(os.getenv('BLOB_UPLOAD_TTL_SECONDS', '3600'))
+READ_CHUNK_BYTES = 1024 * 1024
+
+_BLOB_ID = re.compile(r'^[0-9a-f]{64}$')
+_UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class BlobError(ValueError):
+    """Base class for rejected blob operations"""
+    status_code = 400
+
+
+class BlobNotFoundError(BlobError):
+    """No blob or upload with this ID"""
+    status_code = 404
+
+
+class UploadOffsetError(BlobError):
+    """A chunk did not start where the upload currently ends"""
+    status_code = 409
+
+    def __init__(self, message: str, offset: int):
+        super().__init__(message)
+        self.offset = offset
+
+
+class BlobTooLargeError(BlobError):
+    """The blob would exceed the size limit"""
+    status_code = 413
+
+
+class _Upload:
+    __slots__ = ('upload_id', 'path', 'offset', 'digest', 'updated', 'lock')
+
+    def __init__(self, upload_id: str, path: str):
+        self.upload_id = upload_id
+        self.path = path
+        self.offset = 0
+        self.digest = hashlib.sha256()
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+
+class BlobStore:
+    """
+    Blobs on disk under ``directory/<sha256[:2]>/<sha256>``
+
+    Uploads are appended in order to ``directory/uploads`` while their hash is
+    computed, then moved into place on completion; uploading content that is
+    already stored just discards the upload.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_BLOB_DIR,
+        max_blob_bytes: int = DEFAULT_MAX_BLOB_BYTES,
+        cache_chars: int = DEFAULT_CACHE_CHARS,
+        upload_ttl_s: float = DEFAULT_UPLOAD_TTL_S
+    ):
+        self.directory = directory
+        self.max_blob_bytes = max_blob_bytes
+        self.cache_chars = cache_chars
+        self.upload_ttl_s = upload_ttl_s
+        self._uploads: Dict[str, _Upload] = {}
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cached_chars = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self._upload_dir, exist_ok=True)
+
+    @property
+    def _upload_dir(self) -> str:
+        return os.path.join(self.directory, 'uploads')
+
+    def _blob_path(self, blob_id: str) -> str:
+        if not _BLOB_ID.match(blob_id or ''):
+            raise BlobNotFoundError(f'Invalid blob ID: {blob_id}')
+        return os.path.join(self.directory, blob_id[:2], blob_id)
+
+    # --- uploads ---------------------------------------------------------------
+
+    def begin_upload(self) -> str:
+        """Start a chunked upload and return its ID"""
+        self._expire_uploads()
+        upload_id = uuid.uuid4().hex
+        upload = _Upload(upload_id, os.path.join(self._upload_dir, upload_id))
+        open(upload.path, 'wb').close()
+        with self._lock:
+            self._uploads[upload_id] = upload
+        return upload_id
+
+    def _upload(self, upload_id: str) -> _Upload:
+        with self._lock:
+            upload = self._uploads.get(upload_id) if _UPLOAD_ID.match(upload_id or '') else None
+        if upload is None:
+            raise BlobNotFoundError(f'Upload not found: {upload_id}')
+        return upload
+
+    def upload_offset(self, upload_id: str) -> int:
+        """Bytes received so far; a resumed upload continues from here"""
+        return self._upload(upload_id).offset
+
+    def append(self, upload_id: str, stream: BinaryIO, offset: Optional[int] = None) -> int:
+        """Append a chunk read from ``stream``; ``offset`` must match the bytes received so far"""
+        upload = self._upload(upload_id)
+        with upload.lock:
+            if offset is not None and offset != upload.offset:
+                raise UploadOffsetError(f'Upload is at offset {upload.offset}, not {offset}', upload.offset)
+            with open(upload.path, 'ab') as part:
+                while True:
+                    data = stream.read(READ_CHUNK_BYTES)
+                    if not data:
+                        break
+                    if upload.offset + len(data) > self.max_blob_bytes:
+                        part.truncate(upload.offset)
+                        raise BlobTooLargeError(f'Blobs are limited to {self.max_blob_bytes} bytes')
+                    part.write(data)
+                    upload.digest.update(data)
+                    upload.offset += len(data)
+            upload.updated = time.time()
+            return upload.offset
+
+    def complete(self, upload_id: str, expected_sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Verify and store an upload under its hash"""
+        upload = self._upload(upload_id)
+        with upload.lock:
+            blob_id = upload.digest.hexdigest()
+            try:
+                if expected_sha256 and expected_sha256.lower() != blob_id:
+                    raise BlobError(f'Content hash is {blob_id}, not {expected_sha256}')
+                self._check_text(upload.path)
+                path = self._blob_path(blob_id)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if os.path.exists(path):
+                    os.remove(upload.path)
+                else:
+                    os.replace(upload.path, path)
+            finally:
+                with self._lock:
+                    self._uploads.pop(upload_id, None)
+                if os.path.exists(upload.path):
+                    os.remove(upload.path)
+        return self.info(blob_id)
+
+    def put(self, stream: BinaryIO, expected_sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Store a blob sent in one request"""
+        upload_id = self.begin_upload()
+        try:
+            self.append(upload_id, stream)
+        except Exception:
+            self.abort(upload_id)
+            raise
+        return self.complete(upload_id, expected_sha256)
+
+    def abort(self, upload_id: str):
+        """Discard an unfinished upload"""
+        with self._lock:
+            upload = self._uploads.pop(upload_id, None)
+        if upload is not None and os.path.exists(upload.path):
+            os.remove(upload.path)
+
+    def _expire_uploads(self):
+        cutoff = time.time() - self.upload_ttl_s
+        with self._lock:
+            stale = [upload_id for upload_id, upload in self._uploads.items() if upload.updated < cutoff]
+        for upload_id in stale:
+            self.abort(upload_id)
+
+    @staticmethod
+    def _check_text(path: str):
+        """Blobs become message content, so they must be UTF-8 text"""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        try:
+            with open(path, 'rb') as blob_file:
+                for data in iter(lambda: blob_file.read(READ_CHUNK_BYTES), b''):
+                    decoder.decode(data)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError as e:
+            raise BlobError(f'Blob content is not UTF-8 text: {e.reason}')
+
+    # --- reads -----------------------------------------------------------------
+
+    def exists(self, blob_id: str) -> bool:
+        try:
+            return os.path.exists(self._blob_path(blob_id))
+        except BlobNotFoundError:
+            return False
+
+    def info(self, blob_id: str) -> Dict[str, Any]:
+        path = self._blob_path(blob_id)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            raise BlobNotFoundError(f'Blob not found: {blob_id}')
+        return {'id': blob_id, 'size': size}
+
+    def text(self, blob_id: str) -> str:
+        """A blob's content as text, decoded once and then served from the cache"""
+        with self._lock:
+            cached = self._cache.get(blob_id)
+            if cached is not None:
+                self._cache.move_to_end(blob_id)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        path = self._blob_path(blob_id)
+        try:
+            with open(path, 'rb') as blob_file:
+                if os.fstat(blob_file.fileno()).st_size == 0:
+                    return ''
+                with mmap.mmap(blob_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    content = str(mapped, 'utf-8')
+        except FileNotFoundError:
+            raise BlobNotFoundError(f'Blob not found: {blob_id}')
+        self._cache_put(blob_id, content)
+        return content
+
+    def _cache_put(self, blob_id: str, content: str):
+        size = len(content)
+        if size > self.cache_chars:
+            return
+        with self._lock:
+            if blob_id in self._cache:
+                return
+            self._cache[blob_id] = content
+            self._cached_chars += size
+            while self._cached_chars > self.cache_chars:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_chars -= len(evicted)
+
+    def delete(self, blob_id: str):
+        path = self._blob_path(blob_id)
+        with self._lock:
+            evicted = self._cache.pop(blob_id, None)
+            if evicted is not None:
+                self._cached_chars -= len(evicted)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            raise BlobNotFoundError(f'Blob not found: {blob_id}')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'uploads_in_progress': len(self._uploads),
+                'cached_blobs': len(self._cache),
+                'cached_chars': self._cached_chars,
+                'cache_hits': self.hits,
+                'cache_misses': self.misses
+            }
+
@@ -0,0 +1,239 @@
+"""
+In-Flight Request Cancellation
+Every chat request is registered here with a CancelToken while it runs. It is
+cancelled through the cancel API, when its stream is closed by a departed
+client, or when a watcher thread sees the client close its connection while
+the request still waits on the provider. Cancellations are counted with the
+upstream time they consumed and an estimate of the generation they saved,
+based on the output length and speed of completed calls to the same model.
+"""
+
+import os
+import re
+import select
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+from llm_providers.cancellation import CancelToken
+
+DEFAULT_POLL_INTERVAL_S = float(os.getenv('DISCONNECT_POLL_MS', '250')) / 1000.0
+RECENT_CANCELLATIONS = 50
+# Weight of the newest completed call in the per-model output length and speed averages
+EWMA_ALPHA = 0.2
+
+_REQUEST_ID = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+
+
+class DuplicateRequestError(ValueError):
+    """A request with this ID is already in flight"""
+
+
+def client_gone(client_socket) -> bool:
+    """Whether the peer closed a client connection, without consuming any data it sent"""
+    try:
+        readable, _, _ = select.select([client_socket], [], [], 0)
+        if not readable:
+            return False
+        return client_socket.recv(1, socket.MSG_PEEK) == b''
+    except ValueError:
+        return False  # closed on our side, TLS, or a descriptor select() cannot watch
+    except OSError:
+        return True  # reset by the peer
+
+
+class InFlightRequest:
+    """A running chat request and the token that cancels it"""
+
+    def __init__(self, request_id: str, stream: bool, max_tokens: Optional[int] = None,
+                 agent: Optional[str] = None, client_socket=None):
+        self.request_id = request_id
+        self.stream = stream
+        self.max_tokens = max_tokens
+        self.agent = agent
+        self.client_socket = client_socket
+        self.token = CancelToken()
+        self.provider: Optional[str] = None
+        self.model: Optional[str] = None
+        self.started_at = time.time()
+        self.upstream_started: Optional[float] = None  # time.monotonic() when the provider call began
+        self.output_tokens = 0  # deltas streamed so far, or the usage of a completed call
+        self.completed = False
+
+    def target(self, provider: str, model: Optional[str]):
+        """The provider call is about to start"""
+        self.provider = provider
+        self.model = model
+        self.upstream_started = time.monotonic()
+
+    def complete(self, output_tokens: int):
+        self.output_tokens = output_tokens
+        self.completed = True
+
+    def upstream_s(self, until: Optional[float] = None) -> float:
+        """Seconds the provider has been working on this request"""
+        if self.upstream_started is None:
+            return 0.0
+        return max((until or time.monotonic()) - self.upstream_started, 0.0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'request_id': self.request_id,
+            'provider': self.provider,
+            'model': self.model,
+            'agent': self.agent,
+            'stream': self.stream,
+            'started_at': self.started_at,
+            'upstream_s': round(self.upstream_s(self.token.cancelled_at), 3),
+            'output_tokens': self.output_tokens,
+            'cancelled': self.token.cancelled,
+            'cancel_reason': self.token.reason
+        }
+
+
+class CancellationRegistry:
+    """
+    Chat requests in flight, by request ID
+
+    One daemon thread polls the client sockets of in-flight requests every
+    ``poll_interval`` seconds and exits as soon as none are left to watch.
+    """
+
+    def __init__(self, poll_interval: float = DEFAULT_POLL_INTERVAL_S):
+        self.poll_interval = poll_interval
+        self._requests: Dict[str, InFlightRequest] = {}
+        # (provider, model) -> EWMA output tokens and tokens/sec of completed calls
+        self._rates: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._totals: Dict[str, Any] = {'cancelled': 0, 'upstream_s': 0.0, 'saved_tokens_est': 0.0, 'saved_s_est': 0.0}
+        self._by_reason: Dict[str, int] = {}
+        self._by_model: Dict[str, Dict[str, float]] = {}
+        self._recent: deque = deque(maxlen=RECENT_CANCELLATIONS)
+        self._watcher: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def begin(self, request_id: Optional[str] = None, stream: bool = False, max_tokens: Optional[int] = None,
+              agent: Optional[str] = None, client_socket=None) -> InFlightRequest:
+        """
+        Register a request; ``client_socket`` is watched for the client closing its connection
+
+        Raises:
+            ValueError: If ``request_id`` is malformed
+            DuplicateRequestError: If a request with this ID is already in flight
+        """
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+        elif not _REQUEST_ID.match(str(request_id)):
+            raise ValueError('request_id must be 1-128 letters, digits or ._:-')
+        inflight = InFlightRequest(str(request_id), stream, max_tokens, agent, client_socket)
+        with self._lock:
+            if inflight.request_id in self._requests:
+                raise DuplicateRequestError(f'Request already in flight: {inflight.request_id}')
+            self._requests[inflight.request_id] = inflight
+            if client_socket is not None and self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name='disconnect-watcher', daemon=True)
+                self._watcher.start()
+        return inflight
+
+    def cancel(self, request_id: str, reason: str = 'cancel_api') -> Optional[Dict[str, Any]]:
+        """Cancel an in-flight request; None if there is none with this ID"""
+        with self._lock:
+            inflight = self._requests.get(request_id)
+        if inflight is None:
+            return None
+        inflight.token.cancel(reason)
+        return inflight.to_dict()
+
+    def finish(self, inflight: InFlightRequest):
+        """Unregister a request and record its cancellation, or learn from its completion"""
+        with self._lock:
+            if self._requests.get(inflight.request_id) is inflight:
+                del self._requests[inflight.request_id]
+            if inflight.token.cancelled:
+                self._record_cancellation(inflight)
+            elif inflight.completed and inflight.provider and inflight.output_tokens > 0:
+                self._learn(inflight)
+
+    def _learn(self, inflight: InFlightRequest):
+        rates = self._rates.get((inflight.provider, inflight.model))
+        tokens_per_s = inflight.output_tokens / max(inflight.upstream_s(), 1e-3)
+        if rates is None:
+            self._rates[(inflight.provider, inflight.model)] = {
+                'output_tokens': float(inflight.output_tokens), 'tokens_per_s': tokens_per_s
+            }
+            return
+        rates['output_tokens'] += EWMA_ALPHA * (inflight.output_tokens - rates['output_tokens'])
+        rates['tokens_per_s'] += EWMA_ALPHA * (tokens_per_s - rates['tokens_per_s'])
+
+    def _estimate_saved(self, inflight: InFlightRequest, upstream_s: float) -> Tuple[Optional[float], Optional[float]]:
+        """Output tokens and seconds of generation the cancellation avoided, if the model has been seen before"""
+        rates = self._rates.get((inflight.provider, inflight.model))
+        expected = rates['output_tokens'] if rates else None
+        if inflight.max_tokens:
+            expected = min(expected, inflight.max_tokens) if expected is not None else float(inflight.max_tokens)
+        if expected is None:
+            return None, None
+        tokens_per_s = rates['tokens_per_s'] if rates else None
+        if inflight.stream or not tokens_per_s:
+            generated = float(inflight.output_tokens)
+        else:
+            generated = upstream_s * tokens_per_s  # a blocking call reports nothing until it ends
+        saved_tokens = max(expected - generated, 0.0)
+        return saved_tokens, saved_tokens / tokens_per_s if tokens_per_s else None
+
+    def _record_cancellation(self, inflight: InFlightRequest):
+        upstream_s = inflight.upstream_s(inflight.token.cancelled_at)
+        saved_tokens, saved_s = self._estimate_saved(inflight, upstream_s)
+        reason = inflight.token.reason or 'cancelled'
+        self._by_reason[reason] = self._by_reason.get(reason, 0) + 1
+        key = f"{inflight.provider}/{inflight.model}" if inflight.provider else 'unassigned'
+        entry = self._by_model.setdefault(key, {'cancelled': 0, 'upstream_s': 0.0, 'saved_tokens_est': 0.0, 'saved_s_est': 0.0})
+        for totals in (self._totals, entry):
+            totals['cancelled'] += 1
+            totals['upstream_s'] += upstream_s
+            totals['saved_tokens_est'] += saved_tokens or 0.0
+            totals['saved_s_est'] += saved_s or 0.0
+        self._recent.append({
+            **inflight.to_dict(),
+            'saved_tokens_est': round(saved_tokens) if saved_tokens is not None else None,
+            'saved_s_est': round(saved_s, 3) if saved_s is not None else None
+        })
+
+    def _watch(self):
+        while True:
+            with self._lock:
+                watched = [
+                    inflight for inflight in self._requests.values()
+                    if inflight.client_socket is not None and not inflight.token.cancelled
+                ]
+                if not watched:
+                    self._watcher = None
+                    return
+            for inflight in watched:
+                if client_gone(inflight.client_socket):
+                    inflight.token.cancel('client_disconnect')
+            time.sleep(self.poll_interval)
+
+    @staticmethod
+    def _rounded(totals: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'cancelled': totals['cancelled'],
+            'upstream_s': round(totals['upstream_s'], 3),
+            'saved_tokens_est': round(totals['saved_tokens_est']),
+            'saved_s_est': round(totals['saved_s_est'], 3)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = [inflight.to_dict() for inflight in self._requests.values()]
+            return {
+                'poll_interval_ms': self.poll_interval * 1000.0,
+                'watching': self._watcher is not None,
+                'in_flight': in_flight,
+                **self._rounded(self._totals),
+                'by_reason': dict(self._by_reason),
+                'by_model': {key: self._rounded(entry) for key, entry in self._by_model.items()},
+                'recent': list(reversed(self._recent))
+            }
@@ -0,0 +1,223 @@
+"""
+Embeddings Batching and Cache
+Merges concurrent embedding requests into batched upstream calls within a
+short window and keeps every vector in a content-hash-keyed cache of
+contiguous float32 matrices, one per provider/model.
+"""
+
+import hashlib
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_BATCH_WINDOW_S = float(os.getenv('EMBED_BATCH_WINDOW_MS', '5')) / 1000.0
+DEFAULT_MAX_BATCH = int(os.getenv('EMBED_MAX_BATCH', '64'))
+DEFAULT_CACHE_ROWS = int(os.getenv('EMBED_CACHE_ROWS', '100000'))
+INITIAL_ROWS = 1024
+
+
+def text_digest(text: str) -> bytes:
+    """Cache key of a text"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+class VectorSpace:
+    """Vectors of one provider/model in a single float32 matrix"""
+
+    def __init__(self, dim: int, max_rows: int):
+        self.dim = dim
+        self.max_rows = max_rows
+        self.matrix = np.zeros((min(INITIAL_ROWS, max_rows), dim), dtype=np.float32)
+        self.rows: Dict[bytes, int] = {}
+        self.keys: List[Optional[bytes]] = [None] * len(self.matrix)
+        self.size = 0
+        self._next = 0  # overwrite position once the matrix is at max_rows
+
+    def lookup(self, keys: Sequence[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+        """Row indices of cached keys (-1 for misses) and a hit mask"""
+        rows = np.fromiter((self.rows.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+        return rows, rows >= 0
+
+    def add(self, keys: Sequence[bytes], vectors: np.ndarray):
+        for key, vector in zip(keys, vectors):
+            if key in self.rows:
+                continue
+            if self.size < len(self.matrix):
+                row = self.size
+                self.size += 1
+            elif len(self.matrix) < self.max_rows:
+                grown = np.zeros((min(len(self.matrix) * 2, self.max_rows), self.dim), dtype=np.float32)
+                grown[:len(self.matrix)] = self.matrix
+                self.keys.extend([None] * (len(grown) - len(self.matrix)))
+                self.matrix = grown
+                row = self.size
+                self.size += 1
+            else:
+                # Full: replace the oldest entry
+                row = self._next
+                self._next = (self._next + 1) % self.max_rows
+                self.rows.pop(self.keys[row], None)
+            self.matrix[row] = vector
+            self.keys[row] = key
+            self.rows[key] = row
+
+
+class EmbeddingCache:
+    """Per provider/model vector spaces keyed by text digest"""
+
+    def __init__(self, max_rows: int = DEFAULT_CACHE_ROWS):
+        self.max_rows = max_rows
+        self._spaces: Dict[Tuple[str, str], VectorSpace] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, provider: str, model: str, keys: Sequence[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+        """Cached vectors for ``keys`` (zero rows for misses) and the hit mask"""
+        with self._lock:
+            space = self._spaces.get((provider, model))
+            if space is None:
+                self.misses += len(keys)
+                return np.zeros((len(keys), 0), dtype=np.float32), np.zeros(len(keys), dtype=bool)
+            rows, hits = space.lookup(keys)
+            vectors = np.zeros((len(keys), space.dim), dtype=np.float32)
+            vectors[hits] = space.matrix[rows[hits]]
+            hit_count = int(hits.sum())
+            self.hits += hit_count
+            self.misses += len(keys) - hit_count
+            return vectors, hits
+
+    def put_many(self, provider: str, model: str, keys: Sequence[bytes], vectors: np.ndarray):
+        with self._lock:
+            space = self._spaces.get((provider, model))
+            if space is None or space.dim != vectors.shape[1]:
+                space = self._spaces[(provider, model)] = VectorSpace(vectors.shape[1], self.max_rows)
+            space.add(keys, vectors)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'spaces': {
+                    f"{provider}/{model}": {'vectors': space.size, 'dim': space.dim, 'bytes': int(space.matrix.nbytes)}
+                    for (provider, model), space in self._spaces.items()
+                }
+            }
+
+
+class _PendingBatch:
+    __slots__ = ('futures', 'timer')
+
+    def __init__(self):
+        self.futures: Dict[bytes, Tuple[str, Future]] = {}
+        self.timer: Optional[threading.Timer] = None
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces embedding requests per provider/model
+
+    The first uncached text opens a batch; texts arriving within ``window_s``
+    join it, identical texts share one result, and the batch is sent upstream
+    when the window closes or it reaches ``max_batch`` texts.
+    """
+
+    def __init__(
+        self,
+        provider_getter: Callable[[str], Any],
+        cache: Optional[EmbeddingCache] = None,
+        window_s: float = DEFAULT_BATCH_WINDOW_S,
+        max_batch: int = DEFAULT_MAX_BATCH
+    ):
+        self.provider_getter = provider_getter
+        self.cache = cache or EmbeddingCache()
+        self.window_s = window_s
+        self.max_batch = max(1, max_batch)
+        self._pending: Dict[Tuple[str, str], _PendingBatch] = {}
+        self._lock = threading.Lock()
+        self.upstream_calls = 0
+        self.upstream_texts = 0
+
+    def embed(self, provider: str, model: str, texts: Sequence[str], timeout: float = 120.0) -> Tuple[np.ndarray, int]:
+        """
+        Embed texts, serving repeats from the cache
+
+        Returns:
+            Tuple of the (len(texts), dim) float32 matrix and the number of cache hits
+        """
+        keys = [text_digest(text) for text in texts]
+        vectors, hits = self.cache.get_many(provider, model, keys)
+        if hits.all():
+            return vectors, len(texts)
+
+        futures = {}
+        for index in np.flatnonzero(~hits):
+            key = keys[index]
+            if key not in futures:
+                futures[key] = self._submit(provider, model, key, texts[index])
+        computed = {key: future.result(timeout) for key, future in futures.items()}
+
+        if vectors.shape[1] == 0:
+            # Nothing cached yet for this model, so the width comes from the computed vectors
+            vectors = np.zeros((len(texts), len(next(iter(computed.values())))), dtype=np.float32)
+        for index in np.flatnonzero(~hits):
+            vectors[index] = computed[keys[index]]
+        return vectors, int(hits.sum())
+
+    def _submit(self, provider: str, model: str, key: bytes, text: str) -> Future:
+        flush_now = None
+        with self._lock:
+            batch = self._pending.get((provider, model))
+            if batch is None:
+                batch = self._pending[(provider, model)] = _PendingBatch()
+                batch.timer = threading.Timer(self.window_s, self._flush, args=(provider, model, batch))
+                batch.timer.daemon = True
+                batch.timer.start()
+            if key in batch.futures:
+                return batch.futures[key][1]
+            future: Future = Future()
+            batch.futures[key] = (text, future)
+            if len(batch.futures) >= self.max_batch:
+                batch.timer.cancel()
+                flush_now = batch
+        if flush_now is not None:
+            self._flush(provider, model, flush_now)
+        return future
+
+    def _flush(self, provider: str, model: str, batch: _PendingBatch):
+        with self._lock:
+            if self._pending.get((provider, model)) is not batch:
+                return  # already flushed by the size limit
+            del self._pending[(provider, model)]
+        keys = list(batch.futures)
+        texts = [batch.futures[key][0] for key in keys]
+        try:
+            vectors = np.asarray(self.provider_getter(provider).embed(texts, model=model), dtype=np.float32)
+            if vectors.shape[0] != len(texts):
+                raise ValueError(f"{provider} returned {vectors.shape[0]} embeddings for {len(texts)} texts")
+        except Exception as e:
+            for _, future in batch.futures.values():
+                future.set_exception(e)
+            return
+        with self._lock:
+            self.upstream_calls += 1
+            self.upstream_texts += len(texts)
+        self.cache.put_many(provider, model, keys, vectors)
+        for key, vector in zip(keys, vectors):
+            batch.futures[key][1].set_result(vector)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls, texts = self.upstream_calls, self.upstream_texts
+        return {
+            'upstream_calls': calls,
+            'upstream_texts': texts,
+            'mean_batch_size': round(texts / calls, 2) if calls else 0.0,
+            'window_ms': self.window_s * 1000.0,
+            'max_batch': self.max_batch,
+            'cache': self.cache.stats()
+        }
@@ -0,0 +1,346 @@
+"""
+Request Profiling
+Opt-in sampled CPU profiles of individual requests, written to disk as folded
+stacks (the input format of flamegraph.pl and speedscope), and tracemalloc
+snapshots/diffs of the top allocation sites. Nothing runs while neither is on:
+the sampler thread exists only while a profiled request is in flight and
+tracemalloc is only started on request.
+"""
+
+import itertools
+import linecache
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = os.getenv('PROFILE_DIR', './.profiles')
+DEFAULT_SAMPLE_INTERVAL_S = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5')) / 1000.0
+DEFAULT_MAX_PROFILE_FILES = int(os.getenv('PROFILE_MAX_FILES', '100'))
+DEFAULT_TRACEMALLOC_FRAMES = int(os.getenv('TRACEMALLOC_FRAMES', '16'))
+PROFILE_HEADER = 'X-Profile'
+MAX_STACK_DEPTH = 128
+RECENT_PROFILES = 50
+
+_SLUG = re.compile(r'[^A-Za-z0-9]+')
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def fold_stack(frame) -> str:
+    """Root-first, ';'-joined function labels of a frame's stack"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class Profile:
+    """Stack samples of one request's thread"""
+
+    def __init__(self, profile_id: str, thread_id: int, method: str, path: str):
+        self.id = profile_id
+        self.thread_id = thread_id
+        self.method = method
+        self.path = path
+        self.started = time.time()
+        self.duration_s: Optional[float] = None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.file: Optional[str] = None
+
+    def top_functions(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Functions by samples spent in their own code"""
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return [
+            {'function': name, 'samples': count, 'share': round(count / self.samples, 4)}
+            for name, count in leaves.most_common(limit)
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'started': self.started,
+            'duration_s': round(self.duration_s, 4) if self.duration_s is not None else None,
+            'samples': self.samples,
+            'file': self.file,
+            'top_functions': self.top_functions() if self.samples else []
+        }
+
+
+class RequestProfiler:
+    """
+    Sampling profiler for selected requests
+
+    A request is profiled when it carries the ``X-Profile`` header or matches
+    a rule armed through ``arm``. One daemon thread samples the stacks of all
+    profiled request threads every ``interval`` seconds and exits as soon as
+    none are left.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_PROFILE_DIR,
+        interval: float = DEFAULT_SAMPLE_INTERVAL_S,
+        max_files: int = DEFAULT_MAX_PROFILE_FILES
+    ):
+        self.directory = directory
+        self.interval = interval
+        self.max_files = max_files
+        self._active: Dict[int, Profile] = {}
+        self._rules: List[Dict[str, Any]] = []
+        self._recent: deque = deque(maxlen=RECENT_PROFILES)
+        self._ids = itertools.count(1)
+        self._sampler: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # --- selection -------------------------------------------------------------
+
+    def arm(self, path_prefix: str = '/', method: Optional[str] = None, count: int = 1,
+            ttl_s: float = 600.0) -> Dict[str, Any]:
+        """Profile the next ``count`` requests under ``path_prefix`` within ``ttl_s`` seconds"""
+        if count < 1:
+            raise ValueError('count must be at least 1')
+        rule = {
+            'path_prefix': path_prefix,
+            'method': method.upper() if method else None,
+            'remaining': int(count),
+            'expires': time.time() + ttl_s
+        }
+        with self._lock:
+            self._rules.append(rule)
+        return dict(rule)
+
+    def disarm(self) -> int:
+        """Drop every armed rule"""
+        with self._lock:
+            dropped = len(self._rules)
+            self._rules = []
+        return dropped
+
+    def wants(self, method: str, path: str, header: Optional[str]) -> bool:
+        """Whether a request should be profiled"""
+        if header is not None:
+            return header.strip().lower() not in ('', '0', 'false', 'off')
+        if not self._rules:
+            return False
+        now = time.time()
+        with self._lock:
+            self._rules = [rule for rule in self._rules if rule['remaining'] > 0 and rule['expires'] > now]
+            for rule in self._rules:
+                if path.startswith(rule['path_prefix']) and rule['method'] in (None, method):
+                    rule['remaining'] -= 1
+                    return True
+        return False
+
+    # --- sampling --------------------------------------------------------------
+
+    def start(self, method: str, path: str) -> Profile:
+        """Start sampling the calling thread"""
+        profile = Profile(f"{int(time.time())}-{next(self._ids)}", threading.get_ident(), method, path)
+        with self._lock:
+            self._active[profile.thread_id] = profile
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._sampler.start()
+        return profile
+
+    def stop(self, profile: Profile) -> Dict[str, Any]:
+        """Stop sampling and write the profile's folded stacks to disk"""
+        with self._lock:
+            if self._active.get(profile.thread_id) is profile:
+                del self._active[profile.thread_id]
+        profile.duration_s = time.time() - profile.started
+        try:
+            profile.file = self._write(profile)
+        except OSError as e:
+            profile.file = None
+            logger.warning("Could not write profile %s: %s", profile.id, e)
+        summary = profile.to_dict()
+        with self._lock:
+            self._recent.append(summary)
+        return summary
+
+    def _run(self):
+        while True:
+            # Sampling under the lock means a stopped profile is never written to again
+            with self._lock:
+                if not self._active:
+                    self._sampler = None
+                    return
+                frames = sys._current_frames()
+                for profile in self._active.values():
+                    frame = frames.get(profile.thread_id)
+                    if frame is not None:
+                        profile.stacks[fold_stack(frame)] += 1
+                        profile.samples += 1
+                frames = frame = None  # release the sampled frames
+            time.sleep(self.interval)
+
+    def _write(self, profile: Profile) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        slug = _SLUG.sub('-', profile.path).strip('-') or 'root'
+        path = os.path.join(self.directory, f"{profile.id}-{profile.method}-{slug}.folded")
+        with open(path, 'w', encoding='utf-8') as profile_file:
+            for stack, count in profile.stacks.most_common():
+                profile_file.write(f"{stack} {count}\n")
+        self._prune()
+        return path
+
+    def _prune(self):
+        """Keep only the newest ``max_files`` profiles"""
+        files = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith('.folded')),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in files[:-self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def profile_path(self, profile_id: str) -> Optional[str]:
+        """File of a recent profile"""
+        with self._lock:
+            for summary in self._recent:
+                if summary['id'] == profile_id:
+                    return summary['file']
+        return None
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'interval_ms': self.interval * 1000.0,
+                'header': PROFILE_HEADER,
+                'armed': [
+                    {**rule, 'expires_in_s': round(rule['expires'] - now, 1)}
+                    for rule in self._rules if rule['remaining'] > 0 and rule['expires'] > now
+                ],
+                'active': [profile.id for profile in self._active.values()],
+                'recent': list(reversed(self._recent))
+            }
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open('/proc/self/statm', 'r') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class MemoryTracker:
+    """tracemalloc snapshots of the top allocation sites and diffs against a baseline"""
+
+    FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>')
+    )
+    KEY_TYPES = ('lineno', 'filename', 'traceback')
+
+    def __init__(self, frames: int = DEFAULT_TRACEMALLOC_FRAMES):
+        self.frames = frames
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._baseline_taken: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def start(self, frames: Optional[int] = None) -> Dict[str, Any]:
+        """Start tracing allocations and take the baseline snapshot"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames or self.frames)
+            self._set_baseline()
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop tracing and release the snapshots"""
+        with self._lock:
+            tracemalloc.stop()
+            self._baseline = None
+            self._baseline_taken = None
+        return self.status()
+
+    def _set_baseline(self):
+        self._baseline = self._snapshot()
+        self._baseline_taken = time.time()
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError('Allocation tracing is off; start it first')
+        return tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+
+    def _check_key_type(self, key_type: str):
+        if key_type not in self.KEY_TYPES:
+            raise ValueError(f"key_type must be one of: {', '.join(self.KEY_TYPES)}")
+
+    def top(self, limit: int = 20, key_type: str = 'lineno') -> Dict[str, Any]:
+        """Largest allocation sites right now"""
+        self._check_key_type(key_type)
+        with self._lock:
+            snapshot = self._snapshot()
+        stats = snapshot.statistics(key_type)
+        return {
+            **self.status(),
+            'sites': [self._site(stat) for stat in stats[:limit]]
+        }
+
+    def diff(self, limit: int = 20, key_type: str = 'lineno', rebase: bool = False) -> Dict[str, Any]:
+        """Allocation sites that grew most since the baseline; ``rebase`` makes now the new baseline"""
+        self._check_key_type(key_type)
+        with self._lock:
+            snapshot = self._snapshot()
+            baseline, baseline_taken = self._baseline, self._baseline_taken
+            if rebase or baseline is None:
+                self._baseline, self._baseline_taken = snapshot, time.time()
+        stats = snapshot.compare_to(baseline, key_type) if baseline is not None else []
+        return {
+            **self.status(),
+            'since': baseline_taken,
+            'size_diff_kb': round(sum(stat.size_diff for stat in stats) / 1024, 1),
+            'sites': [self._site(stat) for stat in stats[:limit]]
+        }
+
+    @staticmethod
+    def _site(stat) -> Dict[str, Any]:
+        frame = stat.traceback[0]
+        site = {
+            'site': f"{frame.filename}:{frame.lineno}",
+            'line': linecache.getline(frame.filename, frame.lineno).strip(),
+            'size_kb': round(stat.size / 1024, 1),
+            'count': stat.count
+        }
+        if hasattr(stat, 'size_diff'):
+            site['size_diff_kb'] = round(stat.size_diff / 1024, 1)
+            site['count_diff'] = stat.count_diff
+        if len(stat.traceback) > 1:
+            site['traceback'] = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+        return site
+
+    def status(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            'tracing': tracing,
+            'frames': tracemalloc.get_traceback_limit() if tracing else self.frames,
+            'traced_kb': round(current / 1024, 1),
+            'traced_peak_kb': round(peak / 1024, 1),
+            'rss_bytes': _rss_bytes()
+        }
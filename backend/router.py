@@ -0,0 +1,309 @@
+"""
+Automatic Model Router
+Picks a provider and model for ``provider: "auto"`` requests from the prompt
+size, requested output length, observed latency and error rate, and a
+per-model cost table, under a latency or cost objective.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from llm_providers.base import ChatMessage
+
+AUTO_PROVIDER = 'auto'
+OBJECTIVES = ('balanced', 'latency', 'cost')
+LOCAL_PROVIDERS = frozenset({'ollama', 'lmstudio', 'koboldcpp'})
+
+# Characters per token used to estimate prompt and reply sizes
+CHARS_PER_TOKEN = 4
+DEFAULT_MAX_TOKENS = 512
+# Weight of the newest observation in the latency and error-rate averages
+EWMA_ALPHA = 0.2
+# Models failing more often than this are skipped while any healthier model fits
+MAX_ERROR_RATE = 0.5
+# Error rates decay by half over this many seconds without calls, so a model that
+# failed once is tried again after an outage instead of being excluded forever
+ERROR_HALF_LIFE_S = 300.0
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    """Static routing facts about a model"""
+    input_cost: float  # USD per million prompt tokens
+    output_cost: float  # USD per million completion tokens
+    context_window: int  # tokens
+    tokens_per_sec: float  # prior generation speed until real calls are observed
+    first_token_s: float = 0.5  # prior time to first token
+
+
+# Prices as published by the vendors; override or extend per provider with a
+# ``model_costs`` mapping in the provider configuration.
+DEFAULT_MODEL_PROFILES: Dict[Tuple[str, str], ModelProfile] = {
+    ('openai', 'gpt-4'): ModelProfile(30.0, 60.0, 8192, 20.0, 0.8),
+    ('openai', 'gpt-4-turbo'): ModelProfile(10.0, 30.0, 128000, 30.0, 0.7),
+    ('openai', 'gpt-4-turbo-preview'): ModelProfile(10.0, 30.0, 128000, 30.0, 0.7),
+    ('openai', 'gpt-3.5-turbo'): ModelProfile(0.5, 1.5, 16385, 80.0, 0.4),
+    ('openai', 'gpt-3.5-turbo-16k'): ModelProfile(3.0, 4.0, 16385, 80.0, 0.4),
+    ('anthropic', 'claude-3-opus-20240229'): ModelProfile(15.0, 75.0, 200000, 25.0, 1.5),
+    ('anthropic', 'claude-3-sonnet-20240229'): ModelProfile(3.0, 15.0, 200000, 50.0, 0.8),
+    ('anthropic', 'claude-3-haiku-20240307'): ModelProfile(0.25, 1.25, 200000, 120.0, 0.4),
+    ('anthropic', 'claude-2.1'): ModelProfile(8.0, 24.0, 200000, 30.0, 1.0),
+    ('anthropic', 'claude-2.0'): ModelProfile(8.0, 24.0, 100000, 30.0, 1.0),
+    ('google', 'gemini-pro'): ModelProfile(0.5, 1.5, 32760, 60.0, 0.6),
+    ('google', 'gemini-1.5-pro'): ModelProfile(1.25, 5.0, 2000000, 50.0, 0.9),
+    ('google', 'gemini-1.5-flash'): ModelProfile(0.075, 0.3, 1000000, 150.0, 0.4),
+    ('openrouter', 'anthropic/claude-3.5-sonnet'): ModelProfile(3.0, 15.0, 200000, 50.0, 1.0),
+    ('openrouter', 'openai/gpt-4o'): ModelProfile(2.5, 10.0, 128000, 70.0, 0.7),
+    ('openrouter', 'meta-llama/llama-3.1-70b-instruct'): ModelProfile(0.4, 0.4, 131072, 40.0, 0.8),
+    ('openrouter', 'deepseek/deepseek-r1-0528:free'): ModelProfile(0.0, 0.0, 163840, 20.0, 2.0),
+    ('openrouter', 'mistralai/mixtral-8x22b-instruct'): ModelProfile(0.9, 0.9, 65536, 50.0, 0.8),
+}
+
+# Local servers cost nothing per token but are usually slower and run with a small context
+LOCAL_MODEL_PROFILE = ModelProfile(0.0, 0.0, 8192, 25.0, 0.3)
+
+
+@dataclass
+class ModelStats:
+    """Exponentially weighted observations of one provider/model pair"""
+    calls: int = 0
+    errors: int = 0
+    first_token_s: Optional[float] = None
+    tokens_per_sec: Optional[float] = None
+    error_rate: float = 0.0
+    updated_at: float = 0.0
+
+    def current_error_rate(self, now: float) -> float:
+        """Error rate decayed for the time since the last observation"""
+        if not self.error_rate:
+            return 0.0
+        return self.error_rate * 0.5 ** ((now - self.updated_at) / ERROR_HALF_LIFE_S)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'error_rate': round(self.current_error_rate(time.time()), 4),
+            'first_token_s': round(self.first_token_s, 4) if self.first_token_s is not None else None,
+            'tokens_per_sec': round(self.tokens_per_sec, 2) if self.tokens_per_sec is not None else None
+        }
+
+
+@dataclass
+class RoutingDecision:
+    """The target picked for an auto-routed request and why"""
+    provider: str
+    model: str
+    objective: str
+    reason: str
+    estimated_latency_s: float
+    estimated_cost_usd: float
+    prompt_tokens: int
+    candidates: List[Dict[str, Any]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'provider': self.provider,
+            'model': self.model,
+            'objective': self.objective,
+            'reason': self.reason,
+            'estimated_latency_s': round(self.estimated_latency_s, 3),
+            'estimated_cost_usd': round(self.estimated_cost_usd, 6),
+            'prompt_tokens': self.prompt_tokens,
+            'candidates': self.candidates
+        }
+
+
+class RoutingError(ValueError):
+    """Raised when no configured model can serve an auto-routed request"""
+
+
+def estimate_tokens(messages: Iterable[ChatMessage]) -> int:
+    """Rough prompt token count from message lengths"""
+    return sum(len(msg.content) for msg in messages) // CHARS_PER_TOKEN + 1
+
+
+def _ewma(previous: Optional[float], value: float) -> float:
+    return value if previous is None else previous + EWMA_ALPHA * (value - previous)
+
+
+class ModelRouter:
+    """Chooses a provider/model per request and learns from every completed call"""
+
+    def __init__(self, profiles: Optional[Mapping[Tuple[str, str], ModelProfile]] = None):
+        self.profiles = dict(profiles or DEFAULT_MODEL_PROFILES)
+        self._stats: Dict[Tuple[str, str], ModelStats] = {}
+        self._lock = threading.Lock()
+
+    # --- observations ----------------------------------------------------------
+
+    def record(self, provider: str, model: Optional[str], latency: float, output_tokens: int = 0,
+               first_token_s: Optional[float] = None, error: bool = False):
+        """Fold one finished call into the model's speed and error-rate averages"""
+        if not model:
+            return
+        with self._lock:
+            stats = self._stats.setdefault((provider, model), ModelStats())
+            now = time.time()
+            stats.calls += 1
+            previous = stats.current_error_rate(now) if stats.calls > 1 else None
+            stats.error_rate = _ewma(previous, 1.0 if error else 0.0)
+            stats.updated_at = now
+            if error:
+                stats.errors += 1
+                return
+            if first_token_s is not None:
+                stats.first_token_s = _ewma(stats.first_token_s, first_token_s)
+            if output_tokens > 0:
+                first_token = stats.first_token_s
+                if first_token is None:
+                    first_token = self.profile(provider, model).first_token_s
+                generation_time = max(latency - first_token, 1e-3)
+                stats.tokens_per_sec = _ewma(stats.tokens_per_sec, output_tokens / generation_time)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {f"{provider}/{model}": stats.to_dict() for (provider, model), stats in self._stats.items()}
+
+    # --- routing ---------------------------------------------------------------
+
+    def profile(self, provider: str, model: str, config: Optional[Mapping[str, Any]] = None) -> ModelProfile:
+        """Cost and speed facts for a model, preferring the provider configuration's ``model_costs``"""
+        overrides = (config or {}).get('model_costs') or {}
+        override = overrides.get(model)
+        if override:
+            base = self.profiles.get((provider, model), LOCAL_MODEL_PROFILE)
+            return ModelProfile(
+                input_cost=float(override.get('input', base.input_cost)),
+                output_cost=float(override.get('output', base.output_cost)),
+                context_window=int(override.get('context_window', base.context_window)),
+                tokens_per_sec=float(override.get('tokens_per_sec', base.tokens_per_sec)),
+                first_token_s=float(override.get('first_token_s', base.first_token_s))
+            )
+        if (provider, model) in self.profiles:
+            return self.profiles[(provider, model)]
+        return LOCAL_MODEL_PROFILE
+
+    def candidate_models(self, provider: str, config: Mapping[str, Any]) -> List[str]:
+        """Models of a provider the router may pick"""
+        if config.get('routing_models'):
+            return list(config['routing_models'])
+        if provider in LOCAL_PROVIDERS:
+            # Listed local models may not be pulled; only the default is known to exist
+            return [config['default_model']] if config.get('default_model') else []
+        overrides = config.get('model_costs') or {}
+        models = [
+            model for model in config.get('available_models', [])
+            if (provider, model) in self.profiles or model in overrides
+        ]
+        if not models and config.get('default_model'):
+            models = [config['default_model']]
+        return models
+
+    def route(
+        self,
+        providers: Mapping[str, Mapping[str, Any]],
+        messages: List[ChatMessage],
+        max_tokens: Optional[int] = None,
+        objective: str = 'balanced',
+        max_latency_s: Optional[float] = None,
+        max_cost_usd: Optional[float] = None
+    ) -> RoutingDecision:
+        """
+        Pick the provider and model for a request
+
+        Args:
+            providers: Configurations of the providers that are usable right now
+            messages: The request's messages, used to estimate the prompt size
+            max_tokens: Requested completion length
+            objective: 'latency', 'cost' or 'balanced'
+            max_latency_s: Optional latency budget for the whole call
+            max_cost_usd: Optional cost budget for the whole call
+
+        Raises:
+            RoutingError: If no model fits the prompt and the budgets
+        """
+        if objective not in OBJECTIVES:
+            raise RoutingError(f"Unknown routing objective '{objective}', expected one of {', '.join(OBJECTIVES)}")
+
+        prompt_tokens = estimate_tokens(messages)
+        output_tokens = max_tokens or DEFAULT_MAX_TOKENS
+        estimates = []
+        now = time.time()
+        with self._lock:
+            for provider, config in providers.items():
+                for model in self.candidate_models(provider, config):
+                    profile = self.profile(provider, model, config)
+                    if prompt_tokens + output_tokens > profile.context_window:
+                        continue
+                    stats = self._stats.get((provider, model), ModelStats())
+                    first_token = stats.first_token_s if stats.first_token_s is not None else profile.first_token_s
+                    tokens_per_sec = stats.tokens_per_sec or profile.tokens_per_sec
+                    # A failed attempt is retried, so unreliable models cost proportionally more
+                    error_rate = stats.current_error_rate(now)
+                    retry_factor = 1.0 / max(1.0 - error_rate, 0.05)
+                    estimates.append({
+                        'provider': provider,
+                        'model': model,
+                        'latency_s': (first_token + output_tokens / tokens_per_sec) * retry_factor,
+                        'cost_usd': (prompt_tokens * profile.input_cost
+                                     + output_tokens * profile.output_cost) / 1e6 * retry_factor,
+                        'error_rate': error_rate
+                    })
+
+        if not estimates:
+            raise RoutingError(f"No configured model has a context window for ~{prompt_tokens + output_tokens} tokens")
+
+        healthy = [estimate for estimate in estimates if estimate['error_rate'] <= MAX_ERROR_RATE] or estimates
+        within_budget = [
+            estimate for estimate in healthy
+            if (max_latency_s is None or estimate['latency_s'] <= max_latency_s)
+            and (max_cost_usd is None or estimate['cost_usd'] <= max_cost_usd)
+        ]
+        if not within_budget:
+            raise RoutingError(
+                f"No model meets the budget (max_latency_s={max_latency_s}, max_cost_usd={max_cost_usd}) "
+                f"for ~{prompt_tokens} prompt tokens and {output_tokens} output tokens"
+            )
+
+        chosen = min(within_budget, key=lambda estimate: self._score(estimate, within_budget, objective))
+        reason = (
+            f"{objective} objective: ~{prompt_tokens} prompt + {output_tokens} output tokens, "
+            f"est. {chosen['latency_s']:.2f}s and ${chosen['cost_usd']:.6f}, "
+            f"error rate {chosen['error_rate']:.0%}; best of {len(within_budget)} eligible of {len(estimates)} fitting models"
+        )
+        return RoutingDecision(
+            provider=chosen['provider'],
+            model=chosen['model'],
+            objective=objective,
+            reason=reason,
+            estimated_latency_s=chosen['latency_s'],
+            estimated_cost_usd=chosen['cost_usd'],
+            prompt_tokens=prompt_tokens,
+            candidates=[
+                {
+                    'provider': estimate['provider'],
+                    'model': estimate['model'],
+                    'latency_s': round(estimate['latency_s'], 3),
+                    'cost_usd': round(estimate['cost_usd'], 6)
+                }
+                for estimate in sorted(within_budget, key=lambda e: self._score(e, within_budget, objective))[:5]
+            ]
+        )
+
+    @staticmethod
+    def _score(estimate: Dict[str, Any], pool: List[Dict[str, Any]], objective: str) -> float:
+        if objective == 'latency':
+            return estimate['latency_s']
+        if objective == 'cost':
+            # Ties between free models go to the faster one
+            return estimate['cost_usd'] + estimate['latency_s'] * 1e-9
+        # Balanced: latency and cost each scaled to 0..1 across the eligible candidates
+        latencies = [e['latency_s'] for e in pool]
+        costs = [e['cost_usd'] for e in pool]
+        latency_range = (max(latencies) - min(latencies)) or 1.0
+        cost_range = (max(costs) - min(costs)) or 1.0
+        return ((estimate['latency_s'] - min(latencies)) / latency_range
+                + (estimate['cost_usd'] - min(costs)) / cost_range)
@@ -0,0 +1,250 @@
+"""
+Server-Side Conversation Sessions
+Memory-bounded LRU of chat histories that spills idle sessions to disk
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from llm_providers.base import ChatMessage
+
+DEFAULT_SESSION_DIR = os.getenv('SESSION_STORE_DIR', './.sessions')
+DEFAULT_SESSION_MEMORY_BYTES = int(float(os.getenv('SESSION_MEMORY_MB', '64')) * 1024 * 1024)
+DEFAULT_SESSION_IDLE_SECONDS = float(os.getenv('SESSION_IDLE_SECONDS', '900'))
+
+_SESSION_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+@dataclass
+class ChatSession:
+    """A conversation whose history is kept on the server"""
+    session_id: str
+    provider: str
+    model: Optional[str]
+    temperature: float = 0.7
+    max_tokens: Optional[int] = None
+    messages: List[ChatMessage] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    size_bytes: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    pins: int = field(default=0, repr=False, compare=False)  # holders that must not see it spilled
+
+    def to_dict(self, include_messages: bool = False) -> Dict[str, Any]:
+        info = {
+            'session_id': self.session_id,
+            'provider': self.provider,
+            'model': self.model,
+            'temperature': self.temperature,
+            'max_tokens': self.max_tokens,
+            'message_count': len(self.messages),
+            'size_bytes': self.size_bytes,
+            'created_at': self.created_at,
+            'last_used': self.last_used
+        }
+        if include_messages:
+            info['messages'] = [{'role': msg.role, 'content': msg.content} for msg in self.messages]
+        return info
+
+
+def _message_size(messages: Iterable[ChatMessage]) -> int:
+    return sum(len(msg.content) + len(msg.role) for msg in messages)
+
+
+class SessionStore:
+    """
+    LRU store of chat sessions bounded by total history size
+
+    When the in-memory histories exceed ``max_bytes``, or a session has been
+    idle for ``idle_seconds``, it is written to ``spill_dir`` and dropped from
+    memory; the next access reloads it transparently.
+    """
+
+    def __init__(
+        self,
+        spill_dir: str = DEFAULT_SESSION_DIR,
+        max_bytes: int = DEFAULT_SESSION_MEMORY_BYTES,
+        idle_seconds: float = DEFAULT_SESSION_IDLE_SECONDS
+    ):
+        self.spill_dir = spill_dir
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.RLock()
+        self.spills = 0
+        self.reloads = 0
+        os.makedirs(spill_dir, exist_ok=True)
+
+    # --- public API ------------------------------------------------------------
+
+    def create(
+        self,
+        provider: str,
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        messages: Optional[List[ChatMessage]] = None
+    ) -> ChatSession:
+        """Create a new session, optionally seeded with initial messages"""
+        session = ChatSession(
+            session_id=uuid.uuid4().hex,
+            provider=provider,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            messages=list(messages or [])
+        )
+        session.size_bytes = _message_size(session.messages)
+        with self._lock:
+            self._insert(session)
+            self._enforce_limits(keep=session.session_id)
+        return session
+
+    def get(self, session_id: str, pin: bool = False) -> Optional[ChatSession]:
+        """Return a session, reloading it from disk if it was spilled; ``pin`` keeps it in memory until ``release``"""
+        if not _SESSION_ID.match(session_id):
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            else:
+                session = self._load(session_id)
+                if session is None:
+                    return None
+                self._insert(session)
+                self.reloads += 1
+            session.last_used = time.time()
+            if pin:
+                # Pinned before the store lock is released, so no other request can spill it in between
+                session.pins += 1
+            self._enforce_limits(keep=session_id)
+            return session
+
+    def release(self, session: ChatSession):
+        """Unpin a session returned by ``get(..., pin=True)``"""
+        with self._lock:
+            session.pins -= 1
+            self._enforce_limits()
+
+    @contextmanager
+    def use(self, session_id: str) -> Iterator[Optional[ChatSession]]:
+        """A session pinned in memory for the duration of the block; None if it does not exist"""
+        session = self.get(session_id, pin=True)
+        try:
+            yield session
+        finally:
+            if session is not None:
+                self.release(session)
+
+    def append(self, session: ChatSession, messages: List[ChatMessage]):
+        """Append messages to a session's history"""
+        added = _message_size(messages)
+        with self._lock:
+            session.messages.extend(messages)
+            session.size_bytes += added
+            session.last_used = time.time()
+            current = self._sessions.get(session.session_id)
+            if current is session:
+                self._memory_bytes += added
+                self._sessions.move_to_end(session.session_id)
+            else:
+                # The session was spilled while the caller held it; the caller's copy is newest
+                if current is not None:
+                    self._remove(session.session_id)
+                self._insert(session)
+            self._enforce_limits(keep=session.session_id)
+
+    def delete(self, session_id: str) -> bool:
+        """Delete a session from memory and disk"""
+        if not _SESSION_ID.match(session_id):
+            return False
+        with self._lock:
+            found = self._remove(session_id) is not None
+            try:
+                os.remove(self._spill_path(session_id))
+                found = True
+            except OSError:
+                pass
+            return found
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            spilled = sum(1 for name in os.listdir(self.spill_dir) if name.endswith('.json'))
+            return {
+                'in_memory': len(self._sessions),
+                'memory_bytes': self._memory_bytes,
+                'max_bytes': self.max_bytes,
+                'spilled_on_disk': spilled,
+                'spills': self.spills,
+                'reloads': self.reloads
+            }
+
+    # --- internals -------------------------------------------------------------
+
+    def _insert(self, session: ChatSession):
+        self._sessions[session.session_id] = session
+        self._memory_bytes += session.size_bytes
+
+    def _remove(self, session_id: str) -> Optional[ChatSession]:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._memory_bytes -= session.size_bytes
+        return session
+
+    def _enforce_limits(self, keep: Optional[str] = None):
+        """Spill idle sessions, then least recently used ones until under the memory cap"""
+        now = time.time()
+        for session_id, session in list(self._sessions.items()):
+            if now - session.last_used < self.idle_seconds:
+                break  # LRU order: everything after this was used more recently
+            if session_id != keep and not session.pins and not session.lock.locked():
+                self._spill(session)
+
+        for session_id, session in list(self._sessions.items()):
+            if self._memory_bytes <= self.max_bytes:
+                break
+            if session_id != keep and not session.pins and not session.lock.locked():
+                self._spill(session)
+
+    def _spill_path(self, session_id: str) -> str:
+        return os.path.join(self.spill_dir, f"{session_id}.json")
+
+    def _spill(self, session: ChatSession):
+        data = session.to_dict(include_messages=True)
+        tmp_path = f"{self._spill_path(session.session_id)}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as spill_file:
+            json.dump(data, spill_file)
+        os.replace(tmp_path, self._spill_path(session.session_id))
+        self._remove(session.session_id)
+        self.spills += 1
+
+    def _load(self, session_id: str) -> Optional[ChatSession]:
+        try:
+            with open(self._spill_path(session_id), 'r', encoding='utf-8') as spill_file:
+                data = json.load(spill_file)
+        except (OSError, ValueError):
+            return None
+        # The in-memory copy is authoritative from here on
+        os.remove(self._spill_path(session_id))
+        messages = [ChatMessage(msg['role'], msg['content']) for msg in data.get('messages', [])]
+        return ChatSession(
+            session_id=session_id,
+            provider=data['provider'],
+            model=data.get('model'),
+            temperature=data.get('temperature', 0.7),
+            max_tokens=data.get('max_tokens'),
+            messages=messages,
+            created_at=data.get('created_at', time.time()),
+            last_used=data.get('last_used', time.time()),
+            size_bytes=_message_size(messages)
+        )
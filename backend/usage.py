@@ -0,0 +1,536 @@
+"""
+Token Usage Ledger
+Records tokens, latency and time to first token of every provider call in a
+fixed-size numpy ring buffer, rolls completed minutes up into per-minute and
+per-hour buckets on disk (with latency histograms, so percentiles survive the
+rollup), and answers range queries with vectorized aggregation.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USAGE_DIR = os.getenv('USAGE_LEDGER_DIR', './.usage')
+DEFAULT_RING_CAPACITY = int(os.getenv('USAGE_RING_CAPACITY', '65536'))
+DEFAULT_MINUTE_RETENTION_S = float(os.getenv('USAGE_MINUTE_RETENTION_DAYS', '7')) * 86400
+
+GROUP_FIELDS = ('provider', 'model', 'agent')
+SUM_FIELDS = ('calls', 'errors', 'input_tokens', 'output_tokens', 'cached_tokens', 'latency_sum')
+TIMING_FIELDS = ('ttft_sum', 'ttft_count', 'generation_s')
+
+# Log-spaced histogram edges in seconds, ~12% wide buckets from 10 ms to 10 min
+HIST_EDGES = np.geomspace(0.01, 600.0, 96)
+HIST_BINS = len(HIST_EDGES) + 1
+# Value reported for a percentile that falls in each bin: the bin's geometric centre
+HIST_VALUES = np.concatenate([
+    HIST_EDGES[:1], np.sqrt(HIST_EDGES[:-1] * HIST_EDGES[1:]), HIST_EDGES[-1:]
+])
+PERCENTILES = (50, 95, 99)
+
+# One row per call; labels are interned to small integer ids
+CALL_DTYPE = np.dtype([
+    ('ts', 'f8'),
+    ('provider', 'i4'),
+    ('model', 'i4'),
+    ('agent', 'i4'),
+    ('input_tokens', 'i8'),
+    ('output_tokens', 'i8'),
+    ('cached_tokens', 'i8'),
+    ('latency', 'f4'),
+    ('ttft', 'f4'),  # NaN when the call did not report a first token
+    ('error', '?')
+])
+
+# One row per (bucket start, provider, model, agent)
+BUCKET_DTYPE = np.dtype([
+    ('ts', 'f8'),
+    ('provider', 'i4'),
+    ('model', 'i4'),
+    ('agent', 'i4'),
+    ('calls', 'i8'),
+    ('errors', 'i8'),
+    ('input_tokens', 'i8'),
+    ('output_tokens', 'i8'),
+    ('cached_tokens', 'i8'),
+    ('latency_sum', 'f8'),
+    ('latency_max', 'f4'),
+    ('ttft_sum', 'f8'),
+    ('ttft_count', 'i8'),
+    ('generation_s', 'f8'),  # time spent producing output tokens, for tokens/sec
+    ('latency_hist', 'u4', (HIST_BINS,)),  # successful calls only
+    ('ttft_hist', 'u4', (HIST_BINS,))
+])
+
+
+def extract_usage(metadata: Optional[Mapping[str, Any]]) -> Dict[str, int]:
+    """Input, output and cached token counts from a ChatResponse's metadata"""
+    metadata = metadata or {}
+    usage = metadata.get('usage_metadata') or {}
+    token_usage = (metadata.get('response_metadata') or {}).get('token_usage') or {}
+    cached = (usage.get('input_token_details') or {}).get('cache_read')
+    if cached is None:
+        cached = (token_usage.get('prompt_tokens_details') or {}).get('cached_tokens')
+    return {
+        'input_tokens': int(usage.get('input_tokens') or token_usage.get('prompt_tokens') or 0),
+        'output_tokens': int(usage.get('output_tokens') or token_usage.get('completion_tokens') or 0),
+        'cached_tokens': int(cached or 0)
+    }
+
+
+def extract_first_token_s(metadata: Optional[Mapping[str, Any]]) -> Optional[float]:
+    """Server-side time to first token of a non-streamed reply, for providers that report it (Ollama)"""
+    timings = (metadata or {}).get('response_metadata') or {}
+    if timings.get('prompt_eval_duration') is None:
+        return None
+    return (timings.get('load_duration', 0) + timings['prompt_eval_duration']) / 1e9
+
+
+def _reduce(rows: np.ndarray, bucket_seconds: float) -> np.ndarray:
+    """Sum bucket rows (or raw call rows) into buckets of ``bucket_seconds``"""
+    if rows.size == 0:
+        return np.zeros(0, dtype=BUCKET_DTYPE)
+    starts = np.floor(rows['ts'] / bucket_seconds) * bucket_seconds
+    keys = np.stack([starts, rows['provider'], rows['model'], rows['agent']], axis=1)
+    unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    out = np.zeros(len(unique_keys), dtype=BUCKET_DTYPE)
+    out['ts'] = unique_keys[:, 0]
+    out['provider'] = unique_keys[:, 1]
+    out['model'] = unique_keys[:, 2]
+    out['agent'] = unique_keys[:, 3]
+
+    if rows.dtype == CALL_DTYPE:
+        ok = ~rows['error']
+        has_ttft = ok & ~np.isnan(rows['ttft'])
+        ttft = np.where(has_ttft, rows['ttft'], 0.0).astype('f8')
+        latency = rows['latency'].astype('f8')
+        counts = {
+            'calls': np.ones(rows.size, dtype='i8'),
+            'errors': rows['error'].astype('i8'),
+            'input_tokens': rows['input_tokens'],
+            'output_tokens': rows['output_tokens'],
+            'cached_tokens': rows['cached_tokens'],
+            'latency_sum': latency,
+            'ttft_sum': ttft,
+            'ttft_count': has_ttft.astype('i8'),
+            'generation_s': np.where(ok & (rows['output_tokens'] > 0), np.maximum(latency - ttft, 0.0), 0.0)
+        }
+        latency_max = rows['latency']
+        np.add.at(out['latency_hist'], (inverse[ok], np.searchsorted(HIST_EDGES, latency[ok])), 1)
+        np.add.at(out['ttft_hist'], (inverse[has_ttft], np.searchsorted(HIST_EDGES, ttft[has_ttft])), 1)
+    else:
+        counts = {name: rows[name] for name in SUM_FIELDS + TIMING_FIELDS}
+        latency_max = rows['latency_max']
+        np.add.at(out['latency_hist'], inverse, rows['latency_hist'])
+        np.add.at(out['ttft_hist'], inverse, rows['ttft_hist'])
+    for name, values in counts.items():
+        out[name] = np.bincount(inverse, weights=values, minlength=len(out))
+    np.maximum.at(out['latency_max'], inverse, latency_max)
+    return out
+
+
+def hist_percentiles(hists: np.ndarray, percentiles: Sequence[float] = PERCENTILES) -> Dict[int, np.ndarray]:
+    """Percentiles (seconds) of each row of a (groups, HIST_BINS) histogram matrix; NaN for empty rows"""
+    cumulative = np.cumsum(hists, axis=1, dtype='f8')
+    totals = cumulative[:, -1:]
+    result = {}
+    for pct in percentiles:
+        reached = cumulative >= totals * (pct / 100.0)
+        values = HIST_VALUES[np.argmax(reached, axis=1)]
+        result[pct] = np.where(totals[:, 0] > 0, values, np.nan)
+    return result
+
+
+def _rounded(value: float, digits: int = 4) -> Optional[float]:
+    return None if value is None or math.isnan(value) else round(float(value), digits)
+
+
+class UsageLedger:
+    """
+    Per-call usage ring buffer with on-disk minute/hour rollups
+
+    Calls are kept raw until their minute has passed; the rollup then folds
+    them into ``minute.npy`` and ``hour.npy`` under ``directory``. Queries
+    combine the rollups with the raw rows that are not rolled up yet.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_USAGE_DIR,
+        capacity: int = DEFAULT_RING_CAPACITY,
+        minute_retention_s: float = DEFAULT_MINUTE_RETENTION_S
+    ):
+        self.directory = directory
+        self.capacity = capacity
+        self.minute_retention_s = minute_retention_s
+        self._ring = np.zeros(capacity, dtype=CALL_DTYPE)
+        self._count = 0  # total rows ever written; the next slot is _count % capacity
+        self._rolled_until = 0.0  # calls before this timestamp live in the rollups
+        self._labels: Dict[str, Dict[str, int]] = {field: {} for field in GROUP_FIELDS}
+        self._names: Dict[str, List[str]] = {field: [] for field in GROUP_FIELDS}
+        self._lock = threading.Lock()
+        self._rollup_stop: Optional[threading.Event] = None
+        self.dropped = 0
+        os.makedirs(directory, exist_ok=True)
+        self._minutes = self._load_buckets('minute')
+        self._hours = self._load_buckets('hour')
+        self._load_labels()
+        if self._minutes.size:
+            self._rolled_until = float(self._minutes['ts'].max()) + 60.0
+
+    # --- recording -------------------------------------------------------------
+
+    def record(
+        self,
+        provider: str,
+        model: Optional[str],
+        agent: Optional[str] = None,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        cached_tokens: int = 0,
+        latency: float = 0.0,
+        error: bool = False,
+        ts: Optional[float] = None,
+        ttft: Optional[float] = None
+    ):
+        """Append one call to the ring buffer; ``ttft`` is the time to the first token when known"""
+        with self._lock:
+            oldest = self._ring[self._count % self.capacity]
+            if self._count >= self.capacity and oldest['ts'] >= self._rolled_until:
+                self.dropped += 1  # overwriting a call that was never rolled up
+            self._ring[self._count % self.capacity] = (
+                time.time() if ts is None else ts,
+                self._intern('provider', provider),
+                self._intern('model', model or ''),
+                self._intern('agent', agent or ''),
+                input_tokens,
+                output_tokens,
+                cached_tokens,
+                latency,
+                np.nan if ttft is None else ttft,
+                error
+            )
+            self._count += 1
+
+    def _intern(self, field: str, name: str) -> int:
+        ids = self._labels[field]
+        if name not in ids:
+            ids[name] = len(self._names[field])
+            self._names[field].append(name)
+        return ids[name]
+
+    def _raw_rows(self) -> np.ndarray:
+        """Copy of the valid ring buffer rows"""
+        return self._ring[:min(self._count, self.capacity)].copy()
+
+    # --- rollups ---------------------------------------------------------------
+
+    def rollup(self, now: Optional[float] = None) -> int:
+        """Fold every call from completed minutes into the minute and hour buckets"""
+        now = time.time() if now is None else now
+        cutoff = np.floor(now / 60.0) * 60.0
+        with self._lock:
+            rows = self._raw_rows()
+            pending = rows[(rows['ts'] >= self._rolled_until) & (rows['ts'] < cutoff)]
+            if pending.size == 0 and cutoff <= self._rolled_until:
+                return 0
+            new_minutes = _reduce(pending, 60.0)
+            self._minutes = _reduce(np.concatenate([self._minutes, new_minutes]), 60.0)
+            self._hours = _reduce(np.concatenate([self._hours, new_minutes]), 3600.0)
+            self._minutes = self._minutes[self._minutes['ts'] >= now - self.minute_retention_s]
+            self._rolled_until = max(self._rolled_until, cutoff)
+            minutes, hours = self._minutes, self._hours
+            labels = {field: list(names) for field, names in self._names.items()}
+
+        self._save_buckets('minute', minutes)
+        self._save_buckets('hour', hours)
+        self._save_json('labels.json', labels)
+        return int(pending.size)
+
+    def start_rollups(self, interval: float = 60.0):
+        """Roll up completed minutes periodically in a daemon thread"""
+        if self._rollup_stop is not None:
+            return
+        self._rollup_stop = threading.Event()
+
+        def run(stop: threading.Event):
+            while not stop.wait(interval):
+                try:
+                    self.rollup()
+                except Exception as e:
+                    logger.warning("Usage rollup failed: %s", e)
+
+        threading.Thread(target=run, args=(self._rollup_stop,), name='usage-rollup', daemon=True).start()
+
+    def stop_rollups(self):
+        """Stop the rollup thread"""
+        if self._rollup_stop is not None:
+            self._rollup_stop.set()
+            self._rollup_stop = None
+
+    def _bucket_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.npy")
+
+    def _load_buckets(self, name: str) -> np.ndarray:
+        try:
+            buckets = np.load(self._bucket_path(name), allow_pickle=False)
+        except (OSError, ValueError):
+            return np.zeros(0, dtype=BUCKET_DTYPE)
+        if buckets.dtype == BUCKET_DTYPE:
+            return buckets
+        # Buckets written before fields were added keep their shared columns
+        migrated = np.zeros(buckets.shape, dtype=BUCKET_DTYPE)
+        for column in buckets.dtype.names or ():
+            if column in BUCKET_DTYPE.names and buckets.dtype[column] == BUCKET_DTYPE[column]:
+                migrated[column] = buckets[column]
+        return migrated
+
+    def _save_buckets(self, name: str, buckets: np.ndarray):
+        tmp_path = f"{self._bucket_path(name)}.tmp"
+        with open(tmp_path, 'wb') as bucket_file:
+            np.save(bucket_file, buckets, allow_pickle=False)
+        os.replace(tmp_path, self._bucket_path(name))
+
+    def _save_json(self, filename: str, data: Any):
+        path = os.path.join(self.directory, filename)
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as json_file:
+            json.dump(data, json_file)
+        os.replace(f"{path}.tmp", path)
+
+    def _load_labels(self):
+        try:
+            with open(os.path.join(self.directory, 'labels.json'), 'r', encoding='utf-8') as labels_file:
+                labels = json.load(labels_file)
+        except (OSError, ValueError):
+            return
+        for field in GROUP_FIELDS:
+            for name in labels.get(field, []):
+                self._intern(field, name)
+
+    # --- queries ---------------------------------------------------------------
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        agent: Optional[str] = None,
+        group_by: Sequence[str] = (),
+        interval: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Aggregate usage over ``[start, end)``
+
+        Args:
+            start, end: Unix timestamps; default to the last hour
+            provider, model, agent: Optional exact-match filters
+            group_by: Any of 'provider', 'model', 'agent'
+            interval: Optional series bucket size in seconds (rounded up to the rollup granularity)
+
+        Returns:
+            Totals, plus one row per group and interval when requested
+        """
+        end = time.time() if end is None else end
+        start = end - 3600.0 if start is None else start
+        rows, granularity, names = self._select(start, end, provider, model, agent, group_by)
+        result = {
+            'start': start,
+            'end': end,
+            'granularity_s': granularity,
+            'totals': self._summarize(rows)
+        }
+        if group_by or interval:
+            result['groups'] = self._grouped(rows, list(group_by), interval, granularity, names)
+        return result
+
+    def _select(self, start: float, end: float, provider: Optional[str], model: Optional[str],
+                agent: Optional[str], group_by: Sequence[str]):
+        """Bucket rows in ``[start, end)`` matching the filters, their granularity and the label names"""
+        unknown = set(group_by) - set(GROUP_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot group usage by: {', '.join(sorted(unknown))}")
+
+        with self._lock:
+            raw = self._raw_rows()
+            raw = raw[raw['ts'] >= self._rolled_until]
+            # Minute buckets while they are retained, hour buckets for older ranges
+            use_minutes = start >= time.time() - self.minute_retention_s
+            buckets = self._minutes if use_minutes else self._hours
+            names = {field: list(values) for field, values in self._names.items()}
+            filters = {}
+            for field, value in (('provider', provider), ('model', model), ('agent', agent)):
+                if value is not None:
+                    filters[field] = self._labels[field].get(value, -1)
+        granularity = 60.0 if use_minutes else 3600.0
+
+        rows = np.concatenate([buckets, _reduce(raw, granularity)])
+        mask = (rows['ts'] >= start) & (rows['ts'] < end)
+        for field, label_id in filters.items():
+            mask &= rows[field] == label_id
+        return rows[mask], granularity, names
+
+    def performance(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        agent: Optional[str] = None,
+        group_by: Sequence[str] = (),
+        points: int = 120
+    ) -> Dict[str, Any]:
+        """
+        Latency and time-to-first-token percentiles, tokens/sec, cache hit and
+        error rates over ``[start, end)``
+
+        Percentiles come from the histograms stored with each bucket, so they
+        are accurate to the histogram bin width (~12%) at any range.
+
+        Args:
+            start, end: Unix timestamps; default to the last hour
+            provider, model, agent: Optional exact-match filters
+            group_by: Any of 'provider', 'model', 'agent'
+            points: Maximum number of series points per group; the series
+                interval is widened (in rollup granularity steps) to fit
+
+        Returns:
+            Totals, one row per group, and a downsampled series per group
+        """
+        end = time.time() if end is None else end
+        start = end - 3600.0 if start is None else start
+        rows, granularity, names = self._select(start, end, provider, model, agent, group_by)
+        group_by = list(group_by)
+        interval = max(math.ceil((end - start) / max(points, 1) / granularity), 1) * granularity
+        return {
+            'start': start,
+            'end': end,
+            'granularity_s': granularity,
+            'interval_s': interval,
+            'totals': self._performance(rows, [], None, names)[0] if rows.size else self._performance_row({}),
+            'groups': self._performance(rows, group_by, None, names),
+            'series': self._performance(rows, group_by, interval, names)
+        }
+
+    @staticmethod
+    def _performance_row(sums: Dict[str, float], percentiles: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        calls = sums.get('calls', 0)
+        errors = sums.get('errors', 0)
+        input_tokens = sums.get('input_tokens', 0)
+        generation_s = sums.get('generation_s', 0.0)
+        ttft_count = sums.get('ttft_count', 0)
+        row = {
+            'calls': int(calls),
+            'errors': int(errors),
+            'error_rate': _rounded(errors / calls) if calls else None,
+            'input_tokens': int(input_tokens),
+            'output_tokens': int(sums.get('output_tokens', 0)),
+            'cached_tokens': int(sums.get('cached_tokens', 0)),
+            'cache_hit_rate': _rounded(sums.get('cached_tokens', 0) / input_tokens) if input_tokens else None,
+            'tokens_per_s': _rounded(sums.get('output_tokens', 0) / generation_s, 2) if generation_s else None,
+            'mean_ttft_s': _rounded(sums.get('ttft_sum', 0.0) / ttft_count) if ttft_count else None
+        }
+        for name in ('latency', 'ttft'):
+            for pct in PERCENTILES:
+                row[f'{name}_p{pct}_s'] = _rounded((percentiles or {}).get(f'{name}_p{pct}', math.nan))
+        return row
+
+    def _performance(self, rows: np.ndarray, group_by: List[str], interval: Optional[float],
+                     names: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        if not rows.size:
+            return []
+        columns = [rows[field] for field in group_by]
+        if interval:
+            columns.insert(0, np.floor(rows['ts'] / interval) * interval)
+        if not columns:
+            columns = [np.zeros(rows.size)]
+        keys = np.stack(columns, axis=1)
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        sums = {
+            name: np.bincount(inverse, weights=rows[name], minlength=len(unique_keys))
+            for name in SUM_FIELDS + TIMING_FIELDS
+        }
+        percentiles = {}
+        for name in ('latency', 'ttft'):
+            hists = np.zeros((len(unique_keys), HIST_BINS), dtype='u8')
+            np.add.at(hists, inverse, rows[f'{name}_hist'])
+            for pct, values in hist_percentiles(hists).items():
+                percentiles[f'{name}_p{pct}'] = values
+
+        result = []
+        for index, key in enumerate(unique_keys):
+            row: Dict[str, Any] = {}
+            offset = 0
+            if interval:
+                row['ts'] = float(key[0])
+                offset = 1
+            for position, field in enumerate(group_by):
+                row[field] = names[field][int(key[offset + position])] or None
+            row.update(self._performance_row(
+                {name: values[index] for name, values in sums.items()},
+                {name: values[index] for name, values in percentiles.items()}
+            ))
+            result.append(row)
+        return result
+
+    @staticmethod
+    def _summarize(rows: np.ndarray) -> Dict[str, Any]:
+        calls = int(rows['calls'].sum())
+        summary = {name: int(rows[name].sum()) for name in SUM_FIELDS if name != 'latency_sum'}
+        summary['mean_latency_s'] = round(float(rows['latency_sum'].sum()) / calls, 4) if calls else None
+        summary['max_latency_s'] = round(float(rows['latency_max'].max()), 4) if rows.size else None
+        return summary
+
+    def _grouped(self, rows: np.ndarray, group_by: List[str], interval: Optional[float],
+                 granularity: float, names: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        columns = [rows[field] for field in group_by]
+        if interval:
+            interval = max(np.ceil(interval / granularity), 1.0) * granularity
+            columns.insert(0, np.floor(rows['ts'] / interval) * interval)
+        if not rows.size:
+            return []
+        keys = np.stack(columns, axis=1)
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        sums = {name: np.bincount(inverse, weights=rows[name], minlength=len(unique_keys)) for name in SUM_FIELDS}
+        latency_max = np.zeros(len(unique_keys), dtype='f4')
+        np.maximum.at(latency_max, inverse, rows['latency_max'])
+
+        groups = []
+        for index, key in enumerate(unique_keys):
+            group: Dict[str, Any] = {}
+            offset = 0
+            if interval:
+                group['ts'] = float(key[0])
+                offset = 1
+            for position, field in enumerate(group_by):
+                group[field] = names[field][int(key[offset + position])] or None
+            for name in SUM_FIELDS:
+                if name != 'latency_sum':
+                    group[name] = int(sums[name][index])
+            calls = sums['calls'][index]
+            group['mean_latency_s'] = round(float(sums['latency_sum'][index] / calls), 4) if calls else None
+            group['max_latency_s'] = round(float(latency_max[index]), 4)
+            groups.append(group)
+        return groups
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'ring_capacity': self.capacity,
+                'ring_rows': min(self._count, self.capacity),
+                'recorded': self._count,
+                'dropped_before_rollup': self.dropped,
+                'minute_buckets': int(self._minutes.size),
+                'hour_buckets': int(self._hours.size),
+                'rolled_until': self._rolled_until
+            }
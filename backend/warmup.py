@@ -0,0 +1,239 @@
+"""
+Local Model Warm-Up
+Loads the configured Ollama models when the backend starts, reloads them if
+the server evicts them, applies per-model keep_alive policies, lets operators
+pin and unpin models, and tracks cold versus warm load times. It also knows
+whether the server is reachable, so auto routing only sends requests to an
+Ollama that has answered recently.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Union
+
+from config.llm_config import LLMConfigManager, thaw_config
+from llm_providers.errors import ProviderConnectionError
+from llm_providers.factory import LLMProviderFactory
+
+logger = logging.getLogger(__name__)
+
+WARMUP_PROVIDER = 'ollama'
+PINNED_KEEP_ALIVE = -1  # Ollama keeps the model loaded until it is unpinned
+# A request whose reported model load took longer than this paid a cold start
+COLD_LOAD_THRESHOLD_S = 0.5
+# How long a reachability observation of the server is trusted before probing again
+REACHABILITY_TTL_S = float(os.getenv('OLLAMA_REACHABILITY_TTL_S', '30'))
+PROBE_TIMEOUT_S = 1.0
+
+
+@dataclass
+class ModelWarmth:
+    """Load-time history of one local model"""
+    model: str
+    cold_loads: List[float] = field(default_factory=list)
+    warm_loads: List[float] = field(default_factory=list)
+    last_warmed: Optional[float] = None
+    last_error: Optional[str] = None
+    resident: Optional[bool] = None
+
+    def observe(self, load_s: float):
+        target = self.cold_loads if load_s >= COLD_LOAD_THRESHOLD_S else self.warm_loads
+        target.append(load_s)
+        del target[:-100]  # bounded history
+
+    def to_dict(self) -> Dict[str, Any]:
+        def mean(values: List[float]) -> Optional[float]:
+            return round(sum(values) / len(values), 3) if values else None
+        return {
+            'model': self.model,
+            'resident': self.resident,
+            'cold_loads': len(self.cold_loads),
+            'warm_loads': len(self.warm_loads),
+            'mean_cold_load_s': mean(self.cold_loads),
+            'mean_warm_load_s': mean(self.warm_loads),
+            'last_warmed': self.last_warmed,
+            'last_error': self.last_error
+        }
+
+
+class WarmupManager:
+    """Keeps the configured local models resident on the Ollama server"""
+
+    def __init__(self, config_manager: LLMConfigManager, check_interval: float = 60.0):
+        self.config_manager = config_manager
+        self.check_interval = check_interval
+        self._models: Dict[str, ModelWarmth] = {}
+        self._lock = threading.Lock()
+        self._stop: Optional[threading.Event] = None
+        self._reachable: Optional[bool] = None
+        self._reachable_at = 0.0  # time.monotonic() of the last observation
+
+    def _provider(self):
+        snapshot = self.config_manager.snapshot()
+        return LLMProviderFactory.get_provider(
+            WARMUP_PROVIDER, snapshot.get(WARMUP_PROVIDER), snapshot.provider_version(WARMUP_PROVIDER)
+        )
+
+    def _config(self) -> Mapping[str, Any]:
+        return self.config_manager.get_config(WARMUP_PROVIDER)
+
+    def _warmth(self, model: str) -> ModelWarmth:
+        with self._lock:
+            return self._models.setdefault(model, ModelWarmth(model))
+
+    def warm_models(self) -> List[str]:
+        """Models that should stay resident: the configured warm set plus pinned models"""
+        config = self._config()
+        models = list(config.get('warm_models') or [])
+        for model, options in (config.get('model_options') or {}).items():
+            if options.get('pinned') and model not in models:
+                models.append(model)
+        return models
+
+    # --- warm-up ---------------------------------------------------------------
+
+    def warm(self, model: str) -> Dict[str, Any]:
+        """Load one model and record whether it was cold"""
+        warmth = self._warmth(model)
+        try:
+            result = self._provider().load_model(model)
+        except Exception as e:
+            warmth.last_error = str(e)
+            logger.warning("Warming %s failed: %s", model, e)
+            return {'model': model, 'error': str(e)}
+        self._note_reachable(True)
+        warmth.observe(result['load_s'])
+        warmth.last_warmed = time.time()
+        warmth.last_error = None
+        warmth.resident = True
+        return {'model': model, 'cold': result['load_s'] >= COLD_LOAD_THRESHOLD_S, **result}
+
+    def warm_all(self) -> List[Dict[str, Any]]:
+        """Load every model in the warm set that is not resident"""
+        try:
+            running = set(self._provider().running_models())
+            self._note_reachable(True)
+        except Exception as e:
+            logger.warning("Listing running Ollama models failed: %s", e)
+            self._note_reachable(False)
+            running = set()
+        results = []
+        for model in self.warm_models():
+            self._warmth(model).resident = model in running
+            if model not in running:
+                results.append(self.warm(model))
+        return results
+
+    def start(self):
+        """Warm the configured models now and re-check residency in a daemon thread"""
+        if self._stop is not None:
+            return
+        self._stop = threading.Event()
+
+        def run(stop: threading.Event):
+            while True:
+                try:
+                    if self.warm_models():
+                        self.warm_all()
+                except Exception as e:
+                    logger.warning("Model warm-up failed: %s", e)
+                if stop.wait(self.check_interval):
+                    return
+
+        threading.Thread(target=run, args=(self._stop,), name='model-warmup', daemon=True).start()
+
+    def stop(self):
+        """Stop the residency checks"""
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+
+    # --- reachability ----------------------------------------------------------
+
+    def _note_reachable(self, reachable: bool):
+        with self._lock:
+            self._reachable = reachable
+            self._reachable_at = time.monotonic()
+
+    def reachable(self) -> bool:
+        """Whether the server answered recently; probes it when the last observation is stale"""
+        with self._lock:
+            if self._reachable is not None and time.monotonic() - self._reachable_at < REACHABILITY_TTL_S:
+                return self._reachable
+        try:
+            self._provider().running_models(timeout=PROBE_TIMEOUT_S)
+        except Exception as e:
+            logger.info("Ollama is not reachable: %s", e)
+            self._note_reachable(False)
+            return False
+        self._note_reachable(True)
+        return True
+
+    # --- observations from real requests ---------------------------------------
+
+    def observe_failure(self, error: Exception):
+        """A request that could not connect marks the server unreachable until it answers again"""
+        if isinstance(error, ProviderConnectionError):
+            self._note_reachable(False)
+
+    def observe_response(self, model: str, metadata: Optional[Mapping[str, Any]]):
+        """Record the load time Ollama reported for a chat request"""
+        self._note_reachable(True)
+        load_ns = ((metadata or {}).get('response_metadata') or {}).get('load_duration')
+        if load_ns is not None:
+            self._warmth(model).observe(load_ns / 1e9)
+
+    # --- pinning ---------------------------------------------------------------
+
+    def _set_model_options(self, model: str, options: Optional[Dict[str, Any]]):
+        model_options = thaw_config(self._config().get('model_options') or {})
+        if options:
+            model_options[model] = options
+        else:
+            model_options.pop(model, None)
+        self.config_manager.update_config(WARMUP_PROVIDER, {'model_options': model_options})
+
+    def pin(self, model: str) -> Dict[str, Any]:
+        """Keep a model loaded until it is unpinned"""
+        options = thaw_config((self._config().get('model_options') or {}).get(model) or {})
+        options.setdefault('policy_keep_alive', options.get('keep_alive'))
+        options.update({'keep_alive': PINNED_KEEP_ALIVE, 'pinned': True})
+        self._set_model_options(model, options)
+        return self.warm(model)
+
+    def unpin(self, model: str, unload: bool = False) -> Dict[str, Any]:
+        """Return a model to its configured keep_alive policy, optionally unloading it now"""
+        options = thaw_config((self._config().get('model_options') or {}).get(model) or {})
+        keep_alive: Union[str, int, None] = options.pop('policy_keep_alive', None)
+        options.pop('pinned', None)
+        options.pop('keep_alive', None)
+        if keep_alive is not None:
+            options['keep_alive'] = keep_alive
+        self._set_model_options(model, options)
+        if unload:
+            self._provider().unload_model(model)
+            self._warmth(model).resident = False
+        elif model in self.warm_models() or self._warmth(model).resident:
+            # Re-send the model's normal keep_alive so the server's unload timer restarts from it
+            self.warm(model)
+        return {'model': model, 'pinned': False, 'keep_alive': keep_alive, 'unloaded': unload}
+
+    def status(self) -> Dict[str, Any]:
+        config = self._config()
+        model_options = config.get('model_options') or {}
+        warm_set = self.warm_models()
+        with self._lock:
+            models = {name: warmth.to_dict() for name, warmth in self._models.items()}
+        for name in warm_set:
+            models.setdefault(name, ModelWarmth(name).to_dict())
+        for name, info in models.items():
+            options = model_options.get(name) or {}
+            info['pinned'] = bool(options.get('pinned'))
+            info['keep_alive'] = options.get('keep_alive', config.get('keep_alive'))
+            info['in_warm_set'] = name in warm_set
+        with self._lock:
+            reachable = self._reachable
+        return {'default_keep_alive': config.get('keep_alive'), 'reachable': reachable, 'models': models}
@@ -0,0 +1,4 @@
+"""
+Studio Lite Benchmarks
+Local mock LLM server and load generator for backend throughput measurements
+"""
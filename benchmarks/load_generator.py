@@ -0,0 +1,240 @@
+"""
+Backend Load Generator
+Drives the Flask backend's /chat endpoint at a fixed concurrency and reports
+requests/sec, latency percentiles, time-to-first-token and error rates as JSON.
+With ``--stream`` requests use NDJSON streaming, so time-to-first-token is the
+time to the first streamed delta.
+
+Usage:
+    python -m benchmarks.load_generator --provider openai --model mock-model \\
+        --setup-base-url http://127.0.0.1:8001/v1 --concurrency 16 --requests 500
+
+``--setup-base-url`` points the chosen provider at a mock server (see
+``benchmarks.mock_llm_server``) before the run starts.
+"""
+
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+
+@dataclass
+class RequestResult:
+    """Outcome of a single /chat request"""
+    status: int  # HTTP status, or 0 for a connection failure
+    latency: float  # seconds until the full body was read
+    ttft: Optional[float]  # seconds until the first body byte
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def distribution_ms(values: List[float]) -> Dict[str, Optional[float]]:
+    """Summary statistics in milliseconds"""
+    ordered = sorted(values)
+    if not ordered:
+        return {'mean': None, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+    return {
+        'mean': round(sum(ordered) / len(ordered) * 1000.0, 2),
+        'p50': round(percentile(ordered, 50) * 1000.0, 2),
+        'p95': round(percentile(ordered, 95) * 1000.0, 2),
+        'p99': round(percentile(ordered, 99) * 1000.0, 2),
+        'max': round(ordered[-1] * 1000.0, 2)
+    }
+
+
+class LoadGenerator:
+    """Closed-loop load generator: each worker sends its next request as soon as the last one finishes"""
+
+    def __init__(self, base_url: str, payload: Dict[str, Any], concurrency: int,
+                 total_requests: Optional[int] = None, duration: Optional[float] = None,
+                 timeout: float = 120.0, headers: Optional[Dict[str, str]] = None):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or 'http'
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port
+        self.path_prefix = parts.path.rstrip('/')
+        self.body = json.dumps(payload).encode('utf-8')
+        self.stream = bool(payload.get('stream'))
+        self.concurrency = max(1, concurrency)
+        self.total_requests = total_requests
+        self.duration = duration
+        self.timeout = timeout
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+        self._lock = threading.Lock()
+        self._issued = 0
+        self._deadline: Optional[float] = None
+        self.results: List[RequestResult] = []
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    def _claim(self) -> bool:
+        """Reserve the next request slot, honouring the request count and duration limits"""
+        with self._lock:
+            if self.total_requests is not None and self._issued >= self.total_requests:
+                return False
+            if self._deadline is not None and time.perf_counter() >= self._deadline:
+                return False
+            self._issued += 1
+            return True
+
+    def _send(self, connection: http.client.HTTPConnection) -> RequestResult:
+        started = time.perf_counter()
+        connection.request('POST', f"{self.path_prefix}/chat", body=self.body, headers=self.headers)
+        response = connection.getresponse()
+        first = response.read(1)
+        ttft = time.perf_counter() - started if first else None
+        body = first + response.read()
+        latency = time.perf_counter() - started
+        error = None if 200 <= response.status < 300 else response.reason
+        if error is None and self.stream:
+            # A stream that fails after it started still answers 200; its last line says so
+            lines = body.strip().splitlines()
+            last = json.loads(lines[-1]) if lines else {}
+            if last.get('type') != 'done':
+                return RequestResult(status=502, latency=latency, ttft=ttft, error=last.get('error', 'incomplete stream'))
+        return RequestResult(status=response.status, latency=latency, ttft=ttft, error=error)
+
+    def _worker(self):
+        connection = self._connection()
+        try:
+            while self._claim():
+                started = time.perf_counter()
+                try:
+                    result = self._send(connection)
+                except (OSError, http.client.HTTPException) as e:
+                    connection.close()
+                    connection = self._connection()
+                    result = RequestResult(status=0, latency=time.perf_counter() - started, ttft=None, error=str(e))
+                with self._lock:
+                    self.results.append(result)
+        finally:
+            connection.close()
+
+    def run(self) -> Dict[str, Any]:
+        """Run the load test and return the summary"""
+        if self.total_requests is None and self.duration is None:
+            self.total_requests = 100
+        started = time.perf_counter()
+        if self.duration is not None:
+            self._deadline = started + self.duration
+        workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return self.summary(time.perf_counter() - started)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        """Machine-readable summary of the collected results"""
+        successes = [result for result in self.results if result.ok]
+        failures = [result for result in self.results if not result.ok]
+        total = len(self.results)
+        return {
+            'requests': total,
+            'successes': len(successes),
+            'errors': len(failures),
+            'error_rate': round(len(failures) / total, 4) if total else 0.0,
+            'errors_by_status': dict(Counter(str(result.status) for result in failures)),
+            'concurrency': self.concurrency,
+            'duration_s': round(elapsed, 3),
+            'requests_per_sec': round(total / elapsed, 2) if elapsed > 0 else 0.0,
+            'successes_per_sec': round(len(successes) / elapsed, 2) if elapsed > 0 else 0.0,
+            'latency_ms': distribution_ms([result.latency for result in successes]),
+            'ttft_ms': distribution_ms([result.ttft for result in successes if result.ttft is not None])
+        }
+
+
+def configure_provider(base_url: str, provider: str, provider_base_url: str, api_key: str):
+    """Point a backend provider at a mock server through POST /config/<provider>"""
+    parts = urlsplit(base_url)
+    connection = http.client.HTTPConnection(parts.hostname or 'localhost', parts.port, timeout=10)
+    try:
+        body = json.dumps({'base_url': provider_base_url, 'api_key': api_key})
+        connection.request('POST', f"{parts.path.rstrip('/')}/config/{provider}", body=body,
+                           headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"Configuring {provider} failed with HTTP {response.status}")
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for the Studio Lite backend /chat endpoint")
+    parser.add_argument('--url', default='http://localhost:5000', help="Backend base URL")
+    parser.add_argument('--provider', default='openai')
+    parser.add_argument('--model', default=None)
+    parser.add_argument('--prompt', default='Write a haiku about fast software.')
+    parser.add_argument('--max-tokens', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=None, help="Total requests to send")
+    parser.add_argument('--duration', type=float, default=None, help="Run for this many seconds instead")
+    parser.add_argument('--warmup', type=int, default=0, help="Requests to send before measuring")
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--priority', default=None, choices=['interactive', 'batch', 'evaluation'],
+                        help="Admission priority class sent with each request")
+    parser.add_argument('--stream', action='store_true', help="Request NDJSON streaming responses")
+    parser.add_argument('--header', action='append', default=[], help="Extra request header, 'Name: value'")
+    parser.add_argument('--setup-base-url', default=None, help="Point the provider at this base URL first")
+    parser.add_argument('--setup-api-key', default='mock')
+    parser.add_argument('--output', default=None, help="Write the JSON summary to this file")
+    args = parser.parse_args()
+
+    if args.setup_base_url:
+        configure_provider(args.url, args.provider, args.setup_base_url, args.setup_api_key)
+
+    payload = {
+        'provider': args.provider,
+        'model': args.model,
+        'messages': [{'role': 'user', 'content': args.prompt}],
+        'temperature': 0.0,
+        'max_tokens': args.max_tokens
+    }
+    if args.priority:
+        payload['priority'] = args.priority
+    if args.stream:
+        payload['stream'] = True
+    headers = dict(header.split(':', 1) for header in args.header)
+    headers = {name.strip(): value.strip() for name, value in headers.items()}
+
+    if args.warmup:
+        LoadGenerator(args.url, payload, min(args.concurrency, args.warmup), total_requests=args.warmup,
+                      timeout=args.timeout, headers=headers).run()
+
+    generator = LoadGenerator(args.url, payload, args.concurrency, total_requests=args.requests,
+                              duration=args.duration, timeout=args.timeout, headers=headers)
+    summary = generator.run()
+    summary['target'] = {'url': args.url, 'provider': args.provider, 'model': args.model,
+                         'max_tokens': args.max_tokens, 'priority': args.priority, 'stream': args.stream}
+
+    output = json.dumps(summary, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as summary_file:
+            summary_file.write(output + "\n")
+    print(output)
+    return 0 if summary['successes'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
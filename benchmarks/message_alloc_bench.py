@@ -0,0 +1,111 @@
+"""
+Message Allocation Microbenchmark
+Compares memory allocated per /chat request by the previous message handling
+(per-provider conversion, debug formatting of the payload, hand-built response
+dicts) with the shared conversion layer in ``llm_providers.messages``.
+
+Usage:
+    python -m benchmarks.message_alloc_bench --messages 20 --prompt-kb 512
+"""
+
+import argparse
+import json
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+from llm_providers.base import ChatResponse
+from llm_providers.messages import parse_messages, to_langchain_messages
+
+
+@dataclass
+class LegacyChatMessage:
+    """The message dataclass as it was before __slots__"""
+    role: str
+    content: str
+
+
+def legacy_request(messages_data: List[Dict[str, str]], reply: str) -> Any:
+    """Request path before the shared conversion layer"""
+    from langchain.schema import HumanMessage, SystemMessage, AIMessage
+
+    debug_line = f"[DEBUG] messages: {messages_data}"
+    messages = []
+    for msg_data in messages_data:
+        messages.append(LegacyChatMessage(role=msg_data['role'], content=msg_data['content']))
+    langchain_messages = []
+    for msg in messages:
+        if msg.role == 'system':
+            langchain_messages.append(SystemMessage(content=msg.content))
+        elif msg.role == 'user':
+            langchain_messages.append(HumanMessage(content=msg.content))
+        elif msg.role == 'assistant':
+            langchain_messages.append(AIMessage(content=msg.content))
+    response = {'content': reply, 'model': 'bench', 'provider': 'bench', 'metadata': {}}
+    body = {
+        'response': {
+            'content': response['content'],
+            'model': response['model'],
+            'provider': response['provider'],
+            'metadata': response['metadata']
+        }
+    }
+    return debug_line, messages, langchain_messages, body
+
+
+def unified_request(messages_data: List[Dict[str, str]], reply: str) -> Any:
+    """Request path through llm_providers.messages"""
+    messages = parse_messages(messages_data)
+    langchain_messages = to_langchain_messages(messages)
+    body = {'response': ChatResponse(content=reply, model='bench', provider='bench', metadata={}).to_dict()}
+    return messages, langchain_messages, body
+
+
+def measure(request_fn: Callable, messages_data: List[Dict[str, str]], reply: str, iterations: int) -> Dict[str, float]:
+    """Average peak bytes and live blocks allocated by one request"""
+    request_fn(messages_data, reply)  # warm imports and caches
+    exclude_tracemalloc = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    peak_total = 0
+    blocks_total = 0
+    tracemalloc.start()
+    for _ in range(iterations):
+        before = tracemalloc.take_snapshot().filter_traces(exclude_tracemalloc)
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = request_fn(messages_data, reply)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot().filter_traces(exclude_tracemalloc)
+        peak_total += peak - baseline
+        blocks_total += sum(stat.count_diff for stat in after.compare_to(before, 'lineno') if stat.count_diff > 0)
+        del result
+    tracemalloc.stop()
+    return {
+        'peak_bytes_per_request': round(peak_total / iterations),
+        'allocated_blocks_per_request': round(blocks_total / iterations, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Allocations per request: legacy vs unified message model")
+    parser.add_argument('--messages', type=int, default=20, help="Messages per request")
+    parser.add_argument('--prompt-kb', type=int, default=256, help="Size of the largest message in KiB")
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    messages_data = [{'role': 'system', 'content': 'You are a benchmark assistant.'}]
+    for index in range(1, args.messages):
+        messages_data.append({'role': 'user' if index % 2 else 'assistant', 'content': f"message {index} " * 20})
+    messages_data[-1] = {'role': 'user', 'content': 'x' * (args.prompt_kb * 1024)}
+    reply = 'y' * 4096
+
+    results = {
+        'legacy': measure(legacy_request, messages_data, reply, args.iterations),
+        'unified': measure(unified_request, messages_data, reply, args.iterations),
+        'messages': args.messages,
+        'prompt_kb': args.prompt_kb
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,356 @@
+"""
+Mock LLM Server
+Speaks the OpenAI, Ollama and KoboldCpp wire formats with configurable latency,
+token rate and error injection, so backend benchmarks never call a paid vendor.
+
+Usage:
+    python -m benchmarks.mock_llm_server --port 8001 --latency-ms 200 --tokens-per-sec 50
+
+Point the backend at it, e.g. ``POST /config/openai {"base_url": "http://127.0.0.1:8001/v1",
+"api_key": "mock"}`` or ``OLLAMA_BASE_URL=http://127.0.0.1:8001``.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional
+
+WORDS = (
+    "the agents plan code files and tests while the architect reviews every module "
+    "for clarity speed and correctness before the coder writes them to disk"
+).split()
+
+
+@dataclass
+class MockSettings:
+    """Behaviour of the mock server"""
+    latency_ms: float = 100.0  # delay before the first token
+    jitter_ms: float = 0.0
+    tokens_per_sec: float = 100.0
+    output_tokens: int = 64
+    error_rate: float = 0.0
+    error_status: int = 503
+    rate_limit_rate: float = 0.0
+    retry_after: int = 1
+    model: str = "mock-model"
+
+
+class MockStats:
+    """Thread-safe request counters exposed on /mock/stats"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+
+    def incr(self, name: str):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """Request handler implementing the supported provider endpoints"""
+
+    settings: MockSettings = MockSettings()
+    stats: MockStats = MockStats()
+    aborted: Dict[str, threading.Event] = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- helpers -----------------------------------------------------------
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def _send_json(self, payload: Any, status: int = 200, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self, content_type: str):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+    def _inject_error(self) -> bool:
+        """Send an injected error response if the dice say so"""
+        settings = self.settings
+        roll = random.random()
+        if roll < settings.rate_limit_rate:
+            self.stats.incr('rate_limited')
+            self._send_json(
+                {'error': {'message': 'Rate limit exceeded (mock)', 'type': 'rate_limit'}},
+                status=429,
+                headers={'Retry-After': str(settings.retry_after)}
+            )
+            return True
+        if roll < settings.rate_limit_rate + settings.error_rate:
+            self.stats.incr('errors')
+            self._send_json({'error': {'message': 'Injected failure (mock)'}}, status=settings.error_status)
+            return True
+        return False
+
+    def _first_token_delay(self):
+        settings = self.settings
+        delay = settings.latency_ms + random.uniform(-settings.jitter_ms, settings.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000.0)
+
+    def _token_count(self, requested: Optional[int]) -> int:
+        if requested and requested > 0:
+            return min(int(requested), self.settings.output_tokens)
+        return self.settings.output_tokens
+
+    def _tokens(self, count: int, abort: Optional[threading.Event] = None) -> Iterator[str]:
+        """Yield tokens at the configured rate, stopping early if aborted"""
+        interval = 1.0 / self.settings.tokens_per_sec if self.settings.tokens_per_sec > 0 else 0.0
+        for index in range(count):
+            if abort is not None and abort.is_set():
+                return
+            if interval:
+                time.sleep(interval)
+            yield (" " if index else "") + WORDS[index % len(WORDS)]
+
+    @staticmethod
+    def _prompt_tokens(messages) -> int:
+        text = " ".join(str(message.get('content', '')) for message in messages or [])
+        return max(1, len(text) // 4)
+
+    # --- routing -----------------------------------------------------------
+
+    def do_GET(self):
+        self.stats.incr(f"GET {self.path}")
+        settings = self.settings
+        if self.path == '/v1/models':
+            self._send_json({'object': 'list', 'data': [{'id': settings.model, 'object': 'model'}]})
+        elif self.path == '/api/tags':
+            self._send_json({'models': [{'name': settings.model, 'model': settings.model}]})
+        elif self.path == '/api/ps':
+            self._send_json({'models': [{'name': settings.model, 'model': settings.model}]})
+        elif self.path == '/api/v1/model':
+            self._send_json({'result': f"koboldcpp/{settings.model}"})
+        elif self.path in ('/api/status', '/api/extra/version'):
+            self._send_json({'result': 'KoboldCpp', 'version': 'mock'})
+        elif self.path == '/mock/stats':
+            self._send_json(self.stats.snapshot())
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    def do_POST(self):
+        self.stats.incr(f"POST {self.path}")
+        payload = self._read_json()
+        routes = {
+            '/v1/chat/completions': self._openai_chat,
+            '/chat/completions': self._openai_chat,
+            '/api/chat': self._ollama_chat,
+            '/api/generate': self._ollama_generate,
+            '/api/v1/generate': self._kobold_generate,
+            '/api/extra/generate/stream': self._kobold_stream,
+            '/api/extra/abort': self._kobold_abort,
+        }
+        handler = routes.get(self.path)
+        if handler is None:
+            self._send_json({'error': 'not found'}, status=404)
+            return
+        if self.path != '/api/extra/abort' and self._inject_error():
+            return
+        handler(payload)
+
+    # --- OpenAI --------------------------------------------------------------
+
+    def _openai_chat(self, payload: Dict[str, Any]):
+        model = payload.get('model') or self.settings.model
+        count = self._token_count(payload.get('max_tokens') or payload.get('max_completion_tokens'))
+        prompt_tokens = self._prompt_tokens(payload.get('messages'))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        self._first_token_delay()
+
+        if not payload.get('stream'):
+            content = "".join(self._tokens(count))
+            self._send_json({
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': count, 'total_tokens': prompt_tokens + count}
+            })
+            return
+
+        self._start_stream('text/event-stream')
+        for token in self._tokens(count):
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        final = {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': count, 'total_tokens': prompt_tokens + count}
+        }
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    # --- Ollama --------------------------------------------------------------
+
+    def _ollama_reply(self, payload: Dict[str, Any], chat: bool):
+        model = payload.get('model') or self.settings.model
+        options = payload.get('options') or {}
+        count = self._token_count(options.get('num_predict'))
+        if chat:
+            prompt_tokens = self._prompt_tokens(payload.get('messages'))
+        else:
+            prompt_tokens = max(1, len(payload.get('prompt', '')) // 4)
+        started = time.perf_counter()
+        self._first_token_delay()
+
+        def message(content: str, done: bool) -> Dict[str, Any]:
+            body = {'model': model, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()), 'done': done}
+            if chat:
+                body['message'] = {'role': 'assistant', 'content': content}
+            else:
+                body['response'] = content
+            if done:
+                body.update({
+                    'done_reason': 'stop',
+                    'total_duration': int((time.perf_counter() - started) * 1e9),
+                    'load_duration': 0,
+                    'prompt_eval_count': prompt_tokens,
+                    'eval_count': count
+                })
+                if not chat:
+                    body['context'] = list(range(prompt_tokens + count))
+            return body
+
+        if payload.get('stream') is False:
+            self._send_json(message("".join(self._tokens(count)), True))
+            return
+
+        self._start_stream('application/x-ndjson')
+        for token in self._tokens(count):
+            self.wfile.write((json.dumps(message(token, False)) + "\n").encode('utf-8'))
+            self.wfile.flush()
+        self.wfile.write((json.dumps(message("", True)) + "\n").encode('utf-8'))
+        self.wfile.flush()
+
+    def _ollama_chat(self, payload: Dict[str, Any]):
+        self._ollama_reply(payload, chat=True)
+
+    def _ollama_generate(self, payload: Dict[str, Any]):
+        self._ollama_reply(payload, chat=False)
+
+    # --- KoboldCpp -------------------------------------------------------------
+
+    def _abort_event(self, payload: Dict[str, Any]) -> threading.Event:
+        event = threading.Event()
+        self.aborted[payload.get('genkey') or ''] = event
+        return event
+
+    def _kobold_generate(self, payload: Dict[str, Any]):
+        abort = self._abort_event(payload)
+        count = self._token_count(payload.get('max_length'))
+        self._first_token_delay()
+        text = "".join(self._tokens(count, abort))
+        self.aborted.pop(payload.get('genkey') or '', None)
+        self._send_json({'results': [{'text': text, 'finish_reason': 'abort' if abort.is_set() else 'length'}]})
+
+    def _kobold_stream(self, payload: Dict[str, Any]):
+        abort = self._abort_event(payload)
+        count = self._token_count(payload.get('max_length'))
+        self._first_token_delay()
+        self._start_stream('text/event-stream')
+        for token in self._tokens(count, abort):
+            self.wfile.write(f"event: message\ndata: {json.dumps({'token': token, 'finish_reason': None})}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        self.aborted.pop(payload.get('genkey') or '', None)
+        done = {'token': '', 'finish_reason': 'abort' if abort.is_set() else 'length'}
+        self.wfile.write(f"event: message\ndata: {json.dumps(done)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def _kobold_abort(self, payload: Dict[str, Any]):
+        event = self.aborted.get(payload.get('genkey') or '')
+        if event is not None:
+            event.set()
+        self._send_json({'success': 'true' if event is not None else 'false'})
+
+
+def create_server(host: str = '127.0.0.1', port: int = 8001, settings: Optional[MockSettings] = None) -> ThreadingHTTPServer:
+    """Create (but do not start) a mock server with its own settings and stats"""
+    handler = type('ConfiguredMockLLMHandler', (MockLLMHandler,), {
+        'settings': settings or MockSettings(),
+        'stats': MockStats(),
+        'aborted': {}
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Ollama/KoboldCpp server for benchmarks")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency-ms', type=float, default=100.0, help="Delay before the first token")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Uniform +/- jitter on the first-token delay")
+    parser.add_argument('--tokens-per-sec', type=float, default=100.0, help="Generation rate (0 = instant)")
+    parser.add_argument('--output-tokens', type=int, default=64, help="Maximum tokens per completion")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests failing with --error-status")
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument('--model', default='mock-model')
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        model=args.model
+    )
+    server = create_server(args.host, args.port, settings)
+    print(f"Mock LLM server listening on http://{args.host}:{args.port} ({settings})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,9 +3,35 @@ LLM Configuration Management
 Handles configuration for different LLM providers
 """
 
+import json
+import logging
 import os
-from typing import Dict, Any, Optional
-from dataclasses import dataclass
+import threading
+from types import MappingProxyType
+from typing import Dict, Any, Callable, List, Mapping, Optional, Set
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+_EMPTY_CONFIG: Mapping[str, Any] = MappingProxyType({})
+
+
+def freeze_config(value: Any) -> Any:
+    """Recursively convert dicts to read-only mappings and lists to tuples"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze_config(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_config(item) for item in value)
+    return value
+
+
+def thaw_config(value: Any) -> Any:
+    """Convert a frozen configuration back into plain, JSON-serialisable containers"""
+    if isinstance(value, Mapping):
+        return {key: thaw_config(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw_config(item) for item in value]
+    return value
 
 
 @dataclass
@@ -20,20 +46,69 @@ class LLMConfig:
     additional_params: Optional[Dict[str, Any]] = None
 
 
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Immutable, versioned view of every provider configuration"""
+    version: int
+    configs: Mapping[str, Mapping[str, Any]] = field(default_factory=lambda: _EMPTY_CONFIG)
+    provider_versions: Mapping[str, int] = field(default_factory=lambda: _EMPTY_CONFIG)
+    source_mtime: Optional[float] = None
+
+    def get(self, provider: str) -> Mapping[str, Any]:
+        """Read-only configuration for a provider (empty if unknown)"""
+        return self.configs.get(provider.lower(), _EMPTY_CONFIG)
+
+    def provider_version(self, provider: str) -> int:
+        """Version of a single provider's configuration"""
+        return self.provider_versions.get(provider.lower(), 0)
+
+
 class LLMConfigManager:
-    """Manages LLM provider configurations"""
+    """
+    Manages LLM provider configurations
+
+    Configuration is layered: environment defaults, then an optional YAML, TOML
+    or JSON file (``LLM_CONFIG_FILE``) that is hot-reloaded when its mtime
+    changes, then runtime updates made through the API. Readers get an
+    immutable ``ConfigSnapshot`` without locking; writers build a new snapshot
+    and swap it in atomically.
+    """
     
-    def __init__(self):
-        self.configs = {}
-        self._load_default_configs()
+    def __init__(self, config_path: Optional[str] = None):
+        self.config_path = config_path if config_path is not None else os.getenv('LLM_CONFIG_FILE')
+        self._write_lock = threading.Lock()
+        self._defaults = self._load_default_configs()
+        self._file_configs: Dict[str, Dict[str, Any]] = {}
+        self._file_mtime: Optional[float] = None
+        self._overrides: Dict[str, Dict[str, Any]] = {}
+        self._listeners: List[Callable[[Set[str]], None]] = []
+        self._watch_stop: Optional[threading.Event] = None
+        self._snapshot = ConfigSnapshot(version=0)
+        self.reload_if_changed()
+        if self._snapshot.version == 0:
+            self._publish()
+
+    @property
+    def configs(self) -> Mapping[str, Mapping[str, Any]]:
+        """All provider configurations from the current snapshot"""
+        return self._snapshot.configs
+
+    def snapshot(self) -> ConfigSnapshot:
+        """Return the current configuration snapshot (lock-free)"""
+        return self._snapshot
+
+    def add_listener(self, callback: Callable[[Set[str]], None]):
+        """Register a callback invoked with the providers whose configuration changed"""
+        self._listeners.append(callback)
     
-    def _load_default_configs(self):
+    def _load_default_configs(self) -> Dict[str, Dict[str, Any]]:
         """Load default configurations for all providers"""
-        self.configs = {
+        return {
             'openai': {
                 'api_key': os.getenv('OPENAI_API_KEY'),
                 'base_url': 'https://api.openai.com/v1',
                 'default_model': 'gpt-3.5-turbo',
+                'embedding_model': 'text-embedding-3-small',
                 'available_models': [
                     'gpt-4',
                     'gpt-4-turbo',
@@ -56,6 +131,7 @@ class LLMConfigManager:
             'google': {
                 'api_key': os.getenv('GEMINI_API_KEY'),  # Corrected to GEMINI_API_KEY
                 'default_model': 'gemini-1.5-flash',  # Updated default model to a valid one
+                'embedding_model': 'models/text-embedding-004',
                 'available_models': [
                     'gemini-pro',
                     'gemini-pro-vision',
@@ -82,6 +158,16 @@ class LLMConfigManager:
             'ollama': {
                 'base_url': os.getenv('OLLAMA_BASE_URL', 'http://host.docker.internal:11434'),
                 'default_model': 'llama3.1:latest',
+                'embedding_model': os.getenv('OLLAMA_EMBEDDING_MODEL', 'nomic-embed-text'),
+                'keep_alive': os.getenv('OLLAMA_KEEP_ALIVE'),
+                'num_ctx': int(os.getenv('OLLAMA_NUM_CTX')) if os.getenv('OLLAMA_NUM_CTX') else None,
+                # Models loaded on backend start and reloaded if the server evicts them
+                'warm_models': [name.strip() for name in os.getenv('OLLAMA_WARM_MODELS', '').split(',') if name.strip()],
+                'model_options': {},
+                # Session turns send only the new message plus the server's returned context
+                'context_reuse': os.getenv('OLLAMA_CONTEXT_REUSE', 'true').lower() != 'false',
+                # Extra Ollama servers; sessions stick to the node holding their context
+                'nodes': [url.strip() for url in os.getenv('OLLAMA_NODES', '').split(',') if url.strip()],
                 'available_models': [
                     'llama3.1:latest',
                     'deepseek-r1:latest',
@@ -96,28 +182,134 @@ class LLMConfigManager:
                 ]
             }
         }
+
+    def _read_config_file(self, path: str) -> Dict[str, Dict[str, Any]]:
+        """Parse a YAML, TOML or JSON provider configuration file"""
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.toml':
+            import tomllib
+            with open(path, 'rb') as config_file:
+                data = tomllib.load(config_file)
+        elif extension in ('.yaml', '.yml'):
+            import yaml
+            with open(path, 'r', encoding='utf-8') as config_file:
+                data = yaml.safe_load(config_file) or {}
+        else:
+            with open(path, 'r', encoding='utf-8') as config_file:
+                data = json.load(config_file)
+
+        providers = data.get('providers', data) if isinstance(data, dict) else None
+        if not isinstance(providers, dict):
+            raise ValueError(f"Config file {path} must map provider names to settings")
+        return {name.lower(): dict(settings or {}) for name, settings in providers.items()}
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reload the config file if its mtime changed since the last load
+
+        Returns:
+            True if a new snapshot was published
+        """
+        if not self.config_path:
+            return False
+        try:
+            mtime = os.stat(self.config_path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime == self._file_mtime:
+            return False
+
+        try:
+            file_configs = self._read_config_file(self.config_path) if mtime is not None else {}
+        except Exception as e:
+            logger.warning("Ignoring invalid LLM config file %s: %s", self.config_path, e)
+            self._file_mtime = mtime
+            return False
+
+        with self._write_lock:
+            self._file_configs = file_configs
+            self._file_mtime = mtime
+        return self._publish()
+
+    def start_watching(self, interval: float = 2.0):
+        """Poll the config file's mtime in a daemon thread"""
+        if not self.config_path or self._watch_stop is not None:
+            return
+        self._watch_stop = threading.Event()
+
+        def watch(stop: threading.Event):
+            while not stop.wait(interval):
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    logger.warning("LLM config reload failed: %s", e)
+
+        threading.Thread(target=watch, args=(self._watch_stop,), name='llm-config-watcher', daemon=True).start()
+
+    def stop_watching(self):
+        """Stop the config file watcher"""
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
+
+    def _publish(self) -> bool:
+        """Merge all layers into a new snapshot and swap it in if anything changed"""
+        with self._write_lock:
+            current = self._snapshot
+            merged = {}
+            for layer in (self._defaults, self._file_configs, self._overrides):
+                for provider, settings in layer.items():
+                    merged.setdefault(provider, {}).update(settings)
+
+            configs = {}
+            provider_versions = dict(current.provider_versions)
+            changed = set()
+            for provider, settings in merged.items():
+                previous = current.configs.get(provider)
+                if previous is not None and thaw_config(previous) == settings:
+                    configs[provider] = previous
+                    continue
+                configs[provider] = freeze_config(settings)
+                provider_versions[provider] = provider_versions.get(provider, 0) + 1
+                changed.add(provider)
+            for provider in set(current.configs) - set(merged):
+                provider_versions[provider] = provider_versions.get(provider, 0) + 1
+                changed.add(provider)
+
+            if not changed and current.version:
+                return False
+            self._snapshot = ConfigSnapshot(
+                version=current.version + 1,
+                configs=MappingProxyType(configs),
+                provider_versions=MappingProxyType(provider_versions),
+                source_mtime=self._file_mtime
+            )
+
+        for callback in list(self._listeners):
+            try:
+                callback(changed)
+            except Exception as e:
+                logger.warning("LLM config listener failed: %s", e)
+        return True
     
-    def get_config(self, provider: str) -> Dict[str, Any]:
-        """Get configuration for a specific provider"""
-        return self.configs.get(provider.lower(), {})
+    def get_config(self, provider: str) -> Mapping[str, Any]:
+        """Get the read-only configuration for a specific provider"""
+        return self._snapshot.get(provider)
     
     def update_config(self, provider: str, config: Dict[str, Any]):
         """Update configuration for a specific provider"""
         provider = provider.lower()
-        if provider not in self.configs:
-            self.configs[provider] = {}
-        self.configs[provider].update(config)
+        with self._write_lock:
+            self._overrides.setdefault(provider, {}).update(config)
+        self._publish()
     
     def set_api_key(self, provider: str, api_key: str):
         """Set API key for a specific provider"""
-        provider = provider.lower()
-        if provider not in self.configs:
-            self.configs[provider] = {}
-        self.configs[provider]['api_key'] = api_key
+        self.update_config(provider, {'api_key': api_key})
     
     def get_available_providers(self) -> list[str]:
         """Get list of available providers"""
-        return list(self.configs.keys())
+        return list(self._snapshot.configs.keys())
     
     def validate_provider_config(self, provider: str) -> bool:
         """Validate if provider configuration is complete"""
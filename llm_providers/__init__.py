@@ -5,5 +5,6 @@ Supports OpenAI, Anthropic, Google Gemini, and Ollama providers
 
 from .factory import LLMProviderFactory
 from .base import BaseLLMProvider
+from .errors import ProviderError
 
-__all__ = ['LLMProviderFactory', 'BaseLLMProvider']
+__all__ = ['LLMProviderFactory', 'BaseLLMProvider', 'ProviderError']
@@ -3,9 +3,8 @@ Anthropic Provider Implementation
 """
 
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Union
 from langchain_anthropic import ChatAnthropic
-from langchain.schema import HumanMessage, SystemMessage, AIMessage
 
 from .base import BaseLLMProvider, ChatMessage, ChatResponse
 
@@ -13,6 +12,8 @@ from .base import BaseLLMProvider, ChatMessage, ChatResponse
 class AnthropicProvider(BaseLLMProvider):
     """Anthropic LLM Provider using LangChain"""
     
+    error_label = "Anthropic API error"
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.api_key = config.get('api_key') or os.getenv('ANTHROPIC_API_KEY')
@@ -21,29 +22,18 @@ class AnthropicProvider(BaseLLMProvider):
         if not self.api_key:
             raise ValueError("Anthropic API key is required")
     
-    def _create_client(self, model: str, temperature: float, max_tokens: Optional[int]) -> ChatAnthropic:
-        """Create Anthropic client with specified parameters"""
+    def _create_client(self, model: str, temperature: float, max_tokens: Optional[int],
+                       timeout: Optional[float] = None) -> ChatAnthropic:
+        """Create Anthropic client with specified parameters; retries are left to the provider's RetryPolicy"""
         return ChatAnthropic(
             model=model,
             temperature=temperature,
             max_tokens=max_tokens or 1024,
-            anthropic_api_key=self.api_key
+            anthropic_api_key=self.api_key,
+            timeout=timeout,
+            max_retries=0
         )
     
-    def _convert_messages(self, messages: List[ChatMessage]) -> List:
-        """Convert ChatMessage objects to LangChain message format"""
-        langchain_messages = []
-        
-        for msg in messages:
-            if msg.role == 'system':
-                langchain_messages.append(SystemMessage(content=msg.content))
-            elif msg.role == 'user':
-                langchain_messages.append(HumanMessage(content=msg.content))
-            elif msg.role == 'assistant':
-                langchain_messages.append(AIMessage(content=msg.content))
-        
-        return langchain_messages
-    
     def chat_completion(
         self, 
         messages: List[ChatMessage], 
@@ -53,25 +43,21 @@ class AnthropicProvider(BaseLLMProvider):
         **kwargs
     ) -> ChatResponse:
         """Generate chat completion using Anthropic"""
-        try:
-            model = model or self.default_model
-            client = self._create_client(model, temperature, max_tokens)
-            langchain_messages = self._convert_messages(messages)
-            
-            response = client.invoke(langchain_messages)
-            
-            return ChatResponse(
-                content=response.content,
-                model=model,
-                provider='anthropic',
-                metadata={
-                    'response_metadata': getattr(response, 'response_metadata', {}),
-                    'usage_metadata': getattr(response, 'usage_metadata', {})
-                }
-            )
-            
-        except Exception as e:
-            raise Exception(f"Anthropic API error: {str(e)}")
+        model = model or self.default_model
+        return self._chat_langchain(messages, model, temperature, max_tokens, kwargs.get('deadline'))
+    
+    def stream_completion(
+        self, 
+        messages: List[ChatMessage], 
+        model: str = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> Iterator[Union[str, ChatResponse]]:
+        """Stream a chat completion from Anthropic"""
+        model = model or self.default_model
+        return self._stream_chat_langchain(messages, model, temperature, max_tokens, kwargs.get('deadline'),
+                                           kwargs.get('cancel'))
     
     def get_available_models(self) -> List[str]:
         """Return list of available Anthropic models"""
@@ -91,7 +77,7 @@ class AnthropicProvider(BaseLLMProvider):
         try:
             # Test with a simple request
             test_client = self._create_client(self.default_model, 0.1, 10)
-            test_messages = [HumanMessage(content="Hi")]
+            test_messages = self._convert_messages([ChatMessage(role='user', content="Hi")])
             test_client.invoke(test_messages)
             return True
         except Exception:
@@ -4,18 +4,21 @@ Defines the common interface that all LLM providers must implement
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, Iterator, List, Optional, Union
 from dataclasses import dataclass
 
+from .cancellation import CancelToken
+from .retry import Deadline, RetryPolicy
 
-@dataclass
+
+@dataclass(slots=True)
 class ChatMessage:
     """Represents a chat message"""
     role: str  # 'user', 'assistant', 'system'
     content: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatResponse:
     """Represents a chat response from an LLM provider"""
     content: str
@@ -23,14 +26,29 @@ class ChatResponse:
     provider: str
     usage: Optional[Dict[str, Any]] = None
     metadata: Optional[Dict[str, Any]] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Wire representation used in API responses"""
+        return {
+            'content': self.content,
+            'model': self.model,
+            'provider': self.provider,
+            'metadata': self.metadata
+        }
 
 
 class BaseLLMProvider(ABC):
     """Abstract base class for all LLM providers"""
     
+    # Prefix of the messages of this provider's ProviderErrors
+    error_label: Optional[str] = None
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.provider_name = self.__class__.__name__.replace('Provider', '').lower()
+        self.retry_policy = RetryPolicy.from_config(config)
+        # Cap on a single attempt's HTTP timeout; the request deadline may shorten it further
+        self.request_timeout = config.get('request_timeout')
     
     @abstractmethod
     def chat_completion(
@@ -49,10 +67,16 @@ class BaseLLMProvider(ABC):
             model: Model name to use (if None, uses default)
             temperature: Sampling temperature (0.0 to 1.0)
             max_tokens: Maximum tokens to generate
-            **kwargs: Additional provider-specific parameters
+            **kwargs: Additional provider-specific parameters; ``deadline``
+                (a Deadline or seconds) bounds the call including retries,
+                ``cancel`` (a CancelToken) abandons it and, where the provider
+                can, stops the upstream generation
             
         Returns:
             ChatResponse object with the generated response
+            
+        Raises:
+            ProviderError: Classified failure, see ``llm_providers.errors``
         """
         pass
     
@@ -66,6 +90,125 @@ class BaseLLMProvider(ABC):
         """Validate the provider configuration"""
         pass
     
+    def stream_completion(
+        self,
+        messages: List[ChatMessage],
+        model: str = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> Iterator[Union[str, ChatResponse]]:
+        """
+        Generate a chat completion incrementally
+        
+        Yields text deltas as ``str`` and finally the complete ``ChatResponse``.
+        Providers without native streaming yield the whole reply as one delta.
+        """
+        response = self.chat_completion(messages, model=model, temperature=temperature, max_tokens=max_tokens, **kwargs)
+        if response.content:
+            yield response.content
+        yield response
+    
+    def _retrying_call(self, attempt: Callable[[Optional[float]], Any], deadline: Any = None,
+                       cancel: Optional[CancelToken] = None) -> Any:
+        """Run ``attempt(timeout_s)`` under this provider's retry policy and the request deadline"""
+        return self.retry_policy.call(
+            attempt, Deadline.coerce(deadline), self.provider_name,
+            self.error_label or f"{self.provider_name} API error", self.request_timeout, cancel
+        )
+    
+    def _retrying_stream(self, open_stream: Callable[[Optional[float]], Iterator[Any]], deadline: Any = None,
+                         cancel: Optional[CancelToken] = None) -> Iterator[Any]:
+        """Stream ``open_stream(timeout_s)``, retrying failures that happen before the first delta"""
+        return self.retry_policy.stream(
+            open_stream, Deadline.coerce(deadline), self.provider_name,
+            self.error_label or f"{self.provider_name} API error", self.request_timeout, cancel
+        )
+    
+    def _chat_langchain(self, messages: List[ChatMessage], model: str, temperature: float,
+                        max_tokens: Optional[int], deadline: Any = None,
+                        cancel: Optional[CancelToken] = None) -> ChatResponse:
+        """
+        Invoke the LangChain model from ``_create_client``, one client per attempt with its timeout
+        
+        With a ``cancel`` token the reply is streamed and aggregated instead, so
+        a cancellation closes the upstream connection at the next chunk rather
+        than waiting for the whole reply.
+        """
+        if cancel is not None:
+            for item in self._stream_chat_langchain(messages, model, temperature, max_tokens, deadline, cancel):
+                if isinstance(item, ChatResponse):
+                    return item
+        langchain_messages = self._convert_messages(messages)
+        response = self._retrying_call(
+            lambda timeout: self._create_client(model, temperature, max_tokens, timeout).invoke(langchain_messages),
+            deadline
+        )
+        return ChatResponse(
+            content=response.content,
+            model=model,
+            provider=self.provider_name,
+            metadata={
+                'response_metadata': getattr(response, 'response_metadata', {}),
+                'usage_metadata': getattr(response, 'usage_metadata', {})
+            }
+        )
+    
+    def _stream_chat_langchain(self, messages: List[ChatMessage], model: str, temperature: float,
+                               max_tokens: Optional[int], deadline: Any = None,
+                               cancel: Optional[CancelToken] = None) -> Iterator[Union[str, ChatResponse]]:
+        """Streaming counterpart of ``_chat_langchain``"""
+        return self._retrying_stream(
+            lambda timeout: self._stream_langchain(
+                self._create_client(model, temperature, max_tokens, timeout), messages, model, cancel
+            ),
+            deadline,
+            cancel
+        )
+    
+    def _stream_langchain(self, client: Any, messages: List[ChatMessage], model: str,
+                          cancel: Optional[CancelToken] = None) -> Iterator[Union[str, ChatResponse]]:
+        """Stream a LangChain chat model, aggregating the chunks into the final response"""
+        aggregate = None
+        chunks = client.stream(self._convert_messages(messages))
+        try:
+            for chunk in chunks:
+                if cancel is not None:
+                    cancel.check(self.provider_name)
+                aggregate = chunk if aggregate is None else aggregate + chunk
+                if chunk.content:
+                    yield chunk.content
+        finally:
+            # Closing the chunk generator closes the HTTP response, which stops local servers generating
+            chunks.close()
+        yield ChatResponse(
+            content=aggregate.content if aggregate is not None else '',
+            model=model,
+            provider=self.provider_name,
+            metadata={
+                'response_metadata': getattr(aggregate, 'response_metadata', {}),
+                'usage_metadata': getattr(aggregate, 'usage_metadata', None) or {}
+            }
+        )
+    
+    def _convert_messages(self, messages: List[ChatMessage]) -> List:
+        """Convert ChatMessage objects to LangChain message format"""
+        from .messages import to_langchain_messages
+        return to_langchain_messages(messages)
+    
+    def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        """
+        Embed a batch of texts
+        
+        Args:
+            texts: Texts to embed, in order
+            model: Embedding model (if None, uses the provider's ``embedding_model``)
+            
+        Returns:
+            One vector per input text
+        """
+        raise NotImplementedError(f"{self.provider_name} does not support embeddings")
+    
     def get_default_model(self) -> str:
         """Get the default model for this provider"""
         models = self.get_available_models()
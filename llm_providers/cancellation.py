@@ -0,0 +1,93 @@
+"""
+Request Cancellation
+A CancelToken travels with a provider call as the ``cancel`` keyword. When the
+caller gives up (the client disconnected, or the request was cancelled
+explicitly) the token is set and runs the abort callbacks the provider
+registered, e.g. KoboldCpp's abort endpoint, and streamed calls stop at the
+next chunk and close the upstream connection, so the server stops generating
+instead of finishing a reply nobody will read.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Optional
+
+from .errors import RequestCancelledError
+
+logger = logging.getLogger(__name__)
+
+
+class CancelToken:
+    """Set once when the caller no longer wants a request's result"""
+
+    def __init__(self):
+        self.reason: Optional[str] = None
+        self.cancelled_at: Optional[float] = None  # time.monotonic()
+        self._event = threading.Event()
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = 'cancelled') -> bool:
+        """Cancel and run the registered abort callbacks; False if already cancelled"""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self.cancelled_at = time.monotonic()
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning("Abort callback failed: %s", e)
+        return True
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run ``callback`` on cancellation, at once if already cancelled; returns a function that unregisters it"""
+        with self._lock:
+            if not self._event.is_set():
+                key = next(self._ids)
+                self._callbacks[key] = callback
+                return lambda: self._discard(key)
+        callback()
+        return lambda: None
+
+    def _discard(self, key: int):
+        with self._lock:
+            self._callbacks.pop(key, None)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleep up to ``timeout`` seconds, waking early on cancellation; True if cancelled"""
+        return self._event.wait(timeout)
+
+    def error(self, provider: Optional[str] = None) -> RequestCancelledError:
+        return RequestCancelledError(f"Request cancelled ({self.reason})", provider=provider)
+
+    def check(self, provider: Optional[str] = None):
+        """Raise RequestCancelledError once cancelled"""
+        if self._event.is_set():
+            raise self.error(provider)
+
+
+@contextmanager
+def _aborting(cancel: CancelToken, callback: Callable[[], None]):
+    unregister = cancel.on_cancel(callback)
+    try:
+        yield
+    finally:
+        unregister()
+
+
+def aborting(cancel: Optional[CancelToken], callback: Callable[[], None]):
+    """Context in which cancelling ``cancel`` calls ``callback``; a no-op without a token"""
+    return _aborting(cancel, callback) if cancel is not None else nullcontext()
@@ -0,0 +1,148 @@
+"""
+Provider Error Classification
+Maps the exceptions of the provider SDKs and HTTP clients onto a small set of
+ProviderError types that tell callers whether a call may be retried
+"""
+
+from typing import Any, Optional
+
+
+class ProviderError(Exception):
+    """A provider call failed; ``retryable`` says whether trying again may succeed"""
+    retryable = False
+    kind = 'provider_error'
+    http_status = 502  # what the backend answers its own client with
+
+    def __init__(self, message: str, provider: Optional[str] = None, status_code: Optional[int] = None,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.provider = provider
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    def to_dict(self):
+        return {
+            'error': str(self),
+            'error_type': self.kind,
+            'retryable': self.retryable,
+            'provider': self.provider,
+            'status_code': self.status_code,
+            'retry_after': self.retry_after
+        }
+
+
+class RateLimitError(ProviderError):
+    """429: the provider asked us to slow down"""
+    retryable = True
+    kind = 'rate_limited'
+    http_status = 429
+
+
+class ProviderUnavailableError(ProviderError):
+    """408, 409 or 5xx: the provider failed or is overloaded"""
+    retryable = True
+    kind = 'unavailable'
+
+
+class ProviderConnectionError(ProviderError):
+    """The connection could not be made or was reset"""
+    retryable = True
+    kind = 'connection'
+
+
+class ProviderTimeoutError(ProviderError):
+    """A single attempt timed out"""
+    retryable = True
+    kind = 'timeout'
+    http_status = 504
+
+
+class DeadlineExceededError(ProviderError):
+    """The request's deadline passed; nothing more will be tried"""
+    kind = 'deadline_exceeded'
+    http_status = 504
+
+
+class RequestCancelledError(ProviderError):
+    """The caller cancelled the request or went away; the upstream call was abandoned"""
+    kind = 'cancelled'
+    http_status = 499  # client closed request
+
+
+class AuthenticationError(ProviderError):
+    """401/403: the API key is missing, invalid or not allowed to use the model"""
+    kind = 'authentication'
+
+
+class InvalidRequestError(ProviderError):
+    """Other 4xx: the request itself is wrong and would fail again"""
+    kind = 'invalid_request'
+    http_status = 400
+
+
+def status_code_of(error: BaseException) -> Optional[int]:
+    """HTTP status of an SDK (openai, anthropic, google) or HTTP client (requests, httpx) error"""
+    for candidate in (error, getattr(error, 'response', None)):
+        for attribute in ('status_code', 'code', 'status'):
+            value = getattr(candidate, attribute, None)
+            if isinstance(value, int) and 100 <= value < 600:
+                return value
+    return None
+
+
+def retry_after_of(error: BaseException) -> Optional[float]:
+    """Seconds from a ``Retry-After`` (or ``retry-after-ms``) response header"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms') is not None:
+            return float(headers['retry-after-ms']) / 1000.0
+        if headers.get('retry-after') is not None:
+            return max(float(headers['retry-after']), 0.0)
+    except (TypeError, ValueError):
+        pass  # HTTP-date form: fall back to our own backoff
+    return None
+
+
+def _type_names(error: BaseException):
+    return {cls.__name__ for cls in type(error).__mro__}
+
+
+def classify_error(error: BaseException, provider: Optional[str] = None, label: Optional[str] = None) -> ProviderError:
+    """
+    Wrap an exception from a provider call in the matching ProviderError
+
+    Exception types are matched by name so the SDKs stay optional imports.
+
+    Args:
+        error: The exception raised by the provider client
+        provider: Provider key recorded on the error
+        label: Prefix for the message, e.g. "OpenAI API error"
+    """
+    if isinstance(error, ProviderError):
+        return error
+    message = f"{label}: {error}" if label else str(error)
+    status = status_code_of(error)
+    retry_after = retry_after_of(error)
+    names = _type_names(error)
+
+    if status == 429 or 'RateLimitError' in names:
+        error_type: Any = RateLimitError
+    elif status in (401, 403) or names & {'AuthenticationError', 'PermissionDeniedError', 'PermissionDenied', 'Unauthenticated'}:
+        error_type = AuthenticationError
+    elif status in (408, 409) or (status is not None and status >= 500):
+        error_type = ProviderUnavailableError
+    elif status is not None and 400 <= status < 500:
+        error_type = InvalidRequestError
+    elif any('Timeout' in name for name in names) or isinstance(error, TimeoutError):
+        error_type = ProviderTimeoutError
+    elif isinstance(error, ConnectionError) or any('Connect' in name for name in names) or 'RemoteDisconnected' in names:
+        error_type = ProviderConnectionError
+    elif names & {'ServiceUnavailable', 'InternalServerError', 'ResourceExhausted'}:
+        error_type = ProviderUnavailableError
+    else:
+        error_type = ProviderError
+    wrapped = error_type(message, provider=provider, status_code=status, retry_after=retry_after)
+    wrapped.__cause__ = error
+    return wrapped
@@ -3,7 +3,8 @@ LLM Provider Factory
 Central factory for creating and managing LLM providers
 """
 
-from typing import Dict, Any, Type
+import threading
+from typing import Dict, Any, Iterable, Mapping, Optional, Tuple, Type
 from .base import BaseLLMProvider
 from .openai_provider import OpenAIProvider
 from .anthropic_provider import AnthropicProvider
@@ -27,6 +28,10 @@ class LLMProviderFactory:
         'koboldcpp': KoboldCppProvider
     }
     
+    # Cached provider instances keyed by name, tagged with their config version
+    _instances: Dict[str, Tuple[int, BaseLLMProvider]] = {}
+    _instances_lock = threading.Lock()
+    
     @classmethod
     def create_provider(cls, provider_name: str, config: Dict[str, Any]) -> BaseLLMProvider:
         """
@@ -51,6 +56,44 @@ class LLMProviderFactory:
         provider_class = cls._providers[provider_name]
         return provider_class(config)
     
+    @classmethod
+    def get_provider(cls, provider_name: str, config: Mapping[str, Any], version: int) -> BaseLLMProvider:
+        """
+        Return a cached provider instance for a configuration version
+        
+        The instance is rebuilt only when the provider's own config version
+        changes, so updating one provider never evicts the others.
+        
+        Args:
+            provider_name: Name of the provider
+            config: Configuration for the provider, taken from the same snapshot as ``version``
+            version: Config version of this provider
+            
+        Returns:
+            BaseLLMProvider instance
+        """
+        provider_name = provider_name.lower()
+        cached = cls._instances.get(provider_name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
+        provider = cls.create_provider(provider_name, config)
+        with cls._instances_lock:
+            current = cls._instances.get(provider_name)
+            if current is None or current[0] <= version:
+                cls._instances[provider_name] = (version, provider)
+        return provider
+    
+    @classmethod
+    def invalidate(cls, provider_names: Optional[Iterable[str]] = None):
+        """Drop cached instances for the given providers (all if None)"""
+        with cls._instances_lock:
+            if provider_names is None:
+                cls._instances.clear()
+            else:
+                for name in provider_names:
+                    cls._instances.pop(name.lower(), None)
+    
     @classmethod
     def get_available_providers(cls) -> list[str]:
         """Get list of available provider names"""
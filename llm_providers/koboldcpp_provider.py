@@ -1,64 +1,145 @@
 """
 KoboldCpp Provider Implementation
+Uses KoboldCpp's native generate API. Every generation carries a ``genkey`` so
+a cancelled or abandoned request is stopped through ``/api/extra/abort``;
+closing the connection alone leaves KoboldCpp generating.
 """
 
-from typing import Dict, Any, List, Optional
+import functools
+import json
+import uuid
+from typing import Dict, Any, Iterator, List, Optional, Union
+
+import requests
 
 from .base import BaseLLMProvider, ChatMessage, ChatResponse
+from .cancellation import CancelToken, aborting
+from .ollama_context import ROLE_LABELS, render_transcript
+
+# Stop before the model writes the next turn of the transcript itself
+STOP_SEQUENCES = [f"\n{ROLE_LABELS['user']}:", f"\n{ROLE_LABELS['system']}:"]
+ABORT_TIMEOUT_S = 5.0
+
 
 class KoboldCppProvider(BaseLLMProvider):
     """KoboldCpp LLM Provider"""
 
+    error_label = "KoboldCpp API error"
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
-        self.base_url = config.get('base_url', 'http://localhost:8080')
+        self.base_url = config.get('base_url', 'http://localhost:8080').rstrip('/')
         self.default_model = config.get('default_model', 'kobold-default')
+        # KoboldCpp generates up to max_length tokens when the request sets no max_tokens
+        self.default_max_length = int(config.get('max_length', 512))
+        self.max_context_length = config.get('max_context_length')
 
-    def _create_client(self, model: str, temperature: float, max_tokens: Optional[int]) -> Any:
-        """Create KoboldCpp client with specified parameters"""
-        return {
-            "model": model,
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-            "base_url": self.base_url
+    def _generate_payload(self, messages: List[ChatMessage], temperature: float,
+                          max_tokens: Optional[int]) -> Dict[str, Any]:
+        """Request body for KoboldCpp's generate endpoints, with a fresh genkey"""
+        system, prompt = render_transcript(messages)
+        payload: Dict[str, Any] = {
+            'prompt': prompt,
+            'memory': f"{system}\n\n" if system else '',
+            'max_length': max_tokens or self.default_max_length,
+            'temperature': temperature,
+            'stop_sequence': STOP_SEQUENCES,
+            'genkey': f"KCPP{uuid.uuid4().hex[:12]}"
         }
+        if self.max_context_length:
+            payload['max_context_length'] = self.max_context_length
+        return payload
 
-    def _convert_messages(self, messages: List[ChatMessage]) -> List:
-        """Convert ChatMessage objects to KoboldCpp message format"""
-        return [
-            {"role": msg.role, "content": msg.content} for msg in messages
-        ]
+    def abort_generation(self, genkey: str) -> bool:
+        """Stop a running generation; True if KoboldCpp had one under this key"""
+        response = requests.post(f"{self.base_url}/api/extra/abort", json={'genkey': genkey}, timeout=ABORT_TIMEOUT_S)
+        response.raise_for_status()
+        return str(response.json().get('success')).lower() == 'true'
 
     def chat_completion(
-        self, 
-        messages: List[ChatMessage], 
+        self,
+        messages: List[ChatMessage],
         model: str = None,
         temperature: float = 0.7,
         max_tokens: Optional[int] = None,
         **kwargs
     ) -> ChatResponse:
-        """Generate chat completion using KoboldCpp"""
+        """Generate chat completion using KoboldCpp; ``cancel`` aborts the generation on the server"""
+        model = model or self.default_model
+        cancel: Optional[CancelToken] = kwargs.get('cancel')
+        payload = self._generate_payload(messages, temperature, max_tokens)
+
+        def attempt(timeout: Optional[float]) -> Dict[str, Any]:
+            # An aborted generation still returns, with the text produced so far
+            with aborting(cancel, functools.partial(self.abort_generation, payload['genkey'])):
+                response = requests.post(f"{self.base_url}/api/v1/generate", json=payload, timeout=timeout)
+            response.raise_for_status()
+            if cancel is not None:
+                cancel.check(self.provider_name)
+            results = response.json().get('results') or [{}]
+            return results[0]
+
+        result = self._retrying_call(attempt, kwargs.get('deadline'), cancel)
+        return ChatResponse(
+            content=result.get('text', ''),
+            model=model,
+            provider=self.provider_name,
+            metadata={'response_metadata': {'finish_reason': result.get('finish_reason'), 'genkey': payload['genkey']}}
+        )
+
+    def stream_completion(
+        self,
+        messages: List[ChatMessage],
+        model: str = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> Iterator[Union[str, ChatResponse]]:
+        """Stream a chat completion from KoboldCpp's server-sent events endpoint"""
+        model = model or self.default_model
+        cancel: Optional[CancelToken] = kwargs.get('cancel')
+        payload = self._generate_payload(messages, temperature, max_tokens)
+        return self._retrying_stream(
+            lambda timeout: self._stream_generate(payload, model, timeout, cancel),
+            kwargs.get('deadline'),
+            cancel
+        )
+
+    def _stream_generate(self, payload: Dict[str, Any], model: str, timeout: Optional[float],
+                         cancel: Optional[CancelToken]) -> Iterator[Union[str, ChatResponse]]:
+        parts: List[str] = []
+        finish_reason = None
+        finished = False
+        abort = functools.partial(self.abort_generation, payload['genkey'])
+        response = requests.post(f"{self.base_url}/api/extra/generate/stream", json=payload, timeout=timeout, stream=True)
         try:
-            model = model or self.default_model
-            client = self._create_client(model, temperature, max_tokens)
-            converted_messages = self._convert_messages(messages)
-
-            # Simulate API call
-            response = {
-                "content": "Simulated response from KoboldCpp",
-                "model": model,
-                "provider": "koboldcpp",
-                "metadata": {}
-            }
-
-            return ChatResponse(
-                content=response["content"],
-                model=response["model"],
-                provider=response["provider"],
-                metadata=response["metadata"]
-            )
-        except Exception as e:
-            raise Exception(f"KoboldCpp API error: {str(e)}")
+            response.raise_for_status()
+            with aborting(cancel, abort):
+                for line in response.iter_lines(decode_unicode=True):
+                    if cancel is not None:
+                        cancel.check(self.provider_name)
+                    if not line or not line.startswith('data:'):
+                        continue
+                    event = json.loads(line[len('data:'):])
+                    finish_reason = event.get('finish_reason') or finish_reason
+                    if event.get('token'):
+                        parts.append(event['token'])
+                        yield event['token']
+            finished = True
+        finally:
+            response.close()
+            if not finished and response.ok and (cancel is None or not cancel.cancelled):
+                # The consumer stopped reading (e.g. its client went away): free the slot
+                try:
+                    abort()
+                except requests.RequestException:
+                    pass
+        yield ChatResponse(
+            content=''.join(parts),
+            model=model,
+            provider=self.provider_name,
+            metadata={'response_metadata': {'finish_reason': finish_reason, 'genkey': payload['genkey']}}
+        )
 
     def get_available_models(self) -> List[str]:
         """Return list of available KoboldCpp models"""
@@ -66,4 +147,4 @@ class KoboldCppProvider(BaseLLMProvider):
 
     def validate_config(self) -> bool:
         """Validate KoboldCpp configuration"""
-        return bool(self.base_url)
\ No newline at end of file
+        return bool(self.base_url)
@@ -5,6 +5,8 @@ LM Studio Provider Implementation
 from typing import Dict, Any, List, Optional
 
 from .base import BaseLLMProvider, ChatMessage, ChatResponse
+from .errors import classify_error
+from .messages import to_wire_messages
 
 class LMStudioProvider(BaseLLMProvider):
     """LM Studio LLM Provider"""
@@ -25,9 +27,7 @@ class LMStudioProvider(BaseLLMProvider):
 
     def _convert_messages(self, messages: List[ChatMessage]) -> List:
         """Convert ChatMessage objects to LM Studio message format"""
-        return [
-            {"role": msg.role, "content": msg.content} for msg in messages
-        ]
+        return to_wire_messages(messages)
 
     def chat_completion(
         self, 
@@ -58,7 +58,7 @@ class LMStudioProvider(BaseLLMProvider):
                 metadata=response["metadata"]
             )
         except Exception as e:
-            raise Exception(f"LM Studio API error: {str(e)}")
+            raise classify_error(e, self.provider_name, "LM Studio API error") from e
 
     def get_available_models(self) -> List[str]:
         """Return list of available LM Studio models"""
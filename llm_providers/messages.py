@@ -0,0 +1,89 @@
+"""
+Message Conversion Layer
+The single place where wire payloads become ChatMessages and ChatMessages
+become provider message formats. Message text is passed by reference at every
+step, so a prompt is never copied again after the request body is parsed.
+"""
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .base import ChatMessage
+
+VALID_ROLES = frozenset({'system', 'user', 'assistant'})
+
+
+class MessageFormatError(ValueError):
+    """Raised when a wire message is malformed"""
+
+
+def parse_messages(messages_data: Iterable[Any],
+                   resolve_blob: Optional[Callable[[str], str]] = None) -> List[ChatMessage]:
+    """
+    Validate wire messages and wrap them as ChatMessage objects
+
+    Content is a string, a ``{"blob": "<sha256>"}`` reference to uploaded text,
+    or a list of strings and blob references that are joined in order.
+
+    Args:
+        messages_data: List of ``{"role": ..., "content": ...}`` dicts from a request body
+        resolve_blob: Returns the text of a blob ID; blob references are rejected without it
+
+    Returns:
+        List of ChatMessage objects referencing the original (or cached blob) strings
+
+    Raises:
+        MessageFormatError: If any message is missing its role or content, has
+            a role other than system, user or assistant, or references a blob
+            that cannot be resolved
+    """
+    messages = []
+    for msg_data in messages_data:
+        if not isinstance(msg_data, dict) or 'role' not in msg_data or 'content' not in msg_data:
+            raise MessageFormatError('Invalid message format')
+        if not isinstance(msg_data['role'], str) or msg_data['role'] not in VALID_ROLES:
+            raise MessageFormatError(
+                f"Unknown message role {msg_data['role']!r}, expected one of {', '.join(sorted(VALID_ROLES))}"
+            )
+        content = msg_data['content']
+        if not isinstance(content, str):
+            content = _resolve_content(content, resolve_blob)
+        messages.append(ChatMessage(msg_data['role'], content))
+    return messages
+
+
+def _resolve_content(content: Any, resolve_blob: Optional[Callable[[str], str]]) -> str:
+    """Text of a blob reference or a list of text parts and blob references"""
+    if isinstance(content, list):
+        return ''.join(part if isinstance(part, str) else _resolve_content(part, resolve_blob) for part in content)
+    if not isinstance(content, dict) or not isinstance(content.get('blob'), str):
+        raise MessageFormatError('Message content must be a string, a blob reference or a list of them')
+    if resolve_blob is None:
+        raise MessageFormatError('Blob references are not supported here')
+    try:
+        return resolve_blob(content['blob'])
+    except (KeyError, ValueError) as e:
+        raise MessageFormatError(f"Cannot use blob {content['blob']}: {e}")
+
+
+@lru_cache(maxsize=1)
+def _langchain_message_types() -> Dict[str, type]:
+    """LangChain message classes by role, imported on first use"""
+    from langchain.schema import HumanMessage, SystemMessage, AIMessage
+    return {'system': SystemMessage, 'user': HumanMessage, 'assistant': AIMessage}
+
+
+def to_langchain_messages(messages: Iterable[ChatMessage]) -> List:
+    """Convert ChatMessages to LangChain messages, dropping unknown roles"""
+    message_types = _langchain_message_types()
+    converted = []
+    for msg in messages:
+        message_type = message_types.get(msg.role)
+        if message_type is not None:
+            converted.append(message_type(content=msg.content))
+    return converted
+
+
+def to_wire_messages(messages: Iterable[ChatMessage]) -> List[Dict[str, str]]:
+    """Convert ChatMessages to OpenAI-style role/content dicts"""
+    return [{'role': msg.role, 'content': msg.content} for msg in messages]
@@ -0,0 +1,252 @@
+"""
+Ollama Session Context Reuse
+Keeps the token context Ollama returns from ``/api/generate`` per session, so
+the next turn sends only the new message instead of the whole conversation.
+Sessions stick to the node that holds their context; when the context is gone
+(evicted, history edited, model switched, node down) the full conversation is
+resent and a fresh context is captured. A cancellable turn is streamed, so a
+cancellation closes the connection and Ollama stops generating.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+from .base import ChatMessage, ChatResponse
+from .cancellation import CancelToken
+
+# Sessions whose context is kept; each holds one token array
+DEFAULT_MAX_CONTEXTS = 256
+ROLE_LABELS = {'system': 'System', 'user': 'User', 'assistant': 'Assistant'}
+
+
+def history_digest(messages: Sequence[ChatMessage]) -> str:
+    """Digest of a message prefix, used to detect edited histories"""
+    digest = hashlib.sha256()
+    for msg in messages:
+        digest.update(msg.role.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(msg.content.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def render_transcript(messages: Sequence[ChatMessage]) -> Tuple[str, str]:
+    """Split messages into a system prompt and a plain-text transcript prompt"""
+    system = "\n\n".join(msg.content for msg in messages if msg.role == 'system')
+    turns = [msg for msg in messages if msg.role != 'system']
+    if len(turns) == 1 and turns[0].role == 'user':
+        return system, turns[0].content
+    lines = [f"{ROLE_LABELS.get(msg.role, msg.role)}: {msg.content}" for msg in turns]
+    lines.append(f"{ROLE_LABELS['assistant']}:")
+    return system, "\n\n".join(lines)
+
+
+@dataclass
+class SessionContext:
+    """Server-side context of one session on one node"""
+    node: str
+    model: str
+    tokens: array  # token ids from Ollama's last response, stored compactly
+    message_count: int  # messages (including the last reply) the context covers
+    digest: str  # history_digest of those messages
+    last_used: float
+
+
+class OllamaContextStore:
+    """Bounded LRU of session contexts, shared by every OllamaProvider instance"""
+
+    def __init__(self, max_contexts: int = DEFAULT_MAX_CONTEXTS):
+        self.max_contexts = max_contexts
+        self._contexts: "OrderedDict[str, SessionContext]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'delta_turns': 0, 'full_resends': 0, 'evictions': 0, 'node_failovers': 0}
+
+    def get(self, session_id: str) -> Optional[SessionContext]:
+        with self._lock:
+            context = self._contexts.get(session_id)
+            if context is not None:
+                self._contexts.move_to_end(session_id)
+            return context
+
+    def put(self, session_id: str, context: SessionContext):
+        with self._lock:
+            self._contexts[session_id] = context
+            self._contexts.move_to_end(session_id)
+            while len(self._contexts) > self.max_contexts:
+                self._contexts.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def discard(self, session_id: str):
+        with self._lock:
+            self._contexts.pop(session_id, None)
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'sessions': len(self._contexts), **self.stats}
+
+
+CONTEXT_STORE = OllamaContextStore()
+
+
+def pick_node(session_id: str, nodes: Sequence[str], exclude: Sequence[str] = ()) -> str:
+    """Rendezvous hash: a session maps to the same node for as long as that node is listed"""
+    candidates = [node for node in nodes if node not in exclude] or list(nodes)
+    return max(candidates, key=lambda node: hashlib.sha1(f"{session_id}|{node}".encode('utf-8')).digest())
+
+
+class OllamaSessionClient:
+    """Runs session turns against Ollama's /api/generate with context reuse"""
+
+    def __init__(self, nodes: Sequence[str], store: OllamaContextStore = CONTEXT_STORE, timeout: float = 600.0):
+        self.nodes = list(nodes)
+        self.store = store
+        self.timeout = timeout
+
+    def chat(
+        self,
+        session_id: str,
+        messages: List[ChatMessage],
+        model: str,
+        options: Dict[str, Any],
+        keep_alive: Any = None,
+        num_ctx: Optional[int] = None,
+        timeout: Optional[float] = None,
+        cancel: Optional[CancelToken] = None
+    ) -> ChatResponse:
+        """Generate the reply to the last turn of ``messages`` for a session; ``timeout`` overrides the client's"""
+        context = self.store.get(session_id)
+        reason = self._delta_blocker(context, messages, model, num_ctx)
+        node = context.node if context is not None and reason is None else pick_node(session_id, self.nodes)
+
+        payload: Dict[str, Any] = {'model': model, 'stream': False, 'options': dict(options)}
+        if keep_alive is not None:
+            payload['keep_alive'] = keep_alive
+        if num_ctx:
+            payload['options']['num_ctx'] = num_ctx
+        if reason is None:
+            new_turn = messages[context.message_count:]
+            payload['prompt'] = new_turn[0].content
+            payload['context'] = context.tokens.tolist()
+        else:
+            payload['system'], payload['prompt'] = render_transcript(messages)
+
+        try:
+            data = self._post(node, payload, timeout, cancel)
+        except requests.HTTPError:
+            if reason is not None:
+                raise
+            # The server refused the stored context (e.g. the model was replaced); resend in full
+            reason = 'context rejected'
+            payload.pop('context', None)
+            payload['system'], payload['prompt'] = render_transcript(messages)
+            data = self._post(node, payload, timeout, cancel)
+        except requests.RequestException:
+            if len(self.nodes) < 2:
+                raise
+            # The sticky node is unreachable: its context is lost with it
+            self.store.count('node_failovers')
+            node = pick_node(session_id, self.nodes, exclude=[node])
+            reason = 'node unavailable'
+            payload.pop('context', None)
+            payload['system'], payload['prompt'] = render_transcript(messages)
+            data = self._post(node, payload, timeout, cancel)
+
+        self.store.count('delta_turns' if reason is None else 'full_resends')
+        reply = data.get('response', '')
+        covered = list(messages) + [ChatMessage(role='assistant', content=reply)]
+        if data.get('context'):
+            self.store.put(session_id, SessionContext(
+                node=node,
+                model=model,
+                tokens=array('i', data['context']),
+                message_count=len(covered),
+                digest=history_digest(covered),
+                last_used=time.time()
+            ))
+        else:
+            self.store.discard(session_id)
+
+        return ChatResponse(
+            content=reply,
+            model=model,
+            provider='ollama',
+            metadata={
+                'response_metadata': {
+                    key: data.get(key)
+                    for key in ('total_duration', 'load_duration', 'prompt_eval_duration', 'eval_duration', 'done_reason')
+                },
+                'usage_metadata': {
+                    'input_tokens': data.get('prompt_eval_count', 0),
+                    'output_tokens': data.get('eval_count', 0)
+                },
+                'ollama_context': {
+                    'mode': 'delta' if reason is None else 'full',
+                    'reason': reason,
+                    'node': node,
+                    'context_tokens': len(data.get('context') or [])
+                }
+            }
+        )
+
+    @staticmethod
+    def _delta_blocker(context: Optional[SessionContext], messages: Sequence[ChatMessage],
+                       model: str, num_ctx: Optional[int]) -> Optional[str]:
+        """Why the new turn cannot be sent as a delta, or None if it can"""
+        if context is None:
+            return 'no stored context'
+        if context.model != model:
+            return 'model changed'
+        new_turn = messages[context.message_count:]
+        if len(new_turn) != 1 or new_turn[0].role != 'user':
+            return 'new turn is not a single user message'
+        if history_digest(messages[:context.message_count]) != context.digest:
+            return 'history changed'
+        if num_ctx and len(context.tokens) + len(new_turn[0].content) // 4 >= num_ctx:
+            # Ollama would truncate the context; resend so the system prompt survives
+            return 'context window full'
+        return None
+
+    def _post(self, node: str, payload: Dict[str, Any], timeout: Optional[float] = None,
+              cancel: Optional[CancelToken] = None) -> Dict[str, Any]:
+        url = f"{node.rstrip('/')}/api/generate"
+        if cancel is None:
+            response = requests.post(url, json=payload, timeout=timeout or self.timeout)
+            response.raise_for_status()
+            return response.json()
+        return self._post_streamed(url, payload, timeout or self.timeout, cancel)
+
+    @staticmethod
+    def _post_streamed(url: str, payload: Dict[str, Any], timeout: float, cancel: CancelToken) -> Dict[str, Any]:
+        """``/api/generate`` read as a stream and merged into the non-streamed reply, checking ``cancel`` per token"""
+        parts: List[str] = []
+        try:
+            with requests.post(url, json={**payload, 'stream': True}, timeout=timeout, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    cancel.check('ollama')
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get('error'):
+                        raise requests.HTTPError(data['error'], response=response)
+                    parts.append(data.get('response', ''))
+                    if data.get('done'):
+                        return {**data, 'response': ''.join(parts)}
+        except Exception as e:
+            # Leaving the with block closed the connection; don't fail over because of our own abort
+            if cancel.cancelled:
+                raise cancel.error('ollama') from e
+            raise
+        raise requests.ConnectionError(f'{url}: stream ended before the reply was done')
@@ -3,43 +3,89 @@ Ollama Provider Implementation
 """
 
 import os
-from typing import Dict, Any, List, Optional
-from langchain_ollama import ChatOllama
-from langchain.schema import HumanMessage, SystemMessage, AIMessage
+import time
+from typing import Dict, Any, Iterator, List, Optional, Union
+import requests
+from langchain_ollama import ChatOllama, OllamaEmbeddings
 
 from .base import BaseLLMProvider, ChatMessage, ChatResponse
+from .errors import classify_error
+from .ollama_context import OllamaSessionClient
 
 
 class OllamaProvider(BaseLLMProvider):
     """Ollama LLM Provider using LangChain"""
     
+    error_label = "Ollama API error"
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.base_url = config.get('base_url', 'http://localhost:11434')
         self.default_model = config.get('default_model', 'llama2')
+        # keep_alive: how long Ollama keeps a model loaded after a request ("10m", seconds, -1 = forever)
+        self.keep_alive = config.get('keep_alive')
+        self.num_ctx = config.get('num_ctx')
+        self.model_options = config.get('model_options') or {}
+        # Session turns reuse the server's returned context and stick to one of these nodes
+        self.context_reuse = config.get('context_reuse', True)
+        self.session_client = OllamaSessionClient(list(config.get('nodes') or [self.base_url]))
+    
+    def model_settings(self, model: str) -> Dict[str, Any]:
+        """keep_alive and num_ctx for a model: its model_options entry over the provider defaults"""
+        options = self.model_options.get(model) or {}
+        return {
+            'keep_alive': options.get('keep_alive', self.keep_alive),
+            'num_ctx': options.get('num_ctx', self.num_ctx)
+        }
     
-    def _create_client(self, model: str, temperature: float, max_tokens: Optional[int]) -> ChatOllama:
+    def _create_client(self, model: str, temperature: float, max_tokens: Optional[int],
+                       timeout: Optional[float] = None) -> ChatOllama:
         """Create Ollama client with specified parameters"""
+        settings = self.model_settings(model)
+        # Every request resets Ollama's unload timer, so each call must carry the model's policy
         return ChatOllama(
             model=model,
             temperature=temperature,
             num_predict=max_tokens,
-            base_url=self.base_url
+            base_url=self.base_url,
+            keep_alive=settings['keep_alive'],
+            num_ctx=settings['num_ctx'],
+            client_kwargs={'timeout': timeout} if timeout is not None else {}
         )
     
-    def _convert_messages(self, messages: List[ChatMessage]) -> List:
-        """Convert ChatMessage objects to LangChain message format"""
-        langchain_messages = []
+    def load_model(self, model: str, keep_alive: Union[str, int, None] = None, timeout: float = 600.0) -> Dict[str, Any]:
+        """
+        Load a model into memory without generating anything
         
-        for msg in messages:
-            if msg.role == 'system':
-                langchain_messages.append(SystemMessage(content=msg.content))
-            elif msg.role == 'user':
-                langchain_messages.append(HumanMessage(content=msg.content))
-            elif msg.role == 'assistant':
-                langchain_messages.append(AIMessage(content=msg.content))
-        
-        return langchain_messages
+        Returns:
+            Dict with Ollama's reported ``load_s`` and the measured ``wall_s``
+        """
+        payload: Dict[str, Any] = {'model': model}
+        settings = self.model_settings(model)
+        keep_alive = settings['keep_alive'] if keep_alive is None else keep_alive
+        if keep_alive is not None:
+            payload['keep_alive'] = keep_alive
+        if settings['num_ctx']:
+            payload['options'] = {'num_ctx': settings['num_ctx']}
+        started = time.perf_counter()
+        response = requests.post(f"{self.base_url}/api/generate", json=payload, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+        return {
+            'load_s': data.get('load_duration', 0) / 1e9,
+            'wall_s': time.perf_counter() - started
+        }
+    
+    def unload_model(self, model: str):
+        """Ask Ollama to release a model's memory now"""
+        response = requests.post(f"{self.base_url}/api/generate", json={'model': model, 'keep_alive': 0}, timeout=30)
+        response.raise_for_status()
+    
+    def running_models(self, timeout: float = 10) -> List[str]:
+        """Names of the models currently loaded on the Ollama server"""
+        response = requests.get(f"{self.base_url}/api/ps", timeout=timeout)
+        response.raise_for_status()
+        return [entry.get('name') or entry.get('model') for entry in response.json().get('models', [])]
     
     def chat_completion(
         self, 
@@ -49,26 +95,53 @@ class OllamaProvider(BaseLLMProvider):
         max_tokens: Optional[int] = None,
         **kwargs
     ) -> ChatResponse:
-        """Generate chat completion using Ollama"""
+        """Generate chat completion using Ollama; pass ``session_id`` to reuse the session's context"""
+        model = model or self.default_model
+        session_id = kwargs.get('session_id')
+        # A cancellable call is streamed so that closing it frees the Ollama slot mid-generation
+        cancel = kwargs.get('cancel')
+        if session_id and self.context_reuse:
+            settings = self.model_settings(model)
+            options = {'temperature': temperature}
+            if max_tokens:
+                options['num_predict'] = max_tokens
+            return self._retrying_call(
+                lambda timeout: self.session_client.chat(
+                    session_id, messages, model, options,
+                    keep_alive=settings['keep_alive'], num_ctx=settings['num_ctx'], timeout=timeout, cancel=cancel
+                ),
+                kwargs.get('deadline'),
+                cancel
+            )
+        return self._chat_langchain(messages, model, temperature, max_tokens, kwargs.get('deadline'), cancel)
+    
+    def stream_completion(
+        self, 
+        messages: List[ChatMessage], 
+        model: str = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> Iterator[Union[str, ChatResponse]]:
+        """Stream a chat completion from Ollama; session turns with context reuse are sent whole"""
+        if kwargs.get('session_id') and self.context_reuse:
+            return super().stream_completion(messages, model, temperature, max_tokens, **kwargs)
+        model = model or self.default_model
+        return self._stream_chat_langchain(messages, model, temperature, max_tokens, kwargs.get('deadline'),
+                                           kwargs.get('cancel'))
+    
+    def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        """Embed texts with an Ollama embedding model"""
         try:
-            model = model or self.default_model
-            client = self._create_client(model, temperature, max_tokens)
-            langchain_messages = self._convert_messages(messages)
-            
-            response = client.invoke(langchain_messages)
-            
-            return ChatResponse(
-                content=response.content,
+            model = model or self.config.get('embedding_model', 'nomic-embed-text')
+            client = OllamaEmbeddings(
                 model=model,
-                provider='ollama',
-                metadata={
-                    'response_metadata': getattr(response, 'response_metadata', {}),
-                    'usage_metadata': getattr(response, 'usage_metadata', {})
-                }
+                base_url=self.base_url,
+                keep_alive=self.model_settings(model)['keep_alive']
             )
-            
+            return client.embed_documents(texts)
         except Exception as e:
-            raise Exception(f"Ollama API error: {str(e)}")
+            raise classify_error(e, self.provider_name, "Ollama embeddings error") from e
     
     def get_available_models(self) -> List[str]:
         """Return list of common Ollama models"""
@@ -89,7 +162,7 @@ class OllamaProvider(BaseLLMProvider):
         try:
             # Test with a simple request
             test_client = self._create_client(self.default_model, 0.1, 10)
-            test_messages = [HumanMessage(content="Hi")]
+            test_messages = self._convert_messages([ChatMessage(role='user', content="Hi")])
             test_client.invoke(test_messages)
             return True
         except Exception:
@@ -3,16 +3,18 @@ OpenAI Provider Implementation
 """
 
 import os
-from typing import Dict, Any, List, Optional
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage, AIMessage
+from typing import Dict, Any, Iterator, List, Optional, Union
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
 from .base import BaseLLMProvider, ChatMessage, ChatResponse
+from .errors import classify_error
 
 
 class OpenAIProvider(BaseLLMProvider):
     """OpenAI LLM Provider using LangChain"""
     
+    error_label = "OpenAI API error"
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.api_key = config.get('api_key') or os.getenv('OPENAI_API_KEY')
@@ -22,30 +24,21 @@ class OpenAIProvider(BaseLLMProvider):
         if not self.api_key:
             raise ValueError("OpenAI API key is required")
     
-    def _create_client(self, model: str, temperature: float, max_tokens: Optional[int]) -> ChatOpenAI:
-        """Create OpenAI client with specified parameters"""
+    def _create_client(self, model: str, temperature: float, max_tokens: Optional[int],
+                       timeout: Optional[float] = None) -> ChatOpenAI:
+        """Create OpenAI client with specified parameters; retries are left to the provider's RetryPolicy"""
         return ChatOpenAI(
             model=model,
             temperature=temperature,
             max_tokens=max_tokens,
             openai_api_key=self.api_key,
-            openai_api_base=self.base_url
+            openai_api_base=self.base_url,
+            timeout=timeout,
+            max_retries=0,
+            # Streamed calls report token usage only when asked to
+            stream_usage=True
         )
     
-    def _convert_messages(self, messages: List[ChatMessage]) -> List:
-        """Convert ChatMessage objects to LangChain message format"""
-        langchain_messages = []
-        
-        for msg in messages:
-            if msg.role == 'system':
-                langchain_messages.append(SystemMessage(content=msg.content))
-            elif msg.role == 'user':
-                langchain_messages.append(HumanMessage(content=msg.content))
-            elif msg.role == 'assistant':
-                langchain_messages.append(AIMessage(content=msg.content))
-        
-        return langchain_messages
-    
     def chat_completion(
         self, 
         messages: List[ChatMessage], 
@@ -55,25 +48,33 @@ class OpenAIProvider(BaseLLMProvider):
         **kwargs
     ) -> ChatResponse:
         """Generate chat completion using OpenAI"""
+        model = model or self.default_model
+        return self._chat_langchain(messages, model, temperature, max_tokens, kwargs.get('deadline'))
+    
+    def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        """Embed texts with the OpenAI embeddings API"""
         try:
-            model = model or self.default_model
-            client = self._create_client(model, temperature, max_tokens)
-            langchain_messages = self._convert_messages(messages)
-            
-            response = client.invoke(langchain_messages)
-            
-            return ChatResponse(
-                content=response.content,
-                model=model,
-                provider='openai',
-                metadata={
-                    'response_metadata': getattr(response, 'response_metadata', {}),
-                    'usage_metadata': getattr(response, 'usage_metadata', {})
-                }
+            client = OpenAIEmbeddings(
+                model=model or self.config.get('embedding_model', 'text-embedding-3-small'),
+                openai_api_key=self.api_key,
+                openai_api_base=self.base_url
             )
-            
+            return client.embed_documents(texts)
         except Exception as e:
-            raise Exception(f"OpenAI API error: {str(e)}")
+            raise classify_error(e, self.provider_name, "OpenAI embeddings error") from e
+    
+    def stream_completion(
+        self, 
+        messages: List[ChatMessage], 
+        model: str = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> Iterator[Union[str, ChatResponse]]:
+        """Stream a chat completion from OpenAI"""
+        model = model or self.default_model
+        return self._stream_chat_langchain(messages, model, temperature, max_tokens, kwargs.get('deadline'),
+                                           kwargs.get('cancel'))
     
     def get_available_models(self) -> List[str]:
         """Return list of available OpenAI models"""
@@ -93,7 +94,7 @@ class OpenAIProvider(BaseLLMProvider):
         try:
             # Test with a simple request
             test_client = self._create_client(self.default_model, 0.1, 10)
-            test_messages = [HumanMessage(content="Hi")]
+            test_messages = self._convert_messages([ChatMessage(role='user', content="Hi")])
             test_client.invoke(test_messages)
             return True
         except Exception:
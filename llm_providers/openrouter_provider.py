@@ -3,15 +3,16 @@ OpenRouter Provider Implementation
 """
 
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Union
 from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage, AIMessage
 
 from .base import BaseLLMProvider, ChatMessage, ChatResponse
 
 class OpenRouterProvider(BaseLLMProvider):
     """OpenRouter LLM Provider using OpenAI-compatible API"""
     
+    error_label = "OpenRouter API error"
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.api_key = config.get('api_key') or os.getenv('OPENROUTER_API_KEY')
@@ -20,26 +21,20 @@ class OpenRouterProvider(BaseLLMProvider):
         if not self.api_key:
             raise ValueError("OpenRouter API key is required")
 
-    def _create_client(self, model: str, temperature: float, max_tokens: Optional[int]) -> ChatOpenAI:
+    def _create_client(self, model: str, temperature: float, max_tokens: Optional[int],
+                       timeout: Optional[float] = None) -> ChatOpenAI:
         return ChatOpenAI(
             model=model,
             temperature=temperature,
             max_tokens=max_tokens,
             openai_api_key=self.api_key,
-            openai_api_base=self.base_url
+            openai_api_base=self.base_url,
+            timeout=timeout,
+            max_retries=0,
+            # Streamed calls report token usage only when asked to
+            stream_usage=True
         )
 
-    def _convert_messages(self, messages: List[ChatMessage]) -> List:
-        langchain_messages = []
-        for msg in messages:
-            if msg.role == 'system':
-                langchain_messages.append(SystemMessage(content=msg.content))
-            elif msg.role == 'user':
-                langchain_messages.append(HumanMessage(content=msg.content))
-            elif msg.role == 'assistant':
-                langchain_messages.append(AIMessage(content=msg.content))
-        return langchain_messages
-
     def chat_completion(
         self, 
         messages: List[ChatMessage], 
@@ -48,22 +43,21 @@ class OpenRouterProvider(BaseLLMProvider):
         max_tokens: Optional[int] = None,
         **kwargs
     ) -> ChatResponse:
-        try:
-            model = model or self.default_model
-            client = self._create_client(model, temperature, max_tokens)
-            langchain_messages = self._convert_messages(messages)
-            response = client.invoke(langchain_messages)
-            return ChatResponse(
-                content=response.content,
-                model=model,
-                provider='openrouter',
-                metadata={
-                    'response_metadata': getattr(response, 'response_metadata', {}),
-                    'usage_metadata': getattr(response, 'usage_metadata', {})
-                }
-            )
-        except Exception as e:
-            raise Exception(f"OpenRouter API error: {str(e)}")
+        model = model or self.default_model
+        return self._chat_langchain(messages, model, temperature, max_tokens, kwargs.get('deadline'))
+
+    def stream_completion(
+        self, 
+        messages: List[ChatMessage], 
+        model: str = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> Iterator[Union[str, ChatResponse]]:
+        """Stream a chat completion from OpenRouter"""
+        model = model or self.default_model
+        return self._stream_chat_langchain(messages, model, temperature, max_tokens, kwargs.get('deadline'),
+                                           kwargs.get('cancel'))
 
     def get_available_models(self) -> List[str]:
         return [
@@ -83,7 +77,7 @@ class OpenRouterProvider(BaseLLMProvider):
             return False
         try:
             test_client = self._create_client(self.default_model, 0.1, 10)
-            test_messages = [HumanMessage(content="Hi")]
+            test_messages = self._convert_messages([ChatMessage(role='user', content="Hi")])
             test_client.invoke(test_messages)
             return True
         except Exception:
@@ -0,0 +1,265 @@
+"""
+Deadlines and Budgeted Retries
+A Deadline carries a request's remaining time into every provider attempt's
+HTTP timeout. RetryPolicy retries retryable ProviderErrors with exponential
+backoff and full jitter, honours Retry-After, never sleeps past the deadline,
+and draws every retry from a per-provider budget so an outage cannot multiply
+upstream traffic. A cancelled request is never retried and its backoff ends at
+once. Retry counts and time spent retrying are kept in RETRY_STATS.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from .cancellation import CancelToken
+from .errors import DeadlineExceededError, ProviderError, classify_error
+
+DEFAULT_MAX_ATTEMPTS = int(os.getenv('PROVIDER_MAX_ATTEMPTS', '3'))
+DEFAULT_BASE_DELAY_S = float(os.getenv('PROVIDER_RETRY_BASE_DELAY_MS', '500')) / 1000.0
+DEFAULT_MAX_DELAY_S = float(os.getenv('PROVIDER_RETRY_MAX_DELAY_MS', '8000')) / 1000.0
+# Each call earns this fraction of a retry, so retries stay below ~20% of traffic once the reserve is spent
+DEFAULT_RETRY_BUDGET_RATIO = float(os.getenv('PROVIDER_RETRY_BUDGET_RATIO', '0.2'))
+DEFAULT_RETRY_BUDGET_RESERVE = float(os.getenv('PROVIDER_RETRY_BUDGET_RESERVE', '10'))
+# Attempts are not started with less time than this left
+MIN_ATTEMPT_S = 0.05
+
+
+class Deadline:
+    """An absolute point in time by which a request must finish"""
+
+    def __init__(self, timeout_s: Optional[float] = None):
+        self.expires_at = time.monotonic() + timeout_s if timeout_s is not None else None
+
+    @classmethod
+    def coerce(cls, value: Any) -> 'Deadline':
+        """A Deadline from a Deadline, a number of seconds, or None (no deadline)"""
+        return value if isinstance(value, Deadline) else cls(float(value) if value is not None else None)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, never negative; None without a deadline"""
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def timeout(self, default: Optional[float] = None) -> Optional[float]:
+        """HTTP timeout for the next attempt: the time left, capped at ``default``"""
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return remaining if default is None else min(remaining, default)
+
+
+class RetryStats:
+    """Per-provider attempt, retry and retry-time counters"""
+
+    FIELDS = ('calls', 'attempts', 'retries', 'retry_wait_s', 'retry_attempt_s', 'succeeded_after_retry',
+              'failed', 'budget_exhausted', 'deadline_exceeded', 'cancelled')
+
+    def __init__(self):
+        self._providers: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, provider: str) -> Dict[str, Any]:
+        entry = self._providers.get(provider)
+        if entry is None:
+            entry = {name: 0 for name in self.FIELDS}
+            entry['errors'] = {}
+            self._providers[provider] = entry
+        return entry
+
+    def add(self, provider: str, **counts: float):
+        with self._lock:
+            entry = self._entry(provider)
+            for name, value in counts.items():
+                entry[name] += value
+
+    def error(self, provider: str, kind: str):
+        with self._lock:
+            errors = self._entry(provider)['errors']
+            errors[kind] = errors.get(kind, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                provider: {
+                    **{name: round(value, 3) if isinstance(value, float) else value for name, value in entry.items() if name != 'errors'},
+                    'errors': dict(entry['errors'])
+                }
+                for provider, entry in self._providers.items()
+            }
+
+
+RETRY_STATS = RetryStats()
+
+
+class RetryBudget:
+    """Token bucket: every call deposits ``ratio`` tokens (up to ``reserve``), every retry spends one"""
+
+    def __init__(self, ratio: float = DEFAULT_RETRY_BUDGET_RATIO, reserve: float = DEFAULT_RETRY_BUDGET_RESERVE):
+        self.ratio = ratio
+        self.reserve = reserve
+        self._tokens = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.reserve)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for retryable provider errors, bounded by a Deadline and a RetryBudget"""
+
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY_S,
+        max_delay: float = DEFAULT_MAX_DELAY_S,
+        budget: Optional[RetryBudget] = None
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'RetryPolicy':
+        """Policy from a provider config's ``max_attempts``, ``retry_base_delay_ms`` and ``retry_max_delay_ms``"""
+        return cls(
+            max_attempts=int(config.get('max_attempts', DEFAULT_MAX_ATTEMPTS)),
+            base_delay=float(config.get('retry_base_delay_ms', DEFAULT_BASE_DELAY_S * 1000.0)) / 1000.0,
+            max_delay=float(config.get('retry_max_delay_ms', DEFAULT_MAX_DELAY_S * 1000.0)) / 1000.0
+        )
+
+    def backoff(self, retry: int, error: ProviderError) -> float:
+        """Delay before retry number ``retry`` (1-based): Retry-After if given, else full jitter"""
+        if error.retry_after is not None:
+            return error.retry_after
+        return random.uniform(0.0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+    def call(self, attempt: Callable[[Optional[float]], Any], deadline: Optional[Deadline] = None,
+             provider: str = 'unknown', label: Optional[str] = None, timeout: Optional[float] = None,
+             cancel: Optional[CancelToken] = None) -> Any:
+        """
+        Run ``attempt(timeout_s)`` until it succeeds or may not be retried
+
+        Args:
+            attempt: One provider call, given the HTTP timeout it must respect
+            deadline: When the whole call must have finished
+            provider: Key for RETRY_STATS
+            label: Message prefix of classified errors, e.g. "OpenAI API error"
+            timeout: Per-attempt timeout cap
+            cancel: Token that stops further attempts and cuts the backoff short
+
+        Raises:
+            ProviderError: The classified error of the last attempt,
+                DeadlineExceededError if no time was left to try again, or
+                RequestCancelledError once ``cancel`` is set
+        """
+        deadline = deadline or Deadline()
+        self._begin(provider)
+        retries = 0
+        while True:
+            started = self._begin_attempt(deadline, retries, provider, label, cancel)
+            try:
+                result = attempt(deadline.timeout(timeout))
+            except Exception as e:
+                self._sleep(self._failed(e, retries, started, deadline, provider, label, cancel=cancel), cancel)
+                retries += 1
+                continue
+            self._succeeded(retries, started, provider)
+            return result
+
+    def stream(self, open_stream: Callable[[Optional[float]], Iterator[Any]], deadline: Optional[Deadline] = None,
+               provider: str = 'unknown', label: Optional[str] = None,
+               timeout: Optional[float] = None, cancel: Optional[CancelToken] = None) -> Iterator[Any]:
+        """Like ``call`` for a streamed attempt, which is only retried until it has yielded its first item"""
+        deadline = deadline or Deadline()
+        self._begin(provider)
+        retries = 0
+        while True:
+            started = self._begin_attempt(deadline, retries, provider, label, cancel)
+            yielded = False
+            try:
+                for item in open_stream(deadline.timeout(timeout)):
+                    yielded = True
+                    yield item
+            except Exception as e:
+                self._sleep(self._failed(e, retries, started, deadline, provider, label, may_retry=not yielded,
+                                         cancel=cancel), cancel)
+                retries += 1
+                continue
+            self._succeeded(retries, started, provider)
+            return
+
+    def _begin(self, provider: str):
+        self.budget.deposit()
+        RETRY_STATS.add(provider, calls=1)
+
+    @staticmethod
+    def _sleep(delay: float, cancel: Optional[CancelToken]):
+        if cancel is not None:
+            cancel.wait(delay)  # the next _begin_attempt raises if this woke up cancelled
+        else:
+            time.sleep(delay)
+
+    @staticmethod
+    def _begin_attempt(deadline: Deadline, retries: int, provider: str, label: Optional[str],
+                       cancel: Optional[CancelToken] = None) -> float:
+        if cancel is not None and cancel.cancelled:
+            RETRY_STATS.add(provider, cancelled=1)
+            raise cancel.error(provider)
+        if deadline.expired():
+            RETRY_STATS.add(provider, deadline_exceeded=1, failed=1)
+            raise DeadlineExceededError(f"{label or provider}: deadline exceeded before attempt {retries + 1}",
+                                        provider=provider)
+        RETRY_STATS.add(provider, attempts=1)
+        return time.monotonic()
+
+    @staticmethod
+    def _succeeded(retries: int, started: float, provider: str):
+        if retries:
+            RETRY_STATS.add(provider, succeeded_after_retry=1, retry_attempt_s=time.monotonic() - started)
+
+    def _failed(self, e: Exception, retries: int, started: float, deadline: Deadline, provider: str,
+                label: Optional[str], may_retry: bool = True, cancel: Optional[CancelToken] = None) -> float:
+        """Backoff before the next attempt; raises the classified error if there is none"""
+        if cancel is not None and cancel.cancelled:
+            # Whatever failed, it failed because the call was aborted
+            RETRY_STATS.add(provider, cancelled=1)
+            raise cancel.error(provider) from e
+        error = classify_error(e, provider, label)
+        RETRY_STATS.error(provider, error.kind)
+        if retries:
+            RETRY_STATS.add(provider, retry_attempt_s=time.monotonic() - started)
+        delay = self._retry_delay(error, retries + 1, deadline, provider) if may_retry else None
+        if delay is None:
+            RETRY_STATS.add(provider, failed=1)
+            raise error from e
+        RETRY_STATS.add(provider, retries=1, retry_wait_s=delay)
+        return delay
+
+    def _retry_delay(self, error: ProviderError, retry: int, deadline: Deadline, provider: str) -> Optional[float]:
+        """Backoff before the next attempt, or None if the error must be raised"""
+        if not error.retryable or retry >= self.max_attempts:
+            return None
+        delay = self.backoff(retry, error)
+        remaining = deadline.remaining()
+        if remaining is not None and delay + MIN_ATTEMPT_S > remaining:
+            return None  # waiting would use up the deadline
+        if not self.budget.withdraw():
+            RETRY_STATS.add(provider, budget_exhausted=1)
+            return None
+        return delay
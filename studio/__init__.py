@@ -0,0 +1,4 @@
+"""
+Studio Lite Mission Toolkit
+Helpers used by the Streamlit front end to plan, cache and write missions
+"""
@@ -0,0 +1,268 @@
+"""
+Agent Registry
+Agents keyed by name, user-defined agent definitions persisted to disk, and
+status/task columns from which filters and dashboard aggregates are computed
+in one pass; large registries are vectorized with NumPy, which is only
+imported once a registry grows that large
+"""
+
+import copy
+import importlib
+import json
+import os
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_DEFINITIONS_FILE = os.getenv("AGENT_DEFINITIONS_FILE", "./.agents.json")
+AGENT_STATUSES = ("Active", "Ready", "Idle", "Error")
+STATUS_ICONS = {"Active": "🟢", "Ready": "🟡", "Idle": "⚪", "Error": "🔴"}
+HISTORY_LIMIT = 50
+# Dashboard queries over fewer agents run in plain Python, so small registries never import NumPy
+VECTORIZE_MIN_AGENTS = 256
+
+DEFAULT_CONFIGURATION = {
+    "temperature": 0.7,
+    "max_tokens": 2000,
+    "verbose": True,
+    "provider": None,
+    "model": None,
+    "instructions": ""
+}
+
+BUILTIN_AGENTS = [
+    {
+        "name": "Architect",
+        "role": "Principal Software Architect",
+        "configuration": {"temperature": 0.7, "max_tokens": 2000}
+    },
+    {
+        "name": "Coder",
+        "role": "Senior Software Engineer",
+        "configuration": {"temperature": 0.3, "max_tokens": 3000}
+    }
+]
+
+
+def new_agent(definition: Dict[str, Any], builtin: bool = False) -> Dict[str, Any]:
+    """Full agent record from a definition holding at least ``name`` and ``role``"""
+    name = (definition.get("name") or "").strip()
+    if not name:
+        raise ValueError("An agent needs a name")
+    return {
+        "name": name,
+        "role": (definition.get("role") or "").strip() or name,
+        "status": definition.get("status", "Ready"),
+        "last_active": definition.get("last_active", "Never"),
+        "tasks_completed": int(definition.get("tasks_completed", 0)),
+        "current_task": "None",
+        "history": list(definition.get("history", [])),
+        "configuration": {**DEFAULT_CONFIGURATION, **definition.get("configuration", {})},
+        "builtin": builtin
+    }
+
+
+class AgentRegistry:
+    """
+    Insertion-ordered agents with O(1) lookup by name
+
+    Status and completed-task counts are mirrored in columns, so every status
+    or task change must go through ``set_status``/``complete_task`` rather
+    than by editing the agent dict. ``import_module`` loads NumPy when the
+    registry first needs it.
+    """
+
+    def __init__(self, agents: Iterable[Dict[str, Any]] = (),
+                 import_module: Callable[[str], ModuleType] = importlib.import_module):
+        self._agents: Dict[str, Dict[str, Any]] = {}
+        self._rows: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._status: List[int] = []
+        self._tasks: List[int] = []
+        self._arrays: Optional[Tuple[Any, Any]] = None  # NumPy copies of the columns, dropped on change
+        self._import_module = import_module
+        for agent in agents:
+            self._insert(agent)
+
+    @classmethod
+    def with_builtins(cls, definitions_file: Optional[str] = DEFAULT_DEFINITIONS_FILE,
+                      import_module: Callable[[str], ModuleType] = importlib.import_module) -> "AgentRegistry":
+        """The built-in Architect and Coder plus any saved user-defined agents"""
+        registry = cls(
+            (new_agent(copy.deepcopy(definition), builtin=True) for definition in BUILTIN_AGENTS),
+            import_module
+        )
+        for definition in load_definitions(definitions_file):
+            if definition.get("name") not in registry:
+                registry.add(definition)
+        return registry
+
+    # --- lookup ----------------------------------------------------------------
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._agents
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._agents.values())
+
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        return self._agents[name]
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        return self._agents.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._names)
+
+    # --- changes ---------------------------------------------------------------
+
+    def _insert(self, agent: Dict[str, Any]):
+        if agent["name"] in self._agents:
+            raise ValueError(f"An agent named {agent['name']!r} already exists")
+        if agent["status"] not in AGENT_STATUSES:
+            raise ValueError(f"Unknown status {agent['status']!r}")
+        self._agents[agent["name"]] = agent
+        self._rows[agent["name"]] = len(self._names)
+        self._names.append(agent["name"])
+        self._status.append(AGENT_STATUSES.index(agent["status"]))
+        self._tasks.append(agent["tasks_completed"])
+        self._arrays = None
+
+    def add(self, definition: Dict[str, Any]) -> Dict[str, Any]:
+        """Register a user-defined agent"""
+        agent = new_agent(definition)
+        self._insert(agent)
+        return agent
+
+    def remove(self, name: str):
+        """Remove a user-defined agent; built-in agents cannot be removed"""
+        agent = self._agents[name]
+        if agent["builtin"]:
+            raise ValueError(f"{name} is a built-in agent")
+        row = self._rows.pop(name)
+        del self._agents[name]
+        del self._names[row]
+        del self._status[row]
+        del self._tasks[row]
+        self._arrays = None
+        for later in self._names[row:]:
+            self._rows[later] -= 1
+
+    def set_status(self, name: str, status: str, current_task: Optional[str] = None,
+                   last_active: Optional[str] = None):
+        agent = self._agents[name]
+        self._status[self._rows[name]] = AGENT_STATUSES.index(status)
+        self._arrays = None
+        agent["status"] = status
+        if current_task is not None:
+            agent["current_task"] = current_task
+        if last_active is not None:
+            agent["last_active"] = last_active
+
+    def complete_task(self, name: str, entry: Optional[str] = None):
+        """Count a finished task, optionally logging it"""
+        agent = self._agents[name]
+        agent["tasks_completed"] += 1
+        self._tasks[self._rows[name]] = agent["tasks_completed"]
+        self._arrays = None
+        if entry:
+            self.log(name, entry)
+
+    def log(self, name: str, entry: str):
+        history = self._agents[name]["history"]
+        history.append(entry)
+        del history[:-HISTORY_LIMIT]
+
+    # --- dashboard queries -----------------------------------------------------
+
+    def _vectorized(self) -> Optional[Tuple[ModuleType, Any, Any]]:
+        """NumPy and the status and task columns as arrays, or None for a registry too small to need them"""
+        if len(self._names) < VECTORIZE_MIN_AGENTS:
+            return None
+        np = self._import_module("numpy")
+        if self._arrays is None:
+            self._arrays = (np.array(self._status, dtype=np.int8), np.array(self._tasks, dtype=np.int64))
+        return (np,) + self._arrays
+
+    def filter(self, statuses: Optional[Iterable[str]] = None, text: str = "") -> List[str]:
+        """Names of agents in any of ``statuses`` whose name or role contains ``text``"""
+        if statuses is None:
+            rows = range(len(self._names))
+        else:
+            codes = [AGENT_STATUSES.index(status) for status in statuses]
+            vectorized = self._vectorized()
+            if vectorized:
+                np, status, _ = vectorized
+                rows = np.flatnonzero(np.isin(status, codes))
+            else:
+                rows = [row for row, code in enumerate(self._status) if code in codes]
+        names = [self._names[row] for row in rows]
+        needle = text.strip().lower()
+        if needle:
+            names = [
+                name for name in names
+                if needle in name.lower() or needle in self._agents[name]["role"].lower()
+            ]
+        return names
+
+    def aggregates(self) -> Dict[str, Any]:
+        """Status counts and task totals over all agents"""
+        vectorized = self._vectorized()
+        if vectorized:
+            np, status, tasks = vectorized
+            counts = np.bincount(status, minlength=len(AGENT_STATUSES)).tolist()
+            total = int(tasks.sum())
+        else:
+            counts = [self._status.count(code) for code in range(len(AGENT_STATUSES))]
+            total = sum(self._tasks)
+        return {
+            "agents": len(self._names),
+            "by_status": dict(zip(AGENT_STATUSES, counts)),
+            "total_tasks": total,
+            "mean_tasks": total / len(self._tasks) if self._tasks else 0.0
+        }
+
+    def task_counts(self, limit: Optional[int] = None) -> Tuple[List[str], List[int]]:
+        """Agents by completed tasks, most first"""
+        vectorized = self._vectorized()
+        if vectorized:
+            np, _, tasks = vectorized
+            order = np.argsort(-tasks, kind="stable")[:limit].tolist()
+        else:
+            order = sorted(range(len(self._tasks)), key=lambda row: -self._tasks[row])[:limit]
+        return [self._names[row] for row in order], [self._tasks[row] for row in order]
+
+    def definitions(self) -> List[Dict[str, Any]]:
+        """User-defined agents in the form ``save_definitions`` writes"""
+        return [
+            {"name": agent["name"], "role": agent["role"], "configuration": agent["configuration"]}
+            for agent in self._agents.values() if not agent["builtin"]
+        ]
+
+
+def paginate(items: List[Any], page: int, page_size: int) -> Tuple[List[Any], int]:
+    """One page of ``items`` (pages start at 1) and the page count"""
+    pages = max(1, -(-len(items) // page_size))
+    page = min(max(1, page), pages)
+    return items[(page - 1) * page_size:page * page_size], pages
+
+
+def load_definitions(path: Optional[str] = DEFAULT_DEFINITIONS_FILE) -> List[Dict[str, Any]]:
+    """Saved user-defined agents, or an empty list"""
+    if not path:
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as definitions_file:
+            definitions = json.load(definitions_file)
+    except (OSError, ValueError):
+        return []
+    return definitions if isinstance(definitions, list) else []
+
+
+def save_definitions(registry: AgentRegistry, path: str = DEFAULT_DEFINITIONS_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as definitions_file:
+        json.dump(registry.definitions(), definitions_file, indent=2)
+    os.replace(tmp_path, path)
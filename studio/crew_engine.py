@@ -0,0 +1,150 @@
+"""
+CrewAI Execution Engine
+Runs missions through CrewAI crews, executing independent tasks concurrently
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from crewai import Agent, Crew, Process, Task
+
+from .project import parse_plan_files, strip_code_fences
+
+PLAN_FORMAT_INSTRUCTIONS = (
+    "Return the plan as a sequence of files. Start each file with a line "
+    "'File: <relative path>' followed by the full contents of that file in a fenced code block."
+)
+
+
+@dataclass
+class TaskTiming:
+    """Wall-clock timing of a single crew task"""
+    name: str
+    agent: str
+    started_at: float  # seconds since the start of the run
+    duration: float
+    ok: bool = True
+
+
+@dataclass
+class CrewRunResult:
+    """Outcome of a mission executed by the CrewAI engine"""
+    plan: str
+    files: Dict[str, str]
+    timings: List[TaskTiming] = field(default_factory=list)
+    wall_time: float = 0.0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def task_time(self) -> float:
+        """Sum of task durations, i.e. what a serial run would have taken"""
+        return sum(timing.duration for timing in self.timings)
+
+
+def _crew_output_text(output) -> str:
+    """Extract the text from a crew result across CrewAI versions"""
+    return str(getattr(output, 'raw', output))
+
+
+class CrewMissionEngine:
+    """
+    Executes a mission with the Architect and Coder agents
+
+    The Architect's planning task runs first. Every file in the plan is then
+    finalised by its own Coder task; those tasks only depend on the plan, so
+    they are dispatched as concurrent asyncio tasks, each kicking off a
+    single-task crew in a worker thread.
+    """
+
+    def __init__(self, architect: Agent, coder: Agent, max_concurrency: int = 4):
+        self.architect = architect
+        self.coder = coder
+        self.max_concurrency = max(1, max_concurrency)
+
+    def _plan_task(self, mission: str, agent: Agent) -> Task:
+        return Task(
+            description=f"{mission}\n\n{PLAN_FORMAT_INSTRUCTIONS}",
+            expected_output="A step-by-step plan listing every file with its full code.",
+            agent=agent
+        )
+
+    def _file_task(self, plan: str, path: str, agent: Agent) -> Task:
+        return Task(
+            description=(
+                f"The architect produced the following plan:\n\n{plan}\n\n"
+                f"Write the final, complete contents of the file '{path}' exactly as the plan intends. "
+                "Output only the file contents, with no commentary."
+            ),
+            expected_output=f"The complete contents of {path}.",
+            agent=agent
+        )
+
+    @staticmethod
+    def _task_agent(agent: Agent) -> Agent:
+        """Give each concurrent crew its own agent copy so executors are not shared"""
+        copy = getattr(agent, 'copy', None)
+        return copy() if callable(copy) else agent
+
+    async def _kickoff(self, name: str, agent: Agent, task: Task, run_start: float,
+                       timings: List[TaskTiming], semaphore: asyncio.Semaphore) -> str:
+        """Run a single-task crew in a worker thread and record its timing"""
+        crew = Crew(agents=[agent], tasks=[task], process=Process.sequential, verbose=False)
+        async with semaphore:
+            started = time.perf_counter()
+            ok = False
+            try:
+                output = await asyncio.to_thread(crew.kickoff)
+                ok = True
+                return _crew_output_text(output)
+            finally:
+                timings.append(TaskTiming(
+                    name=name,
+                    agent=agent.role,
+                    started_at=started - run_start,
+                    duration=time.perf_counter() - started,
+                    ok=ok
+                ))
+
+    async def run_async(self, mission: str) -> CrewRunResult:
+        """Execute the mission and return the plan, files and task timings"""
+        run_start = time.perf_counter()
+        timings: List[TaskTiming] = []
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        plan = await self._kickoff(
+            'plan', self.architect, self._plan_task(mission, self.architect),
+            run_start, timings, semaphore
+        )
+        files = parse_plan_files(plan)
+
+        paths = list(files.keys())
+        file_tasks = []
+        for path in paths:
+            agent = self._task_agent(self.coder)
+            file_tasks.append(asyncio.create_task(self._kickoff(
+                f"write {path}", agent, self._file_task(plan, path, agent),
+                run_start, timings, semaphore
+            )))
+        outputs = await asyncio.gather(*file_tasks, return_exceptions=True)
+
+        errors = {}
+        for path, output in zip(paths, outputs):
+            if isinstance(output, BaseException):
+                # Keep the Architect's version of the file if the Coder failed
+                errors[path] = str(output)
+            else:
+                files[path] = strip_code_fences(output)
+
+        return CrewRunResult(
+            plan=plan,
+            files=files,
+            timings=sorted(timings, key=lambda timing: timing.started_at),
+            wall_time=time.perf_counter() - run_start,
+            errors=errors
+        )
+
+    def run(self, mission: str) -> CrewRunResult:
+        """Synchronous entry point for the Streamlit script thread"""
+        return asyncio.run(self.run_async(mission))
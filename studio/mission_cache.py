@@ -0,0 +1,228 @@
+"""
+Mission Result Cache
+Content-addressed blob store and mission cache for previously generated projects
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional
+
+DEFAULT_CACHE_DIR = os.getenv("MISSION_CACHE_DIR", "./.mission_cache")
+DEFAULT_MAX_BYTES = int(float(os.getenv("MISSION_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+
+def content_digest(data: bytes) -> str:
+    """Return the SHA-256 hex digest used to address blobs"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    """
+    Deduplicating, size-capped blob store
+
+    Each unique content is stored once under its SHA-256 digest. Access times
+    are tracked in a small JSON index, and the least recently used blobs are
+    evicted once the store grows past ``max_bytes``.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._objects_dir = os.path.join(root, 'objects')
+        self._index_path = os.path.join(root, 'index.json')
+        self._lock = threading.Lock()
+        os.makedirs(self._objects_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    def _load_index(self) -> Dict[str, Dict[str, float]]:
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as index_file:
+                return json.load(index_file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as index_file:
+            json.dump(self._index, index_file)
+        os.replace(tmp_path, self._index_path)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self._objects_dir, digest[:2], digest[2:])
+
+    @property
+    def total_bytes(self) -> int:
+        return int(sum(entry['size'] for entry in self._index.values()))
+
+    def put(self, content: str) -> str:
+        """Store text content and return its digest"""
+        digests = self.put_many([content])
+        return digests[0]
+
+    def put_many(self, contents: Iterable[str]) -> list:
+        """Store several contents at once, evicting only after all are written"""
+        now = time.time()
+        digests = []
+        with self._lock:
+            for content in contents:
+                data = content.encode('utf-8')
+                digest = content_digest(data)
+                digests.append(digest)
+                if digest in self._index and os.path.exists(self._blob_path(digest)):
+                    self._index[digest]['last_access'] = now
+                    continue
+                blob_path = self._blob_path(digest)
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                tmp_path = f"{blob_path}.tmp"
+                with open(tmp_path, 'wb') as blob_file:
+                    blob_file.write(data)
+                os.replace(tmp_path, blob_path)
+                self._index[digest] = {'size': len(data), 'last_access': now}
+            self._evict(protect=set(digests))
+            self._save_index()
+        return digests
+
+    def get(self, digest: str) -> Optional[str]:
+        """Return the content for a digest, or None if it has been evicted"""
+        with self._lock:
+            return self._read(digest, time.time())
+
+    def get_many(self, digests: Iterable[str]) -> Optional[Dict[str, str]]:
+        """Return contents for all digests, or None if any of them is missing"""
+        now = time.time()
+        contents = {}
+        with self._lock:
+            for digest in digests:
+                content = self._read(digest, now)
+                if content is None:
+                    return None
+                contents[digest] = content
+            self._save_index()
+        return contents
+
+    def _read(self, digest: str, now: float) -> Optional[str]:
+        entry = self._index.get(digest)
+        if entry is None:
+            return None
+        try:
+            with open(self._blob_path(digest), 'rb') as blob_file:
+                content = blob_file.read().decode('utf-8')
+        except OSError:
+            del self._index[digest]
+            return None
+        entry['last_access'] = now
+        return content
+
+    def _evict(self, protect: set):
+        """Drop least recently used blobs until the store fits its size cap"""
+        total = self.total_bytes
+        if total <= self.max_bytes:
+            return
+        for digest, entry in sorted(self._index.items(), key=lambda item: item[1]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if digest in protect:
+                continue
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+            del self._index[digest]
+            total -= entry['size']
+
+
+@dataclass
+class CachedMission:
+    """A mission result restored from the cache"""
+    key: str
+    plan: str
+    files: Dict[str, str]
+    created_at: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class MissionCache:
+    """
+    Cache of mission results keyed on the mission and its LLM configuration
+
+    Entries only hold digests; the plan and file contents live in a shared
+    ``BlobStore`` so that similar projects reuse identical files on disk.
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.blobs = BlobStore(os.path.join(root, 'blobs'), max_bytes=max_bytes)
+        self._missions_dir = os.path.join(root, 'missions')
+        os.makedirs(self._missions_dir, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def mission_key(mission: str, provider: str, model: str, agent_configs: Dict[str, Any]) -> str:
+        """Build the cache key for a mission and the configuration that ran it"""
+        payload = json.dumps(
+            {
+                'mission': mission.strip(),
+                'provider': provider,
+                'model': model,
+                'agents': agent_configs
+            },
+            sort_keys=True,
+            default=str
+        )
+        return content_digest(payload.encode('utf-8'))
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self._missions_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[CachedMission]:
+        """Return the cached mission for a key, or None on a miss"""
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as entry_file:
+                entry = json.load(entry_file)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        digests = [entry['plan']] + list(entry['files'].values())
+        contents = self.blobs.get_many(digests)
+        if contents is None:
+            # Part of the result was evicted from the blob store
+            self.invalidate(key)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return CachedMission(
+            key=key,
+            plan=contents[entry['plan']],
+            files={path: contents[digest] for path, digest in entry['files'].items()},
+            created_at=entry.get('created_at', 0.0),
+            metadata=entry.get('metadata', {})
+        )
+
+    def put(self, key: str, plan: str, files: Dict[str, str], metadata: Optional[Dict[str, Any]] = None):
+        """Store a mission result"""
+        paths = list(files.keys())
+        digests = self.blobs.put_many([plan] + [files[path] for path in paths])
+        entry = {
+            'plan': digests[0],
+            'files': dict(zip(paths, digests[1:])),
+            'created_at': time.time(),
+            'metadata': metadata or {}
+        }
+        tmp_path = f"{self._entry_path(key)}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as entry_file:
+            json.dump(entry, entry_file)
+        os.replace(tmp_path, self._entry_path(key))
+
+    def invalidate(self, key: str):
+        """Remove a mission entry (its blobs are left for LRU eviction)"""
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
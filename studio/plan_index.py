@@ -0,0 +1,279 @@
+"""
+Plan Vector Index
+Local vector index of past missions, plans and generated files, used to give
+the Architect the most relevant prior work for a new mission
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_INDEX_DIR = os.getenv("PLAN_INDEX_DIR", "./.plan_index")
+# Below this many vectors a brute-force scan is both exact and fast enough
+IVF_MIN_ROWS = int(os.getenv("PLAN_INDEX_IVF_MIN_ROWS", "20000"))
+IVF_PROBES = 8
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 20000
+SCAN_CHUNK_ROWS = 65536
+SNIPPET_CHARS = 1500
+INITIAL_CAPACITY = 1024
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def mission_records(mission: str, plan: str, files: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Split a finished mission into the records the index stores"""
+    mission_id = hashlib.sha256(f"{mission}\0{plan}".encode("utf-8")).hexdigest()[:16]
+    overview = plan.split("File:", 1)[0].strip() or plan
+    records = [
+        {"mission_id": mission_id, "kind": "mission", "path": None, "mission": mission[:200], "text": mission[:SNIPPET_CHARS]},
+        {"mission_id": mission_id, "kind": "plan", "path": None, "mission": mission[:200], "text": overview[:SNIPPET_CHARS]},
+    ]
+    for path, code in files.items():
+        records.append({
+            "mission_id": mission_id,
+            "kind": "file",
+            "path": path,
+            "mission": mission[:200],
+            "text": code[:SNIPPET_CHARS]
+        })
+    return records
+
+
+def embedding_text(record: Dict[str, Any]) -> str:
+    """Text that is embedded for a record"""
+    header = f"{record['kind']}: {record['path']}" if record.get("path") else record["kind"]
+    return f"{header}\n{record['text']}"
+
+
+def format_snippets(results: Sequence[Tuple[float, Dict[str, Any]]], max_chars: int = 6000) -> str:
+    """Render search results as a prompt section, within a character budget"""
+    if not results:
+        return ""
+    parts = ["Relevant snippets from previous missions (reuse their structure where it fits):"]
+    used = len(parts[0])
+    for score, record in results:
+        title = f"{record['kind']} {record['path']}" if record.get("path") else record["kind"]
+        block = f"\n### {title} (from mission: {record['mission']!r}, similarity {score:.2f})\n```\n{record['text']}\n```"
+        if used + len(block) > max_chars:
+            break
+        parts.append(block)
+        used += len(block)
+    return "".join(parts) if len(parts) > 1 else ""
+
+
+class PlanIndex:
+    """
+    Append-only cosine-similarity index stored as a memory-mapped float32 matrix
+
+    Small indexes are searched exactly; once the index holds ``IVF_MIN_ROWS``
+    vectors an inverted-file index (k-means cells) is trained and searches
+    scan only the cells closest to the query. The cells are retrained each
+    time the index doubles in size; rows added in between join their nearest cell.
+    """
+
+    def __init__(self, root: str = DEFAULT_INDEX_DIR, ivf_min_rows: int = IVF_MIN_ROWS):
+        self.root = root
+        self.ivf_min_rows = ivf_min_rows
+        self._lock = threading.Lock()
+        self._vectors_path = os.path.join(root, "vectors.f32")
+        self._meta_path = os.path.join(root, "meta.json")
+        self._records_path = os.path.join(root, "records.jsonl")
+        self._centroids_path = os.path.join(root, "ivf_centroids.npy")
+        self._assign_path = os.path.join(root, "ivf_assign.npy")
+        os.makedirs(root, exist_ok=True)
+        self.meta = self._load_meta()
+        self.records = self._load_records()
+        self.mission_ids = {record["mission_id"] for record in self.records}
+        self._matrix: Optional[np.memmap] = None
+        if self.meta["dim"]:
+            self._open_matrix()
+        self._centroids, self._assign = self._load_ivf()
+
+    # --- persistence -----------------------------------------------------------
+
+    def _load_meta(self) -> Dict[str, Any]:
+        try:
+            with open(self._meta_path, "r", encoding="utf-8") as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return {"dim": 0, "count": 0, "capacity": 0, "ivf_trained_at": 0}
+
+    def _save_meta(self):
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as meta_file:
+            json.dump(self.meta, meta_file)
+        os.replace(tmp_path, self._meta_path)
+
+    def _load_records(self) -> List[Dict[str, Any]]:
+        records = []
+        try:
+            with open(self._records_path, "r", encoding="utf-8") as records_file:
+                for line in records_file:
+                    if line.strip():
+                        records.append(json.loads(line))
+        except OSError:
+            pass
+        if len(records) > self.meta["count"]:
+            # A crash between writing records and the meta leaves extra lines; the meta count wins
+            records = records[:self.meta["count"]]
+            with open(self._records_path, "w", encoding="utf-8") as records_file:
+                records_file.writelines(json.dumps(record) + "\n" for record in records)
+        return records
+
+    def _open_matrix(self):
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                 shape=(self.meta["capacity"], self.meta["dim"]))
+
+    def _ensure_capacity(self, rows: int, dim: int):
+        if not self.meta["dim"]:
+            self.meta["dim"] = dim
+        elif dim != self.meta["dim"]:
+            raise ValueError(f"Embedding width {dim} does not match the index width {self.meta['dim']}")
+        if rows <= self.meta["capacity"]:
+            return
+        capacity = max(INITIAL_CAPACITY, self.meta["capacity"])
+        while capacity < rows:
+            capacity *= 2
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        with open(self._vectors_path, "ab") as vectors_file:
+            vectors_file.truncate(capacity * dim * 4)
+        self.meta["capacity"] = capacity
+        self._open_matrix()
+
+    def _load_ivf(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        if not self.meta.get("ivf_trained_at"):
+            return None, None
+        try:
+            centroids = np.load(self._centroids_path)
+            assign = np.load(self._assign_path)
+        except (OSError, ValueError):
+            return None, None
+        if len(assign) < self.meta["count"]:
+            # Rows appended after the last save join their nearest cell
+            extra = self._nearest_cells(centroids, self._matrix[len(assign):self.meta["count"]])
+            assign = np.concatenate([assign, extra])
+        return centroids, assign
+
+    def _save_ivf(self):
+        np.save(self._centroids_path, self._centroids)
+        np.save(self._assign_path, self._assign)
+
+    # --- building --------------------------------------------------------------
+
+    def add(self, records: List[Dict[str, Any]], vectors: np.ndarray):
+        """Append records with their embeddings"""
+        if not records:
+            return
+        vectors = _normalize(vectors)
+        with self._lock:
+            start = self.meta["count"]
+            self._ensure_capacity(start + len(records), vectors.shape[1])
+            self._matrix[start:start + len(records)] = vectors
+            self._matrix.flush()
+            with open(self._records_path, "a", encoding="utf-8") as records_file:
+                for record in records:
+                    records_file.write(json.dumps(record) + "\n")
+            self.records.extend(records)
+            self.mission_ids.update(record["mission_id"] for record in records)
+            self.meta["count"] = start + len(records)
+
+            count = self.meta["count"]
+            trained_at = self.meta.get("ivf_trained_at", 0)
+            if count >= self.ivf_min_rows and (not trained_at or count >= 2 * trained_at):
+                self._train_ivf()
+            elif self._centroids is not None:
+                self._assign = np.concatenate([self._assign, self._nearest_cells(self._centroids, vectors)])
+                self._save_ivf()
+            self._save_meta()
+
+    def add_mission(self, mission: str, plan: str, files: Dict[str, str],
+                    embed: Callable[[List[str]], Optional[np.ndarray]]) -> int:
+        """Index a finished mission unless it is already indexed; returns the records added"""
+        records = mission_records(mission, plan, files)
+        if records[0]["mission_id"] in self.mission_ids:
+            return 0
+        vectors = embed([embedding_text(record) for record in records])
+        if vectors is None:
+            return 0
+        self.add(records, vectors)
+        return len(records)
+
+    @staticmethod
+    def _nearest_cells(centroids: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        cells = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), SCAN_CHUNK_ROWS):
+            chunk = np.asarray(vectors[start:start + SCAN_CHUNK_ROWS])
+            cells[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        return cells
+
+    def _train_ivf(self):
+        """Spherical k-means over a sample of the vectors"""
+        count = self.meta["count"]
+        cells = int(min(1024, max(8, np.sqrt(count))))
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(count, size=min(count, KMEANS_SAMPLE), replace=False))
+        sample = np.asarray(self._matrix[sample_rows])
+        centroids = sample[rng.choice(len(sample), size=cells, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            empty = ~np.bincount(assign, minlength=cells).astype(bool)
+            sums[empty] = centroids[empty]  # keep cells that attracted nothing
+            centroids = _normalize(sums)
+        self._centroids = centroids
+        self._assign = self._nearest_cells(centroids, self._matrix[:count])
+        self.meta["ivf_trained_at"] = count
+        self._save_ivf()
+
+    # --- search ----------------------------------------------------------------
+
+    def search(self, query: np.ndarray, k: int = 5, kinds: Optional[Iterable[str]] = None,
+               exclude_mission: Optional[str] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """Top-k records by cosine similarity to ``query``"""
+        with self._lock:
+            count = self.meta["count"]
+            if not count:
+                return []
+            query = _normalize(query).reshape(-1)
+            if self._centroids is not None:
+                probes = np.argsort(self._centroids @ query)[::-1][:IVF_PROBES]
+                rows = np.flatnonzero(np.isin(self._assign[:count], probes))
+                scores = np.asarray(self._matrix[rows]) @ query if len(rows) else np.zeros(0, dtype=np.float32)
+            else:
+                rows = np.arange(count)
+                scores = np.concatenate([
+                    np.asarray(self._matrix[start:min(start + SCAN_CHUNK_ROWS, count)]) @ query
+                    for start in range(0, count, SCAN_CHUNK_ROWS)
+                ])
+            kinds = set(kinds) if kinds else None
+            results = []
+            for position in np.argsort(scores)[::-1]:
+                record = self.records[rows[position]]
+                if kinds and record["kind"] not in kinds:
+                    continue
+                if exclude_mission and record["mission_id"] == exclude_mission:
+                    continue
+                results.append((float(scores[position]), record))
+                if len(results) >= k:
+                    break
+            return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "vectors": self.meta["count"],
+            "missions": len(self.mission_ids),
+            "dim": self.meta["dim"],
+            "mode": "ivf" if self._centroids is not None else "exact"
+        }
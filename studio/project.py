@@ -0,0 +1,89 @@
+"""
+Generated Project Helpers
+Parses Architect plans into file sets and writes them to the project directory
+"""
+
+import os
+import re
+from typing import Dict, List, Optional
+
+PROJECT_PATH = "./generated_project"
+
+_FENCE_OPEN = re.compile(r"^```[\w+.-]*[ \t]*\n?")
+_FENCE_CLOSE = re.compile(r"\n?```\s*$")
+
+
+def strip_code_fences(code: str) -> str:
+    """Remove a surrounding Markdown code fence from a block of code"""
+    code = code.strip()
+    code = _FENCE_OPEN.sub("", code, count=1)
+    code = _FENCE_CLOSE.sub("", code, count=1)
+    return code.strip()
+
+
+def parse_plan_files(plan: str) -> Dict[str, str]:
+    """
+    Extract the files described in an Architect plan
+
+    The plan format is a sequence of ``File: <path>`` headers, each followed
+    by the full contents of that file (optionally inside a code fence).
+
+    Args:
+        plan: Plan text returned by the Architect
+
+    Returns:
+        Mapping of relative file path to file contents, in plan order
+    """
+    files = {}
+    for section in plan.split('File: ')[1:]:
+        if '\n' not in section:
+            continue
+        file_path, code_block = section.split('\n', 1)
+        file_path = file_path.strip().strip('`*').strip()
+        if file_path:
+            files[file_path] = strip_code_fences(code_block)
+    return files
+
+
+def render_plan_files(files: Dict[str, str]) -> str:
+    """Render a file set back into the ``File: <path>`` plan format"""
+    return "\n\n".join(f"File: {path}\n```\n{code}\n```" for path, code in files.items())
+
+
+def resolve_project_path(project_path: str, relative_path: str) -> str:
+    """Resolve a plan path inside the project directory, rejecting escapes"""
+    root = os.path.abspath(project_path)
+    full_path = os.path.abspath(os.path.join(root, relative_path))
+    if os.path.commonpath([root, full_path]) != root:
+        raise ValueError(f"Path escapes the project directory: {relative_path}")
+    return full_path
+
+
+def write_project_file(relative_path: str, code: str, project_path: str = PROJECT_PATH) -> Optional[str]:
+    """
+    Write one generated file, skipping the write if the contents are unchanged
+
+    Returns:
+        Full path of the written file, or None if it was already up to date
+    """
+    full_path = resolve_project_path(project_path, relative_path)
+    try:
+        with open(full_path, 'r', encoding='utf-8') as existing:
+            if existing.read() == code:
+                return None
+    except (OSError, UnicodeDecodeError):
+        pass
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'w', encoding='utf-8') as code_file:
+        code_file.write(code)
+    return full_path
+
+
+def write_project_files(files: Dict[str, str], project_path: str = PROJECT_PATH) -> List[str]:
+    """Write a file set to disk and return the full paths that changed"""
+    written = []
+    for relative_path, code in files.items():
+        full_path = write_project_file(relative_path, code, project_path)
+        if full_path:
+            written.append(full_path)
+    return written
@@ -0,0 +1,93 @@
+"""
+Incremental Re-planning
+Sends only the mission delta to the Architect and merges the changed files back in
+"""
+
+import difflib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from .project import render_plan_files
+
+DELETE_MARKER = "DELETE"
+
+REPLAN_SYSTEM_PROMPT = (
+    "You are a legendary software architect revising an existing project after the mission changed. "
+    "Return ONLY the files that must change to satisfy the updated mission. For each changed or new file, "
+    "write a line 'File: <path>' followed by the full new contents in a fenced code block. To remove a file, "
+    f"write 'File: <path>' followed by a line containing only {DELETE_MARKER}. Never repeat unchanged files."
+)
+
+
+@dataclass
+class PlanDelta:
+    """Result of merging the Architect's changes into the previous file set"""
+    files: Dict[str, str]
+    changed: List[str] = field(default_factory=list)
+    added: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+
+
+def mission_diff(previous_mission: str, mission: str) -> str:
+    """Unified diff between the previous and the updated mission text"""
+    return "\n".join(difflib.unified_diff(
+        previous_mission.strip().splitlines(),
+        mission.strip().splitlines(),
+        fromfile="previous mission",
+        tofile="updated mission",
+        lineterm=""
+    ))
+
+
+def build_replan_messages(
+    previous_mission: str,
+    mission: str,
+    previous_files: Dict[str, str],
+    focus_paths: Optional[Sequence[str]] = None
+) -> List[Dict[str, str]]:
+    """
+    Build the Architect prompt for an edit: previous plan plus the mission diff
+
+    When ``focus_paths`` is given only those files are sent in full; the rest
+    of the project is listed by path so the Architect can still add to it.
+    """
+    if focus_paths is None:
+        project = f"Current project files:\n\n{render_plan_files(previous_files)}"
+    else:
+        focus = {path: previous_files[path] for path in focus_paths if path in previous_files}
+        manifest = "\n".join(f"- {path}" for path in previous_files if path not in focus)
+        project = f"Files most relevant to the change:\n\n{render_plan_files(focus)}"
+        if manifest:
+            project += f"\n\nOther project files (unchanged unless you return them):\n{manifest}"
+    return [
+        {"role": "system", "content": REPLAN_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": f"Mission changes:\n```diff\n{mission_diff(previous_mission, mission)}\n```\n\n{project}"
+        }
+    ]
+
+
+def apply_plan_changes(previous_files: Dict[str, str], changes: Dict[str, str]) -> PlanDelta:
+    """
+    Merge the files returned for an edit into the previous file set
+
+    Args:
+        previous_files: File set of the previous mission run
+        changes: Files parsed from the Architect's edit response
+
+    Returns:
+        PlanDelta with the merged file set and what changed
+    """
+    delta = PlanDelta(files=dict(previous_files))
+    for path, code in changes.items():
+        if code.strip() == DELETE_MARKER:
+            if delta.files.pop(path, None) is not None:
+                delta.deleted.append(path)
+        elif path not in delta.files:
+            delta.files[path] = code
+            delta.added.append(path)
+        elif delta.files[path] != code:
+            delta.files[path] = code
+            delta.changed.append(path)
+    return delta
@@ -0,0 +1,62 @@
+"""
+Startup Timing
+Records how long Studio Lite takes to reach its first paint and what each
+deferred dependency costs when it is first imported
+"""
+
+import importlib
+import os
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Any, Dict, List, Optional
+
+DEFAULT_BUDGET_MS = float(os.getenv("STUDIO_STARTUP_BUDGET_MS", "1500"))
+MAX_RUNS = 50
+
+
+class StartupReport:
+    """First-paint times of script runs and first-import times of heavy dependencies"""
+
+    def __init__(self, budget_ms: float = DEFAULT_BUDGET_MS):
+        self.budget_ms = budget_ms
+        self.imports: Dict[str, float] = {}
+        self.cold_first_paint_ms: Optional[float] = None
+        self.first_paints: List[float] = []  # the most recent MAX_RUNS runs
+        self.runs = 0
+        self._lock = threading.Lock()
+
+    def import_module(self, name: str) -> ModuleType:
+        """Import a module, timing it if this process has not imported it yet"""
+        if name in sys.modules:
+            return sys.modules[name]
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        with self._lock:
+            self.imports.setdefault(name, (time.perf_counter() - started) * 1000.0)
+        return module
+
+    def record_first_paint(self, elapsed_s: float):
+        """Time from the start of a script run to its first rendered elements"""
+        with self._lock:
+            if self.cold_first_paint_ms is None:
+                self.cold_first_paint_ms = elapsed_s * 1000.0
+            self.runs += 1
+            self.first_paints.append(elapsed_s * 1000.0)
+            del self.first_paints[:-MAX_RUNS]
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            cold = self.cold_first_paint_ms
+            last = self.first_paints[-1] if self.first_paints else None
+            runs = self.runs
+            imports = dict(self.imports)
+        return {
+            "budget_ms": self.budget_ms,
+            "cold_first_paint_ms": round(cold, 1) if cold is not None else None,
+            "last_first_paint_ms": round(last, 1) if last is not None else None,
+            "over_budget": cold is not None and cold > self.budget_ms,
+            "runs": runs,
+            "deferred_imports_ms": {name: round(ms, 1) for name, ms in sorted(imports.items(), key=lambda item: -item[1])}
+        }
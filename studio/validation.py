@@ -0,0 +1,375 @@
+"""
+Generated Project Validation
+Parallel, incremental syntax and import checks for files written by the Coder
+"""
+
+import ast
+import hashlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .mission_cache import DEFAULT_CACHE_DIR
+
+DEFAULT_VALIDATION_CACHE = os.path.join(DEFAULT_CACHE_DIR, 'validation.json')
+SKIPPED_DIRS = {'__pycache__', 'node_modules', '.git', '.venv', 'venv'}
+
+
+@dataclass
+class ValidationIssue:
+    """A single problem found in a generated file"""
+    path: str
+    checker: str  # 'python', 'import', 'json', 'yaml', 'toml', 'xml'
+    message: str
+    line: Optional[int] = None
+    column: Optional[int] = None
+    severity: str = 'error'  # 'error' or 'warning'
+
+    def __str__(self) -> str:
+        location = f":{self.line}" if self.line else ""
+        return f"{self.path}{location} [{self.checker}] {self.message}"
+
+
+@dataclass
+class ValidationReport:
+    """Result of validating a generated project"""
+    issues: List[ValidationIssue] = field(default_factory=list)
+    checked: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    @property
+    def errors(self) -> List[ValidationIssue]:
+        return [issue for issue in self.issues if issue.severity == 'error']
+
+    @property
+    def warnings(self) -> List[ValidationIssue]:
+        return [issue for issue in self.issues if issue.severity == 'warning']
+
+    @property
+    def failing_paths(self) -> List[str]:
+        """Files with at least one error, in first-seen order"""
+        return list(dict.fromkeys(issue.path for issue in self.errors))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'issues': [asdict(issue) for issue in self.issues],
+            'checked': self.checked,
+            'unchanged': self.unchanged,
+            'error_count': len(self.errors),
+            'warning_count': len(self.warnings)
+        }
+
+
+# --- Checkers -----------------------------------------------------------------
+# Checkers are module-level functions so they can run in worker processes.
+
+def _requirement_names(requirements: str) -> Set[str]:
+    """Normalised distribution names listed in a requirements file"""
+    names = set()
+    for line in requirements.splitlines():
+        line = line.split('#', 1)[0].strip()
+        match = re.match(r"[A-Za-z0-9_.-]+", line)
+        if match and not line.startswith('-'):
+            names.add(match.group(0).lower().replace('-', '_'))
+    return names
+
+
+def _module_exists(parts: List[str], local_modules: Set[str]) -> bool:
+    """Whether a dotted module path (as path parts) exists in the project"""
+    module_path = '/'.join(parts)
+    return f"{module_path}.py" in local_modules or module_path in local_modules
+
+
+def _check_imports(path: str, tree: ast.AST, context: Dict[str, Any]) -> List[ValidationIssue]:
+    local_modules = context['local_modules']
+    requirements = context['requirements']
+    package_parts = [part for part in os.path.dirname(path).split('/') if part]
+    issues = []
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            targets = [(alias.name, 0) for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            targets = [(node.module or '', node.level)]
+        else:
+            continue
+
+        for module, level in targets:
+            if level:
+                if level - 1 > len(package_parts):
+                    base = None
+                else:
+                    base = package_parts[:len(package_parts) - (level - 1)]
+                if base is None:
+                    found = False
+                elif module:
+                    found = _module_exists(base + module.split('.'), local_modules)
+                else:
+                    # "from . import name" only needs the package itself
+                    found = _module_exists(base + ['__init__'], local_modules) or '/'.join(base) in local_modules
+                if not found:
+                    issues.append(ValidationIssue(
+                        path=path, checker='import', line=node.lineno,
+                        message=f"Relative import '{'.' * level}{module}' does not resolve inside the project"
+                    ))
+                continue
+
+            top_level = module.split('.')[0]
+            if (
+                top_level in sys.stdlib_module_names
+                or _module_exists(module.split('.'), local_modules)
+                or _module_exists([top_level], local_modules)
+                or top_level.lower() in requirements
+                or importlib.util.find_spec(top_level) is not None
+            ):
+                continue
+            issues.append(ValidationIssue(
+                path=path, checker='import', line=node.lineno, severity='warning',
+                message=f"Module '{top_level}' is not in the project, the standard library or requirements.txt"
+            ))
+    return issues
+
+
+def _check_python(path: str, content: str, context: Dict[str, Any]) -> List[ValidationIssue]:
+    try:
+        tree = ast.parse(content, filename=path)
+        compile(tree, path, 'exec')
+    except SyntaxError as e:
+        return [ValidationIssue(path=path, checker='python', message=e.msg, line=e.lineno, column=e.offset)]
+    return _check_imports(path, tree, context)
+
+
+def _check_json(path: str, content: str, context: Dict[str, Any]) -> List[ValidationIssue]:
+    try:
+        json.loads(content)
+    except json.JSONDecodeError as e:
+        return [ValidationIssue(path=path, checker='json', message=e.msg, line=e.lineno, column=e.colno)]
+    return []
+
+
+def _check_yaml(path: str, content: str, context: Dict[str, Any]) -> List[ValidationIssue]:
+    try:
+        import yaml
+    except ImportError:
+        return []
+    try:
+        list(yaml.safe_load_all(content))
+    except yaml.YAMLError as e:
+        mark = getattr(e, 'problem_mark', None)
+        return [ValidationIssue(
+            path=path, checker='yaml', message=str(getattr(e, 'problem', None) or e),
+            line=mark.line + 1 if mark else None, column=mark.column + 1 if mark else None
+        )]
+    return []
+
+
+def _check_toml(path: str, content: str, context: Dict[str, Any]) -> List[ValidationIssue]:
+    import tomllib
+    try:
+        tomllib.loads(content)
+    except tomllib.TOMLDecodeError as e:
+        match = re.search(r"line (\d+), column (\d+)", str(e))
+        return [ValidationIssue(
+            path=path, checker='toml', message=str(e),
+            line=int(match.group(1)) if match else None, column=int(match.group(2)) if match else None
+        )]
+    return []
+
+
+def _check_xml(path: str, content: str, context: Dict[str, Any]) -> List[ValidationIssue]:
+    from xml.etree import ElementTree
+    try:
+        ElementTree.fromstring(content)
+    except ElementTree.ParseError as e:
+        line, column = getattr(e, 'position', (None, None))
+        return [ValidationIssue(path=path, checker='xml', message=str(e), line=line, column=column)]
+    return []
+
+
+CHECKERS = {
+    '.py': _check_python,
+    '.json': _check_json,
+    '.ipynb': _check_json,
+    '.yaml': _check_yaml,
+    '.yml': _check_yaml,
+    '.toml': _check_toml,
+    '.xml': _check_xml,
+}
+
+
+def _validate_file(args: Tuple[str, str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Worker entry point: run the checker for one file and return plain dicts"""
+    path, content, context = args
+    checker = CHECKERS[os.path.splitext(path)[1].lower()]
+    try:
+        issues = checker(path, content, context)
+    except Exception as e:
+        issues = [ValidationIssue(path=path, checker='internal', message=f"Checker crashed: {e}")]
+    return [asdict(issue) for issue in issues]
+
+
+# --- Project validation ---------------------------------------------------------
+
+def _collect_files(project_path: str) -> Dict[str, str]:
+    """Relative paths (with '/' separators) of every checkable project file"""
+    files = {}
+    for directory, dirnames, filenames in os.walk(project_path):
+        dirnames[:] = [name for name in dirnames if name not in SKIPPED_DIRS and not name.startswith('.')]
+        for filename in filenames:
+            full_path = os.path.join(directory, filename)
+            relative_path = os.path.relpath(full_path, project_path).replace(os.sep, '/')
+            files[relative_path] = full_path
+    return files
+
+
+def _local_modules(relative_paths: List[str]) -> Set[str]:
+    """Python files and the package directories that contain them"""
+    modules = set()
+    for path in relative_paths:
+        if path.endswith('.py'):
+            modules.add(path)
+            parts = path.split('/')[:-1]
+            for depth in range(1, len(parts) + 1):
+                modules.add('/'.join(parts[:depth]))
+    return modules
+
+
+def _load_cache(cache_path: str) -> Dict[str, Any]:
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache_path: str, cache: Dict[str, Any]):
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+        json.dump(cache, cache_file)
+    os.replace(tmp_path, cache_path)
+
+
+def make_validation_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Process pool for validate_project; workers are spawned, never forked from a threaded parent"""
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def validate_project(
+    project_path: str,
+    cache_path: Optional[str] = DEFAULT_VALIDATION_CACHE,
+    max_workers: Optional[int] = None,
+    pool: Optional[Executor] = None
+) -> ValidationReport:
+    """
+    Validate every supported file in a generated project
+
+    Files whose content hash (plus, for Python, the project's module layout)
+    matches the previous run reuse the cached result. The remaining files are
+    checked in a process pool.
+
+    Args:
+        project_path: Directory containing the generated project
+        cache_path: JSON file holding results of previous runs (None disables caching)
+        max_workers: Process pool size (defaults to the CPU count); ignored when ``pool`` is given
+        pool: Long-lived pool from make_validation_pool to reuse across runs
+
+    Returns:
+        ValidationReport with the issues of all files
+    """
+    all_files = _collect_files(project_path)
+    relative_paths = sorted(all_files)
+    local_modules = _local_modules(relative_paths)
+    requirements = set()
+    if 'requirements.txt' in all_files:
+        with open(all_files['requirements.txt'], 'r', encoding='utf-8', errors='replace') as req_file:
+            requirements = _requirement_names(req_file.read())
+    context = {'local_modules': local_modules, 'requirements': requirements}
+    layout_signature = hashlib.sha256(
+        json.dumps([sorted(local_modules), sorted(requirements)]).encode('utf-8')
+    ).hexdigest()
+
+    cache_key = os.path.abspath(project_path)
+    cache = _load_cache(cache_path) if cache_path else {}
+    previous = cache.get(cache_key, {})
+    current = {}
+
+    report = ValidationReport()
+    pending = []
+    for relative_path in relative_paths:
+        if os.path.splitext(relative_path)[1].lower() not in CHECKERS:
+            continue
+        with open(all_files[relative_path], 'rb') as source:
+            data = source.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if relative_path.endswith('.py'):
+            digest = f"{digest}:{layout_signature}"
+
+        cached = previous.get(relative_path)
+        if cached and cached['hash'] == digest:
+            current[relative_path] = cached
+            report.unchanged.append(relative_path)
+            continue
+        current[relative_path] = {'hash': digest, 'issues': []}
+        pending.append((relative_path, data.decode('utf-8', errors='replace'), context))
+
+    if len(pending) > 1 and pool is not None:
+        try:
+            results = list(pool.map(_validate_file, pending))
+        except BrokenProcessPool:
+            results = [_validate_file(args) for args in pending]
+    elif len(pending) > 1:
+        with make_validation_pool(max_workers) as transient_pool:
+            results = list(transient_pool.map(_validate_file, pending))
+    else:
+        results = [_validate_file(args) for args in pending]
+
+    for (relative_path, _, _), issues in zip(pending, results):
+        current[relative_path]['issues'] = issues
+        report.checked.append(relative_path)
+
+    for relative_path in relative_paths:
+        for issue in current.get(relative_path, {}).get('issues', []):
+            report.issues.append(ValidationIssue(**issue))
+
+    if cache_path:
+        cache[cache_key] = current
+        _save_cache(cache_path, cache)
+    return report
+
+
+def build_repair_messages(report: ValidationReport, files: Dict[str, str], related: str = "") -> List[Dict[str, str]]:
+    """
+    Build a Coder prompt that asks for corrected versions of the failing files only
+
+    Args:
+        report: Validation report containing errors
+        files: Current contents of the project files, keyed by relative path
+        related: Excerpts of other project files the failing files depend on
+
+    Returns:
+        Chat messages ready to send to the backend
+    """
+    sections = []
+    for path in report.failing_paths:
+        problems = "\n".join(f"- {issue}" for issue in report.errors if issue.path == path)
+        sections.append(f"File: {path}\nProblems:\n{problems}\nCurrent contents:\n```\n{files.get(path, '')}\n```")
+    if related:
+        sections.append(f"Related code elsewhere in the project (for reference, do not return it):\n\n{related}")
+
+    return [
+        {
+            "role": "system",
+            "content": "You are a senior software engineer fixing files that failed automated validation. "
+                       "Return only the corrected files, each starting with a line 'File: <path>' followed by "
+                       "the full corrected contents in a fenced code block."
+        },
+        {"role": "user", "content": "\n\n".join(sections)}
+    ]
@@ -0,0 +1,252 @@
+"""
+Workspace Search Index
+BM25 inverted index over the generated project's files and symbols, updated
+incrementally from file content hashes
+"""
+
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .project import PROJECT_PATH
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+SYMBOL_WEIGHT = 3  # a symbol name counts as this many occurrences of its terms
+CHUNK_LINES = 40
+MAX_FILE_BYTES = 512 * 1024
+SKIP_DIRS = {".git", "__pycache__", "node_modules", ".venv", "venv", ".mypy_cache", ".pytest_cache"}
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_SYMBOL = re.compile(
+    r"^\s*(?:async\s+def|def|class|function|const|let|var|interface|type|struct|enum|fn|func)\s+([A-Za-z_$][\w$]*)",
+    re.MULTILINE
+)
+_PY_BLOCK_START = re.compile(r"^(?:async\s+def|def|class)\s", re.MULTILINE)
+STOP_WORDS = frozenset({
+    "the", "a", "an", "and", "or", "to", "of", "in", "is", "it", "for", "on", "with", "as", "be",
+    "this", "that", "by", "at", "from", "self", "return", "import", "if", "else", "none", "true", "false"
+})
+
+
+def _stem(term: str) -> str:
+    """Plural folding, enough for 'users' to find ``get_user``"""
+    if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+        return term[:-1]
+    return term
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms; identifiers also contribute their snake_case and camelCase parts"""
+    terms = []
+    for word in _WORD.findall(text):
+        lowered = word.lower()
+        if lowered not in STOP_WORDS and len(lowered) > 1:
+            terms.append(_stem(lowered))
+        parts = [part for chunk in word.split("_") for part in _CAMEL.findall(chunk)]
+        if len(parts) > 1:
+            terms.extend(_stem(part.lower()) for part in parts if len(part) > 1 and part.lower() not in STOP_WORDS)
+    return terms
+
+
+@dataclass
+class Chunk:
+    """A searchable slice of a file"""
+    path: str
+    start_line: int  # 1-based, inclusive
+    end_line: int
+    text: str
+    symbols: List[str] = field(default_factory=list)
+
+
+@dataclass
+class SearchHit:
+    """A chunk and its BM25 score for a query"""
+    score: float
+    chunk: Chunk
+
+
+def split_chunks(path: str, text: str) -> List[Chunk]:
+    """Python files split at top-level definitions, everything else in fixed line windows"""
+    lines = text.splitlines()
+    if not lines:
+        return []
+    starts = {0}
+    if path.endswith(".py"):
+        starts.update(text.count("\n", 0, match.start()) for match in _PY_BLOCK_START.finditer(text))
+    blocks = sorted(start for start in starts if start < len(lines)) + [len(lines)]
+    # Long blocks are still cut into windows so one chunk never dominates a prompt
+    bounded = []
+    for start, end in zip(blocks, blocks[1:]):
+        bounded.extend(range(start, end, CHUNK_LINES))
+    chunks = []
+    for index, start in enumerate(bounded):
+        end = bounded[index + 1] if index + 1 < len(bounded) else len(lines)
+        body = "\n".join(lines[start:end])
+        if body.strip():
+            chunks.append(Chunk(path, start + 1, end, body, _SYMBOL.findall(body)))
+    return chunks
+
+
+class WorkspaceIndex:
+    """
+    Incremental BM25 index of a project directory
+
+    ``refresh()`` re-reads only files whose content hash changed since the
+    last call, so keeping the index current costs one hash per file.
+    """
+
+    def __init__(self, project_path: str = PROJECT_PATH):
+        self.project_path = project_path
+        self._hashes: Dict[str, str] = {}
+        self._file_chunks: Dict[str, List[int]] = {}
+        self._chunks: Dict[int, Chunk] = {}
+        self._lengths: Dict[int, int] = {}
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._chunk_terms: Dict[int, Counter] = {}
+        self._next_id = 0
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    # --- maintenance -----------------------------------------------------------
+
+    def _project_files(self) -> Iterable[str]:
+        for root, dirs, files in os.walk(self.project_path):
+            dirs[:] = [name for name in dirs if name not in SKIP_DIRS and not name.startswith(".")]
+            for name in files:
+                full_path = os.path.join(root, name)
+                yield os.path.relpath(full_path, self.project_path).replace(os.sep, "/")
+
+    def refresh(self) -> Dict[str, int]:
+        """Bring the index up to date with the files on disk"""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> Dict[str, int]:
+        seen: Set[str] = set()
+        updated = 0
+        for rel_path in self._project_files():
+            full_path = os.path.join(self.project_path, rel_path)
+            try:
+                if os.path.getsize(full_path) > MAX_FILE_BYTES:
+                    continue
+                with open(full_path, "rb") as project_file:
+                    data = project_file.read()
+            except OSError:
+                continue
+            if b"\0" in data[:1024]:
+                continue  # binary
+            seen.add(rel_path)
+            digest = hashlib.sha256(data).hexdigest()
+            if self._hashes.get(rel_path) == digest:
+                continue
+            self._index_file(rel_path, data.decode("utf-8", errors="replace"), digest)
+            updated += 1
+        removed = [path for path in self._hashes if path not in seen]
+        for path in removed:
+            self._remove_file(path)
+        return {"files": len(self._hashes), "updated": updated, "removed": len(removed), "chunks": len(self._chunks)}
+
+    def update_file(self, path: str, text: str, digest: Optional[str] = None):
+        """(Re-)index one file"""
+        with self._lock:
+            self._index_file(path, text, digest)
+
+    def _index_file(self, path: str, text: str, digest: Optional[str]):
+        self._remove_file(path)
+        chunk_ids = []
+        for chunk in split_chunks(path, text):
+            terms = Counter(tokenize(f"{path}\n{chunk.text}"))
+            for symbol in chunk.symbols:
+                for term in tokenize(symbol):
+                    terms[term] += SYMBOL_WEIGHT
+            chunk_id = self._next_id
+            self._next_id += 1
+            self._chunks[chunk_id] = chunk
+            self._chunk_terms[chunk_id] = terms
+            length = sum(terms.values())
+            self._lengths[chunk_id] = length
+            self._total_length += length
+            for term, count in terms.items():
+                self._postings[term][chunk_id] = count
+            chunk_ids.append(chunk_id)
+        self._file_chunks[path] = chunk_ids
+        self._hashes[path] = digest or hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def remove_file(self, path: str):
+        """Drop a file from the index"""
+        with self._lock:
+            self._remove_file(path)
+
+    def _remove_file(self, path: str):
+        for chunk_id in self._file_chunks.pop(path, []):
+            for term in self._chunk_terms.pop(chunk_id):
+                postings = self._postings[term]
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= self._lengths.pop(chunk_id)
+            del self._chunks[chunk_id]
+        self._hashes.pop(path, None)
+
+    # --- queries ---------------------------------------------------------------
+
+    def search(self, query: str, k: int = 8, exclude_paths: Iterable[str] = ()) -> List[SearchHit]:
+        """Top-k chunks for a free-text instruction"""
+        with self._lock:
+            return self._search(query, k, set(exclude_paths))
+
+    def _search(self, query: str, k: int, excluded: Set[str]) -> List[SearchHit]:
+        if not self._chunks:
+            return []
+        chunk_count = len(self._chunks)
+        average_length = self._total_length / chunk_count or 1.0
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1.0 + (chunk_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, count in postings.items():
+                norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self._lengths[chunk_id] / average_length)
+                scores[chunk_id] += idf * count * (BM25_K1 + 1.0) / (count + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        hits = []
+        for chunk_id, score in ranked:
+            chunk = self._chunks[chunk_id]
+            if chunk.path in excluded:
+                continue
+            hits.append(SearchHit(score, chunk))
+            if len(hits) >= k:
+                break
+        return hits
+
+    def relevant_files(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """Files ranked by their best chunk's score"""
+        best: Dict[str, float] = {}
+        for hit in self.search(query, k=max(k * 4, 20)):
+            best[hit.chunk.path] = max(best.get(hit.chunk.path, 0.0), hit.score)
+        return sorted(best.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def build_context(self, query: str, max_bytes: int = 4096, exclude_paths: Iterable[str] = ()) -> str:
+        """The most relevant chunks for a query, rendered for a prompt within ``max_bytes``"""
+        sections = []
+        used = 0
+        for hit in self.search(query, k=20, exclude_paths=exclude_paths):
+            chunk = hit.chunk
+            section = f"{chunk.path} (lines {chunk.start_line}-{chunk.end_line}):\n```\n{chunk.text}\n```"
+            size = len(section.encode("utf-8"))
+            if used + size > max_bytes:
+                continue
+            sections.append(section)
+            used += size
+        return "\n\n".join(sections)
+
+    def stats(self) -> Dict[str, int]:
+        return {"files": len(self._hashes), "chunks": len(self._chunks), "terms": len(self._postings)}
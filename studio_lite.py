@@ -1,12 +1,21 @@
+import time
+_script_started = time.perf_counter()
+
 import os
 import streamlit as st
 import requests
-from crewai import Agent, Task, Crew, Process
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_ollama import OllamaLLM
 import json
+from dataclasses import asdict
+
+# crewai, the LangChain chat models, numpy and pandas are imported on first use through load_dependency()
+from studio.agent_registry import AGENT_STATUSES, STATUS_ICONS, AgentRegistry, paginate, save_definitions
+from studio.mission_cache import MissionCache
+from studio.project import PROJECT_PATH, parse_plan_files, render_plan_files, resolve_project_path, write_project_file
+from studio.startup import StartupReport
+from studio.replanning import apply_plan_changes, build_replan_messages, mission_diff
+from studio.validation import build_repair_messages, make_validation_pool, validate_project
+from studio.workspace_index import WorkspaceIndex
 
 # Import version information
 try:
@@ -34,10 +43,32 @@ st.title(f"🚀 VLM-Studio Lite v{__version__}")
 st.caption("Multi-Agent AI Development Platform with Enhanced Monitoring")
 st.write("Inspired by the Newbs guide to AI Agents, this is a simpler, more chill way to build.")
 
+# --- Deferred Dependencies ---
+@st.cache_resource
+def get_startup_report():
+    """Process-wide startup timing report."""
+    return StartupReport()
+
+@st.cache_resource(show_spinner=False)
+def load_dependency(module_name):
+    """Import a heavy dependency the first time a code path needs it; the import time is reported."""
+    return get_startup_report().import_module(module_name)
+
+get_startup_report().record_first_paint(time.perf_counter() - _script_started)
+
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:5000")
+METRICS_WINDOWS = {
+    "Last 15 minutes": 900,
+    "Last hour": 3600,
+    "Last 6 hours": 6 * 3600,
+    "Last 24 hours": 86400,
+    "Last 7 days": 7 * 86400,
+    "Last 30 days": 30 * 86400
+}
+METRICS_POINTS = 60  # series points per group; the backend downsamples to fit
 
 # --- LLM Provider Configuration ---
-def configure_llm_provider(provider, model_name, api_key=None, base_url=None):
+def configure_llm_provider(provider, model_name, api_key=None, base_url=None, temperature=0.7, max_tokens=None):
     """Configure and return the appropriate LLM based on provider selection."""
     
     if provider == "OpenAI":
@@ -45,25 +76,29 @@ def configure_llm_provider(provider, model_name, api_key=None, base_url=None):
             st.error("OpenAI API key is required.")
             return None
         os.environ["OPENAI_API_KEY"] = api_key
-        return ChatOpenAI(model=model_name, temperature=0.7)
+        ChatOpenAI = load_dependency("langchain_openai").ChatOpenAI
+        return ChatOpenAI(model=model_name, temperature=temperature, max_tokens=max_tokens)
     
     elif provider == "Gemini":
         if not api_key:
             st.error("Gemini API key is required.")
             return None
         os.environ["GOOGLE_API_KEY"] = api_key
-        return ChatGoogleGenerativeAI(model=model_name, temperature=0.7)
+        ChatGoogleGenerativeAI = load_dependency("langchain_google_genai").ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(model=model_name, temperature=temperature, max_output_tokens=max_tokens)
     
     elif provider == "OpenRouter":
         if not api_key:
             st.error("OpenRouter API key is required.")
             return None
         # OpenRouter uses OpenAI-compatible API
+        ChatOpenAI = load_dependency("langchain_openai").ChatOpenAI
         return ChatOpenAI(
             model=model_name,
             openai_api_key=api_key,
             openai_api_base="https://openrouter.ai/api/v1",
-            temperature=0.7
+            temperature=temperature,
+            max_tokens=max_tokens
         )
     
     elif provider == "Ollama":
@@ -77,7 +112,8 @@ def configure_llm_provider(provider, model_name, api_key=None, base_url=None):
         except requests.exceptions.RequestException:
             st.error("Could not connect to Ollama server. Is it running?")
             return None
-        return OllamaLLM(model=model_name, base_url=base_url, temperature=0.7)
+        OllamaLLM = load_dependency("langchain_ollama").OllamaLLM
+        return OllamaLLM(model=model_name, base_url=base_url, temperature=temperature, num_predict=max_tokens)
     
     elif provider == "LM Studio":
         if not base_url:
@@ -90,7 +126,8 @@ def configure_llm_provider(provider, model_name, api_key=None, base_url=None):
         except requests.exceptions.RequestException:
             st.error("Could not connect to LM Studio server. Is it running?")
             return None
-        return OllamaLLM(model=model_name, base_url=base_url, temperature=0.7)
+        OllamaLLM = load_dependency("langchain_ollama").OllamaLLM
+        return OllamaLLM(model=model_name, base_url=base_url, temperature=temperature, num_predict=max_tokens)
     
     elif provider == "KoboldCpp":
         if not base_url:
@@ -103,10 +140,36 @@ def configure_llm_provider(provider, model_name, api_key=None, base_url=None):
         except requests.exceptions.RequestException:
             st.error("Could not connect to KoboldCpp server. Is it running?")
             return None
-        return OllamaLLM(model=model_name, base_url=base_url, temperature=0.7)
+        OllamaLLM = load_dependency("langchain_ollama").OllamaLLM
+        return OllamaLLM(model=model_name, base_url=base_url, temperature=temperature, num_predict=max_tokens)
     
     return None
 
+PROVIDER_OPTIONS = ["Gemini", "OpenAI", "OpenRouter", "Ollama", "LM Studio", "KoboldCpp"]
+SIDEBAR_LLM = "Sidebar LLM"
+
+# Environment fallbacks used when an agent runs on a provider other than the sidebar's
+PROVIDER_API_KEY_ENV = {
+    "OpenAI": "OPENAI_API_KEY",
+    "Gemini": "GEMINI_API_KEY",
+    "OpenRouter": "OPENROUTER_API_KEY"
+}
+PROVIDER_BASE_URLS = {
+    "Ollama": os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+    "LM Studio": os.getenv("LMSTUDIO_BASE_URL", "http://localhost:1234"),
+    "KoboldCpp": os.getenv("KOBOLDCPP_BASE_URL", "http://localhost:8080")
+}
+PROVIDER_DEFAULT_MODELS = {
+    "OpenAI": os.getenv("DEFAULT_OPENAI_MODEL", "gpt-4o-mini"),
+    "Gemini": os.getenv("DEFAULT_GEMINI_MODEL", "gemini-1.5-flash"),
+    "OpenRouter": os.getenv("DEFAULT_OPENROUTER_MODEL", "anthropic/claude-3.5-sonnet"),
+    "Ollama": os.getenv("DEFAULT_OLLAMA_MODEL", "llama3.1:latest"),
+    "LM Studio": "default-model",
+    "KoboldCpp": "kobold-default"
+}
+# Backend provider keys that differ from the normalised UI name
+BACKEND_PROVIDER_KEYS = {"Gemini": "google"}
+
 # --- Sidebar for LLM Configuration ---
 with st.sidebar:
     st.header("🤖 LLM Configuration")
@@ -114,9 +177,11 @@ with st.sidebar:
     # Provider selection
     provider = st.selectbox(
         "Choose LLM Provider:",
-        ["Gemini", "OpenAI", "OpenRouter", "Ollama", "LM Studio", "KoboldCpp"],
+        PROVIDER_OPTIONS,
         index=0
     )
+    api_key = None
+    base_url = None
     
     # Model and API key configuration based on provider
     if provider == "OpenAI":
@@ -212,11 +277,19 @@ with st.sidebar:
     else:
         st.warning("LLM is not configured. Please check your settings.")
 
+    with st.expander("⏱️ Startup Timing"):
+        startup = get_startup_report().summary()
+        if startup["over_budget"]:
+            st.warning(f"Cold first paint {startup['cold_first_paint_ms']:.0f} ms exceeds the {startup['budget_ms']:.0f} ms budget")
+        st.json(startup)
+
 # --- Agent Definitions ---
 # CrewAI makes it super easy to define agents with roles and goals.
 
-def create_agents(llm=None):
-    """Create agents with the specified LLM."""
+def create_agents(llm=None, llms=None):
+    """Create agents with the specified LLM, or a per-agent LLM from ``llms`` keyed by agent name."""
+    llms = llms or {}
+    Agent = load_dependency("crewai").Agent
     
     # The Architect Agent
     architect = Agent(
@@ -225,7 +298,7 @@ def create_agents(llm=None):
         backstory="You are a legendary software architect, known for your clarity and ability to turn any idea into a functional, elegant plan. You think step-by-step and produce code that is clean and direct.",
         verbose=True,
         allow_delegation=False,
-        llm=llm  # Use the configured LLM
+        llm=llms.get("Architect", llm)  # Use the configured LLM
     )
 
     # The Coder Agent
@@ -235,35 +308,248 @@ def create_agents(llm=None):
         backstory="You are a master coder, a true craftsman of the digital age. You take architectural plans and manifest them into reality, writing clean, efficient code and saving it to the specified files.",
         verbose=True,
         allow_delegation=False,
-        llm=llm  # Use the configured LLM
+        llm=llms.get("Coder", llm)  # Use the configured LLM
     )
     
     return architect, coder
 
+# --- Mission Cache ---
+@st.cache_resource
+def get_mission_cache():
+    """Shared mission result cache for every Streamlit session."""
+    return MissionCache()
+
+# --- Plan Index ---
+EMBEDDING_PROVIDERS = {"openai", "google", "ollama"}
+PLAN_CONTEXT_TOP_K = 5
+
+@st.cache_resource
+def get_plan_index():
+    """Shared vector index of past missions, plans and files."""
+    return load_dependency("studio.plan_index").PlanIndex()
+
+def embedding_provider_key():
+    """Backend provider used for plan index embeddings, or None if the sidebar provider has none."""
+    configured = os.getenv("PLAN_INDEX_EMBED_PROVIDER")
+    if configured:
+        return configured
+    key = BACKEND_PROVIDER_KEYS.get(provider, provider.lower().replace(" ", ""))
+    return key if key in EMBEDDING_PROVIDERS else None
+
+def embed_texts(texts):
+    """Embed texts through the backend /embeddings endpoint; None when unavailable."""
+    provider_key = embedding_provider_key()
+    if not provider_key or not texts:
+        return None
+    try:
+        response = requests.post(f"{BACKEND_URL}/embeddings", json={"provider": provider_key, "input": texts}, timeout=60)
+        response.raise_for_status()
+        data = response.json()["data"]
+    except Exception:
+        return None
+    np = load_dependency("numpy")
+    return np.array([item["embedding"] for item in sorted(data, key=lambda item: item["index"])], dtype=np.float32)
+
+def plan_context(mission_text):
+    """Top-k snippets of similar past missions for the Architect prompt."""
+    plan_index = get_plan_index()
+    if not plan_index.meta["count"]:
+        return ""
+    query = embed_texts([f"mission\n{mission_text}"])
+    if query is None:
+        return ""
+    return load_dependency("studio.plan_index").format_snippets(plan_index.search(query[0], k=PLAN_CONTEXT_TOP_K, kinds={"plan", "file"}))
+
+# --- Workspace Index ---
+WORKSPACE_FOCUS_FILES = 6
+REPAIR_CONTEXT_BYTES = 4096
+
+@st.cache_resource
+def get_workspace_index():
+    """Shared BM25 index of the project directory, refreshed from file hashes before each query."""
+    return WorkspaceIndex(PROJECT_PATH)
+
+def focus_files(instruction, files):
+    """Paths of the previous files most relevant to an edit instruction, or None to send every file."""
+    if len(files) <= WORKSPACE_FOCUS_FILES:
+        return None
+    workspace_index = get_workspace_index()
+    workspace_index.refresh()
+    ranked = [path for path, _ in workspace_index.relevant_files(instruction, k=WORKSPACE_FOCUS_FILES) if path in files]
+    return ranked or None
+
+# --- Agent Registry ---
+# Built-in Architect and Coder plus user-defined agents, looked up by name
+if not isinstance(st.session_state.get("agents"), AgentRegistry):
+    st.session_state.agents = AgentRegistry.with_builtins(import_module=load_dependency)
+
+def agent_cache_config():
+    """Agent settings that influence a mission's output, used in the cache key."""
+    return {
+        agent["name"]: {"role": agent["role"], **agent["configuration"]}
+        for agent in st.session_state.agents if agent["builtin"]
+    }
+
 # --- UI Elements ---
 st.header("1. Define the Mission")
 mission = st.text_area("What masterpiece shall the agents create today?", height=100,
                        value="Create a simple Python Flask web app with a single endpoint that returns a JSON 'hello world' message.")
+use_mission_cache = st.checkbox(
+    "♻️ Reuse cached results for identical missions",
+    value=True,
+    help="Missions with the same text, provider, model and agent configuration are restored from the local cache instead of calling the LLM again."
+)
+SERIAL_ENGINE = "Backend (serial)"
+CREW_ENGINE = "CrewAI (concurrent)"
+execution_engine = st.radio(
+    "Execution engine:",
+    [SERIAL_ENGINE, CREW_ENGINE],
+    horizontal=True,
+    help="The CrewAI engine runs the Architect, then one Coder task per file concurrently, each agent with its own LLM settings."
+)
+use_plan_context = st.checkbox(
+    "📚 Give the Architect relevant snippets from past missions",
+    value=True,
+    help="Finished missions are embedded into a local vector index; the most similar prior plans and files are added to the Architect prompt."
+)
+previous_run = st.session_state.get("last_mission")
+use_edit_mode = False
+if previous_run and previous_run["mission"].strip() != mission.strip():
+    use_edit_mode = st.checkbox(
+        "✏️ Edit mode: send only the mission changes to the Architect",
+        value=True,
+        help="The Architect receives the previous plan and a diff of the mission text, returns only the affected files, and those are merged into the existing project."
+    )
 
-def call_backend_chat_api(provider, model, messages, temperature=0.7, max_tokens=None):
+def fetch_call_metrics(window_s, group_by="", points=METRICS_POINTS):
+    """Measured call performance from the backend /metrics/calls endpoint; None when unavailable."""
+    try:
+        response = requests.get(
+            f"{BACKEND_URL}/metrics/calls",
+            params={"window": window_s, "group_by": group_by, "points": points},
+            timeout=5
+        )
+        response.raise_for_status()
+        return response.json()
+    except Exception:
+        return None
+
+def format_seconds(value):
+    return f"{value:.2f}s" if value is not None else "—"
+
+def format_rate(value):
+    return f"{value:.1%}" if value is not None else "—"
+
+CHAT_DEADLINE_SECONDS = float(os.getenv("STUDIO_CHAT_DEADLINE_SECONDS", "120"))
+# The backend answers with a 504 at the deadline; the client waits a little longer to receive it
+CHAT_DEADLINE_GRACE_SECONDS = 5
+
+def backend_error_message(error):
+    """Readable text for a backend error body, noting when the backend classified it as transient."""
+    message = error.get("error") or "unknown error"
+    if error.get("retryable"):
+        message += " (transient; retried until the deadline or retry budget ran out — try again shortly)"
+    return message
+
+def call_backend_chat_api(provider, model, messages, temperature=0.7, max_tokens=None, agent=None):
     """Call the Flask backend /chat endpoint with the given parameters."""
     url = f"{BACKEND_URL}/chat"
     # Normalize provider name for backend
-    provider_key = provider.lower().replace(" ", "")
+    provider_key = BACKEND_PROVIDER_KEYS.get(provider, provider.lower().replace(" ", ""))
     payload = {
         "provider": provider_key,
         "model": model,
         "messages": messages,
         "temperature": temperature,
-        "max_tokens": max_tokens
+        "max_tokens": max_tokens,
+        # UI calls are served ahead of batch and evaluation traffic when the backend is busy
+        "priority": "interactive",
+        # The backend bounds queueing, provider timeouts and retries by this deadline
+        "timeout": CHAT_DEADLINE_SECONDS
     }
+    if agent:
+        # Attributes the call's token usage to the agent in the backend ledger
+        payload["agent"] = agent
     try:
-        response = requests.post(url, json=payload, timeout=30)
+        response = requests.post(url, json=payload, timeout=CHAT_DEADLINE_SECONDS + CHAT_DEADLINE_GRACE_SECONDS)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.HTTPError as e:
         try:
-            error_detail = response.json().get('error', str(e))
+            error_detail = backend_error_message(response.json())
+        except Exception:
+            error_detail = str(e)
+        st.error(f"Backend error: {error_detail}")
+        return None
+    except Exception as e:
+        st.error(f"Backend error: {e}")
+        return None
+
+STREAM_RENDER_INTERVAL = 0.1  # seconds between Markdown re-renders while streaming
+
+def request_stream_stop():
+    """Stop button callback: the rerun it triggers abandons the stream and closes its connection."""
+    st.session_state["stream_stopped"] = True
+
+def stream_backend_chat_api(provider, model, messages, temperature=0.7, max_tokens=None, agent=None, output=None, stats=None):
+    """Stream a /chat reply into the ``output`` placeholder as Markdown, with a tokens/sec readout in ``stats``."""
+    url = f"{BACKEND_URL}/chat"
+    provider_key = BACKEND_PROVIDER_KEYS.get(provider, provider.lower().replace(" ", ""))
+    payload = {
+        "provider": provider_key,
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "priority": "interactive",
+        "timeout": CHAT_DEADLINE_SECONDS,
+        "stream": True
+    }
+    if agent:
+        payload["agent"] = agent
+    output = output or st.empty()
+    stats = stats or st.empty()
+    text = ""
+    deltas = 0
+    first_token_s = None
+    last_render = 0.0
+    started = time.perf_counter()
+    try:
+        # The read timeout applies between lines, so long plans are fine while tokens keep arriving
+        with requests.post(url, json=payload, stream=True, timeout=(10, CHAT_DEADLINE_SECONDS + CHAT_DEADLINE_GRACE_SECONDS)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["type"] == "delta":
+                    text += event["content"]
+                    deltas += 1
+                    now = time.perf_counter()
+                    if first_token_s is None:
+                        first_token_s = now - started
+                    if now - last_render >= STREAM_RENDER_INTERVAL:
+                        # Kept so a stopped run can still show what arrived
+                        st.session_state["streamed_text"] = text
+                        output.markdown(text + " ▌")
+                        generating = now - started - first_token_s
+                        rate = f"{deltas / generating:.1f} tokens/s" if generating > 0 else "…"
+                        stats.caption(f"⚡ {rate} · first token after {first_token_s:.2f}s · {deltas} tokens")
+                        last_render = now
+                elif event["type"] == "done":
+                    st.session_state.pop("streamed_text", None)
+                    output.markdown(event["response"]["content"])
+                    info = event["stream"]
+                    rate = f"{info['tokens_per_s']} tokens/s" if info.get("tokens_per_s") else "n/a"
+                    first = f"{info['first_token_s']:.2f}s" if info.get("first_token_s") is not None else "n/a"
+                    stats.caption(f"⚡ {rate} · first token after {first} · {info['output_tokens']} tokens in {info['latency_s']:.1f}s")
+                    return {"response": event["response"], "request_info": event["request_info"], "stream": info}
+                elif event["type"] == "error":
+                    st.error(f"Backend error: {backend_error_message(event)}")
+                    return None
+    except requests.exceptions.HTTPError as e:
+        try:
+            error_detail = backend_error_message(response.json())
         except Exception:
             error_detail = str(e)
         st.error(f"Backend error: {error_detail}")
@@ -271,6 +557,130 @@ def call_backend_chat_api(provider, model, messages, temperature=0.7, max_tokens
     except Exception as e:
         st.error(f"Backend error: {e}")
         return None
+    st.error("Backend error: the stream ended without a response")
+    return None
+
+def agent_llm_settings(agent_name):
+    """Resolve the provider, model and sampling settings an agent's calls should use."""
+    config = st.session_state.agents[agent_name]["configuration"]
+    agent_provider = config.get("provider") or provider
+    if agent_provider == provider:
+        agent_model = config.get("model") or model_name
+    else:
+        agent_model = config.get("model") or PROVIDER_DEFAULT_MODELS[agent_provider]
+    return {
+        "provider": agent_provider,
+        "model": agent_model,
+        "temperature": config["temperature"],
+        "max_tokens": config["max_tokens"],
+        "instructions": config.get("instructions", "")
+    }
+
+def with_agent_instructions(messages, instructions):
+    """Append an agent's custom instructions to the system prompt."""
+    if not instructions:
+        return messages
+    if messages and messages[0]["role"] == "system":
+        return [{"role": "system", "content": f"{messages[0]['content']}\n\n{instructions}"}] + messages[1:]
+    return [{"role": "system", "content": instructions}] + messages
+
+def call_agent_chat_api(agent_name, messages, output=None, stats=None):
+    """Call the backend with an agent's own provider, model and sampling settings; streams into ``output`` if given."""
+    settings = agent_llm_settings(agent_name)
+    call = call_backend_chat_api
+    extra = {}
+    if output is not None:
+        call = stream_backend_chat_api
+        extra = {"output": output, "stats": stats}
+    return call(
+        settings["provider"],
+        settings["model"],
+        with_agent_instructions(messages, settings["instructions"]),
+        temperature=settings["temperature"],
+        max_tokens=settings["max_tokens"],
+        agent=agent_name,
+        **extra
+    )
+
+def build_agent_llms():
+    """Build one LLM per agent from its saved provider, model, temperature and max_tokens."""
+    llms = {}
+    for agent in st.session_state.agents:
+        if not agent["builtin"]:
+            continue  # only the Architect and Coder take part in missions
+        settings = agent_llm_settings(agent["name"])
+        if settings["provider"] == provider:
+            agent_api_key, agent_base_url = api_key, base_url
+        else:
+            agent_api_key = os.getenv(PROVIDER_API_KEY_ENV.get(settings["provider"], ""), "")
+            agent_base_url = PROVIDER_BASE_URLS.get(settings["provider"])
+        llms[agent["name"]] = configure_llm_provider(
+            settings["provider"], settings["model"], agent_api_key, agent_base_url,
+            temperature=settings["temperature"],
+            max_tokens=settings["max_tokens"]
+        )
+    return llms
+
+def record_mission_timing(engine, wall_time, task_timings):
+    """Keep per-task timings of each run so the execution engines can be compared."""
+    st.session_state.setdefault("mission_timings", []).append({
+        "engine": engine,
+        "wall_time": wall_time,
+        "task_time": sum(timing["duration"] for timing in task_timings),
+        "tasks": task_timings
+    })
+
+MAX_REPAIR_ROUNDS = 2
+
+@st.cache_resource
+def get_validation_pool():
+    """Process pool shared by every validation run, started once per Streamlit server."""
+    return make_validation_pool()
+
+def validate_and_repair(plan_files, log_container):
+    """Validate the written project and ask the Coder to regenerate only the failing files."""
+    report = validate_project(PROJECT_PATH, pool=get_validation_pool())
+    repaired_any = False
+    for repair_round in range(1, MAX_REPAIR_ROUNDS + 1):
+        if not report.errors:
+            break
+        failing_paths = report.failing_paths
+        log_container.write(
+            f"🔍 Validation found {len(report.errors)} error(s) in {len(failing_paths)} file(s) - "
+            f"asking the Coder to repair them (round {repair_round})..."
+        )
+        current_files = {}
+        for path in failing_paths:
+            with open(os.path.join(PROJECT_PATH, path), 'r', encoding='utf-8', errors='replace') as failing_file:
+                current_files[path] = failing_file.read()
+
+        workspace_index = get_workspace_index()
+        workspace_index.refresh()
+        query = "\n".join(f"{issue.path} {issue.message}" for issue in report.errors) + "\n" + "\n".join(current_files.values())
+        related = workspace_index.build_context(query, max_bytes=REPAIR_CONTEXT_BYTES, exclude_paths=current_files)
+        backend_result = call_agent_chat_api("Coder", build_repair_messages(report, current_files, related))
+        if not backend_result or "response" not in backend_result:
+            break
+        repaired_files = {
+            path: code for path, code in parse_plan_files(backend_result["response"]["content"]).items()
+            if path in current_files
+        }
+        if not repaired_files:
+            break
+        for path, code in repaired_files.items():
+            write_project_file(path, code, PROJECT_PATH)
+            plan_files[path] = code
+            log_container.write(f"   - 🔧 Regenerated {path}")
+        repaired_any = True
+        report = validate_project(PROJECT_PATH, pool=get_validation_pool())
+    return report, repaired_any
+
+if st.session_state.pop("stream_stopped", False):
+    st.warning("⏹ The Architect was stopped before finishing its plan.")
+    partial_plan = st.session_state.pop("streamed_text", "")
+    if partial_plan:
+        with st.expander("Partial plan"):
+            st.markdown(partial_plan)
 
 if st.button("✨ Launch the Crew"):
     if not llm:
@@ -285,186 +695,288 @@ if st.button("✨ Launch the Crew"):
         current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         # Update Architect status
-        architect_idx = next(i for i, agent in enumerate(st.session_state.agents) if agent["name"] == "Architect")
-        st.session_state.agents[architect_idx]["status"] = "Active"
-        st.session_state.agents[architect_idx]["current_task"] = "Creating software architecture plan"
-        st.session_state.agents[architect_idx]["last_active"] = current_time
+        agents = st.session_state.agents
+        agents.set_status("Architect", "Active", "Creating software architecture plan", current_time)
         
         log_container.write("🧘‍♂️ The crew is assembling...")
-        log_container.write("🤖 Architect agent is now active - creating the plan...")
 
-        # Prepare messages for backend
-        messages = [
-            {"role": "system", "content": "You are a legendary software architect. Create a detailed, step-by-step plan with filenames and full code for each file."},
-            {"role": "user", "content": mission}
-        ]
-        
-        with st.spinner("Architect is thinking..."):
-            backend_result = call_backend_chat_api(provider, model_name, messages)
+        mission_cache = get_mission_cache()
+        cache_key = MissionCache.mission_key(mission, provider, model_name, agent_cache_config())
+        cached_mission = mission_cache.get(cache_key) if use_mission_cache else None
+        plan_files = None
+        plan_delta = None
+        backend_result = None
+        plan_streamed = False
+        task_timings = []
+        mission_start = time.perf_counter()
+
+        if cached_mission:
+            plan_result = cached_mission.plan
+            plan_files = cached_mission.files
+            log_container.write("♻️ Identical mission found in the cache - restoring the previous plan...")
+        elif execution_engine == CREW_ENGINE and not use_edit_mode:
+            log_container.write("🤖 The crew is running - the Architect plans, then Coder tasks finalise each file concurrently...")
+            architect_agent, coder_agent = create_agents(llm, llms=build_agent_llms())
+            snippets = plan_context(mission) if use_plan_context else ""
+            if snippets:
+                log_container.write("📚 Added snippets from similar past missions to the plan task")
+            try:
+                with st.spinner("Crew is working..."):
+                    crew_result = load_dependency("studio.crew_engine").CrewMissionEngine(architect_agent, coder_agent).run(
+                        f"{mission}\n\n{snippets}" if snippets else mission
+                    )
+                plan_result = crew_result.plan
+                plan_files = crew_result.files
+                task_timings.extend(asdict(timing) for timing in crew_result.timings)
+                for failed_path, error in crew_result.errors.items():
+                    log_container.write(f"   - ⚠️ Coder task for {failed_path} failed ({error}); keeping the Architect's version")
+            except Exception as e:
+                st.error(f"Crew execution failed: {e}")
+                plan_result = None
+        else:
+            if use_edit_mode:
+                log_container.write("✏️ Edit mode - sending only the mission changes to the Architect...")
+                focus = focus_files(mission_diff(previous_run["mission"], mission), previous_run["files"])
+                if focus:
+                    log_container.write(f"🔎 Sending {len(focus)} of {len(previous_run['files'])} files relevant to the change")
+                messages = build_replan_messages(previous_run["mission"], mission, previous_run["files"], focus)
+            else:
+                log_container.write("🤖 Architect agent is now active - creating the plan...")
+
+                # Prepare messages for backend
+                messages = [
+                    {"role": "system", "content": "You are a legendary software architect. Create a detailed, step-by-step plan with filenames and full code for each file."},
+                    {"role": "user", "content": mission}
+                ]
+                snippets = plan_context(mission) if use_plan_context else ""
+                if snippets:
+                    messages.insert(1, {"role": "system", "content": snippets})
+                    log_container.write("📚 Added snippets from similar past missions to the Architect prompt")
             
-        if backend_result and "response" in backend_result:
-            plan_result = backend_result["response"]["content"]
+            log_container.write("📝 The Architect is writing the plan:")
+            st.button("⏹ Stop", on_click=request_stream_stop, key="stop_architect")
+            plan_stats = st.empty()
+            plan_stream = st.empty()
+            architect_start = time.perf_counter()
+            backend_result = call_agent_chat_api("Architect", messages, output=plan_stream, stats=plan_stats)
+            plan_streamed = backend_result is not None
+            task_timings.append({
+                "name": "plan",
+                "agent": "Principal Software Architect",
+                "started_at": architect_start - mission_start,
+                "duration": time.perf_counter() - architect_start,
+                "ok": bool(backend_result)
+            })
+            plan_result = backend_result["response"]["content"] if backend_result and "response" in backend_result else None
+            if plan_result is not None and use_edit_mode:
+                plan_delta = apply_plan_changes(previous_run["files"], parse_plan_files(plan_result))
+                plan_files = plan_delta.files
+                log_container.write(
+                    f"✏️ {len(plan_delta.changed)} changed, {len(plan_delta.added)} added, "
+                    f"{len(plan_delta.deleted)} deleted, "
+                    f"{len(plan_files) - len(plan_delta.changed) - len(plan_delta.added)} files kept as they were"
+                )
             
+        if plan_result is not None:
             # Update Architect completion
-            st.session_state.agents[architect_idx]["status"] = "Ready"
-            st.session_state.agents[architect_idx]["current_task"] = "Plan completed"
-            st.session_state.agents[architect_idx]["tasks_completed"] += 1
-            st.session_state.agents[architect_idx]["history"].append(f"✅ Created plan for: {mission[:50]}...")
+            agents.set_status("Architect", "Ready", "Plan completed")
+            agents.complete_task("Architect", f"✅ Created plan for: {mission[:50]}...")
             
-            log_container.write("✅ The Architect has returned with a plan:")
-            st.markdown(plan_result)
+            if plan_streamed:
+                log_container.write("✅ The Architect has finished the plan above")
+            else:
+                log_container.write("✅ The Architect has returned with a plan:")
+                st.markdown(plan_result)
+
+            if plan_files is None:
+                plan_files = parse_plan_files(plan_result)
+            # In edit mode plan_result is only the Architect's delta; cache and index the whole merged plan
+            cached_plan = render_plan_files(plan_files) if plan_delta else plan_result
+            if not cached_mission:
+                mission_cache.put(cache_key, cached_plan, plan_files, metadata={
+                    "provider": provider,
+                    "model": model_name,
+                    "mission": mission[:200]
+                })
 
             # --- Activate Coder Agent ---
-            coder_idx = next(i for i, agent in enumerate(st.session_state.agents) if agent["name"] == "Coder")
-            st.session_state.agents[coder_idx]["status"] = "Active"
-            st.session_state.agents[coder_idx]["current_task"] = "Writing code files"
-            st.session_state.agents[coder_idx]["last_active"] = current_time
+            agents.set_status("Coder", "Active", "Writing code files", current_time)
             
             log_container.write("\n💻 The Coder is now manifesting the files...")
             
             with st.spinner("Coder is writing files..."):
-                project_path = "./generated_project"
-                if not os.path.exists(project_path):
-                    os.makedirs(project_path)
+                write_start = time.perf_counter()
+                os.makedirs(PROJECT_PATH, exist_ok=True)
 
-                # A simple parser for the plan format
                 files_created = 0
-                files = plan_result.split('File: ')
-                for f in files[1:]:
+                for file_path_str, code in plan_files.items():
                     try:
-                        file_path_str, code_block = f.split('\n', 1)
-                        code = code_block.strip().replace('```python', '').replace('```', '').strip()
-                        full_path = os.path.join(project_path, file_path_str.strip())
-                        
-                        # Create directory if it doesn't exist
-                        os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                        
-                        with open(full_path, 'w') as code_file:
-                            code_file.write(code)
-                        log_container.write(f"   - ✅ Wrote code to {full_path}")
+                        full_path = write_project_file(file_path_str, code, PROJECT_PATH)
+                        if full_path:
+                            log_container.write(f"   - ✅ Wrote code to {full_path}")
+                        else:
+                            log_container.write(f"   - ⏭️ {file_path_str} is already up to date")
                         files_created += 1
                     except Exception as e:
                         st.error(f"Error writing file: {e}")
                         # Update agent with error status
-                        st.session_state.agents[coder_idx]["history"].append(f"❌ Error writing file: {str(e)}")
+                        agents.log("Coder", f"❌ Error writing file: {str(e)}")
+                for deleted_path in (plan_delta.deleted if plan_delta else []):
+                    try:
+                        os.remove(resolve_project_path(PROJECT_PATH, deleted_path))
+                        log_container.write(f"   - 🗑️ Removed {deleted_path}")
+                    except (OSError, ValueError) as e:
+                        agents.log("Coder", f"❌ Error removing file: {str(e)}")
+                task_timings.append({
+                    "name": "write files",
+                    "agent": "Senior Software Engineer",
+                    "started_at": write_start - mission_start,
+                    "duration": time.perf_counter() - write_start,
+                    "ok": True
+                })
+
+            with st.spinner("Validating generated files..."):
+                validate_start = time.perf_counter()
+                validation_report, repaired_any = validate_and_repair(plan_files, log_container)
+                task_timings.append({
+                    "name": "validate",
+                    "agent": "Senior Software Engineer",
+                    "started_at": validate_start - mission_start,
+                    "duration": time.perf_counter() - validate_start,
+                    "ok": not validation_report.errors
+                })
+            st.session_state.last_mission = {"mission": mission, "files": dict(plan_files)}
+            if not cached_mission:
+                indexed = get_plan_index().add_mission(mission, cached_plan, plan_files, embed_texts)
+                if indexed:
+                    log_container.write(f"📚 Indexed this mission for future Architect prompts ({indexed} snippets)")
+            if repaired_any:
+                mission_cache.put(cache_key, cached_plan, plan_files, metadata={
+                    "provider": provider,
+                    "model": model_name,
+                    "mission": mission[:200]
+                })
+            if validation_report.errors:
+                st.warning(f"⚠️ {len(validation_report.errors)} validation error(s) remain in {len(validation_report.failing_paths)} file(s).")
+                agents.log("Coder", f"⚠️ {len(validation_report.errors)} validation errors remain")
+            else:
+                log_container.write(
+                    f"🔍 Validation passed ({len(validation_report.checked)} checked, "
+                    f"{len(validation_report.unchanged)} unchanged since the last run)"
+                )
+            if validation_report.issues:
+                with st.expander(f"🔍 Validation issues ({len(validation_report.errors)} errors, {len(validation_report.warnings)} warnings)"):
+                    st.dataframe(validation_report.to_dict()["issues"], use_container_width=True)
 
             # Update Coder completion
-            st.session_state.agents[coder_idx]["status"] = "Ready"
-            st.session_state.agents[coder_idx]["current_task"] = f"Completed - {files_created} files created"
-            st.session_state.agents[coder_idx]["tasks_completed"] += 1
-            st.session_state.agents[coder_idx]["history"].append(f"✅ Created {files_created} files for project")
+            agents.set_status("Coder", "Ready", f"Completed - {files_created} files created")
+            agents.complete_task("Coder", f"✅ Created {files_created} files for project")
 
             st.success(f"🚀 Mission Accomplished using {provider} ({model_name})! The code has been manifested in the 'generated_project' directory.")
             st.info(f"📊 Total files created: {files_created}")
+            engine_label = "Mission cache" if cached_mission else execution_engine
+            record_mission_timing(engine_label, time.perf_counter() - mission_start, task_timings)
+            with st.expander(f"⏱️ Task timings ({engine_label})"):
+                st.dataframe(task_timings, use_container_width=True)
+            if cached_mission:
+                st.caption(f"♻️ Served from the mission cache ({mission_cache.hits} hits / {mission_cache.misses} misses this server run)")
             st.balloons()
         else:
             # Update agent status on failure
-            st.session_state.agents[architect_idx]["status"] = "Error"
-            st.session_state.agents[architect_idx]["current_task"] = "Failed to create plan"
-            st.session_state.agents[architect_idx]["history"].append("❌ Failed to generate plan - backend error")
+            agents.set_status("Architect", "Error", "Failed to create plan")
+            agents.log("Architect", "❌ Failed to generate plan - backend error")
             
             st.error(f"The cosmic dance encountered turbulence: {backend_result.get('error', 'Unknown error') if backend_result else 'No response from backend.'}")
 
 # --- Agent Information Display ---
 st.header("🤖 Agent Monitoring & Control Center")
 
-# Initialize session state for agent data
-if 'agents' not in st.session_state:
-    st.session_state.agents = [
-        {
-            "name": "Architect",
-            "role": "Principal Software Architect",
-            "status": "Ready",
-            "last_active": "2024-01-15 10:30:00",
-            "tasks_completed": 5,
-            "current_task": "None",
-            "history": [
-                "✅ Created Flask application architecture",
-                "✅ Reviewed code structure for mission requirements",
-                "✅ Generated detailed implementation plan"
-            ],
-            "configuration": {
-                "temperature": 0.7,
-                "max_tokens": 2000,
-                "verbose": True
-            }
-        },
-        {
-            "name": "Coder",
-            "role": "Senior Software Engineer",
-            "status": "Ready",
-            "last_active": "2024-01-15 10:25:00",
-            "tasks_completed": 3,
-            "current_task": "None",
-            "history": [
-                "✅ Implemented Flask hello world endpoint",
-                "✅ Created proper file structure",
-                "✅ Fixed syntax errors in generated code"
-            ],
-            "configuration": {
-                "temperature": 0.3,
-                "max_tokens": 3000,
-                "verbose": True
-            }
-        }
-    ]
-
 # Create tabs for different monitoring views
 tab1, tab2, tab3 = st.tabs(["📊 Agent Dashboard", "⚙️ Agent Configuration", "📈 Performance Metrics"])
 
+AGENTS_PER_PAGE = 20
+
+def render_agent_card(agent):
+    """Status card of one agent on the dashboard."""
+    with st.container():
+        st.markdown(f"### {STATUS_ICONS.get(agent['status'], '⚪')} {agent['name']}")
+        st.markdown(f"**Role:** {agent['role']}")
+        st.markdown(f"**Status:** {agent['status']}")
+        st.markdown(f"**Current Task:** {agent['current_task']}")
+        st.markdown(f"**Last Active:** {agent['last_active']}")
+        st.markdown(f"**Tasks Completed:** {agent['tasks_completed']}")
+        agent_settings = agent_llm_settings(agent["name"])
+        st.markdown(f"**LLM:** {agent_settings['provider']} / {agent_settings['model']}")
+        
+        # Recent activity
+        with st.expander("📋 Recent Activity"):
+            for entry in agent["history"][-3:]:  # Show last 3 entries
+                st.markdown(f"• {entry}")
+        
+        # Quick actions
+        col_a, col_b = st.columns(2)
+        with col_a:
+            if st.button(f"Reset {agent['name']}", key=f"reset_{agent['name']}"):
+                st.session_state.agents.set_status(agent["name"], "Ready", "None")
+                st.rerun()
+        with col_b:
+            if st.button(f"View Details", key=f"details_{agent['name']}"):
+                st.info(f"Detailed view for {agent['name']} - Configuration: {agent['configuration']}")
+
 with tab1:
+    agents = st.session_state.agents
+    summary = agents.aggregates()
+    filter_col, search_col = st.columns([2, 1])
+    with filter_col:
+        status_filter = st.multiselect(
+            "Filter by status:",
+            AGENT_STATUSES,
+            default=list(AGENT_STATUSES),
+            format_func=lambda status: f"{STATUS_ICONS[status]} {status} ({summary['by_status'][status]})"
+        )
+    with search_col:
+        agent_search = st.text_input("Search name or role:", key="agent_search")
+    matching = agents.filter(status_filter, agent_search)
+    
+    # Only the current page of cards is drawn, however many agents are registered
+    page_count = max(1, -(-len(matching) // AGENTS_PER_PAGE))
+    page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key="agent_page") if page_count > 1 else 1
+    page_names, page_count = paginate(matching, page, AGENTS_PER_PAGE)
+    st.caption(f"Showing {len(page_names)} of {len(matching)} matching agents ({summary['agents']} registered) - page {page} of {page_count}")
+    
     # Display agent status cards
     col1, col2 = st.columns(2)
-    
-    for i, agent in enumerate(st.session_state.agents):
+    for i, name in enumerate(page_names):
         with col1 if i % 2 == 0 else col2:
-            with st.container():
-                # Status indicator
-                status_color = {
-                    "Active": "🟢",
-                    "Ready": "🟡",
-                    "Idle": "⚪",
-                    "Error": "🔴"
-                }.get(agent["status"], "⚪")
-                
-                st.markdown(f"### {status_color} {agent['name']}")
-                st.markdown(f"**Role:** {agent['role']}")
-                st.markdown(f"**Status:** {agent['status']}")
-                st.markdown(f"**Current Task:** {agent['current_task']}")
-                st.markdown(f"**Last Active:** {agent['last_active']}")
-                st.markdown(f"**Tasks Completed:** {agent['tasks_completed']}")
-                
-                # Recent activity
-                with st.expander("📋 Recent Activity"):
-                    for entry in agent["history"][-3:]:  # Show last 3 entries
-                        st.markdown(f"• {entry}")
-                
-                # Quick actions
-                col_a, col_b = st.columns(2)
-                with col_a:
-                    if st.button(f"Reset {agent['name']}", key=f"reset_{agent['name']}"):
-                        st.session_state.agents[i]["status"] = "Ready"
-                        st.session_state.agents[i]["current_task"] = "None"
-                        st.rerun()
-                with col_b:
-                    if st.button(f"View Details", key=f"details_{agent['name']}"):
-                        st.info(f"Detailed view for {agent['name']} - Configuration: {agent['configuration']}")
+            render_agent_card(agents[name])
 
 with tab2:
     st.subheader("🔧 Dynamic Agent Configuration")
     
+    # New user-defined agents
+    with st.expander("➕ Add an Agent"):
+        with st.form("add_agent", clear_on_submit=True):
+            new_agent_name = st.text_input("Name:")
+            new_agent_role = st.text_input("Role:", placeholder="e.g. Security Reviewer")
+            new_agent_instructions = st.text_area("Instructions:", placeholder="What this agent should focus on...")
+            if st.form_submit_button("Add Agent"):
+                try:
+                    st.session_state.agents.add({
+                        "name": new_agent_name,
+                        "role": new_agent_role,
+                        "configuration": {"instructions": new_agent_instructions.strip()}
+                    })
+                    save_definitions(st.session_state.agents)
+                    st.success(f"✅ Added {new_agent_name.strip()}")
+                except ValueError as e:
+                    st.error(str(e))
+    
     # Agent selector
     selected_agent_name = st.selectbox(
         "Select Agent to Configure:",
-        [agent["name"] for agent in st.session_state.agents]
-    )
-    
-    # Find selected agent
-    selected_agent_idx = next(
-        i for i, agent in enumerate(st.session_state.agents) 
-        if agent["name"] == selected_agent_name
+        st.session_state.agents.names()
     )
-    selected_agent = st.session_state.agents[selected_agent_idx]
+    selected_agent = st.session_state.agents[selected_agent_name]
     
     # Configuration options
     col1, col2 = st.columns(2)
@@ -503,66 +1015,153 @@ with tab2:
             key=f"verbose_{selected_agent_name}"
         )
         
+        # Per-agent LLM selection
+        provider_choices = [SIDEBAR_LLM] + PROVIDER_OPTIONS
+        current_provider = selected_agent["configuration"].get("provider") or SIDEBAR_LLM
+        new_provider = st.selectbox(
+            "LLM Provider:",
+            provider_choices,
+            index=provider_choices.index(current_provider),
+            key=f"provider_{selected_agent_name}",
+            help="Run this agent on its own provider, e.g. a small fast model for mechanical coding work."
+        )
+        new_model = st.text_input(
+            "Model Name:",
+            value=selected_agent["configuration"].get("model") or "",
+            placeholder="Provider default" if new_provider != SIDEBAR_LLM else "Sidebar model",
+            key=f"model_{selected_agent_name}"
+        )
+        
         # Custom instructions
         custom_instructions = st.text_area(
             "Custom Instructions:",
+            value=selected_agent["configuration"].get("instructions", ""),
             placeholder="Enter any specific instructions for this agent...",
             key=f"instructions_{selected_agent_name}"
         )
     
     # Update configuration
     if st.button("💾 Update Configuration", key=f"update_{selected_agent_name}"):
-        st.session_state.agents[selected_agent_idx]["role"] = new_role
-        st.session_state.agents[selected_agent_idx]["configuration"].update({
+        selected_agent["role"] = new_role
+        selected_agent["configuration"].update({
             "temperature": new_temperature,
             "max_tokens": new_max_tokens,
-            "verbose": new_verbose
+            "verbose": new_verbose,
+            "provider": None if new_provider == SIDEBAR_LLM else new_provider,
+            "model": new_model.strip() or None,
+            "instructions": custom_instructions.strip()
         })
         
         # Add to history
-        st.session_state.agents[selected_agent_idx]["history"].append(
-            f"🔧 Configuration updated: temp={new_temperature}, tokens={new_max_tokens}"
+        llm_label = new_provider if new_provider == SIDEBAR_LLM else f"{new_provider}/{new_model.strip() or 'default'}"
+        st.session_state.agents.log(
+            selected_agent_name,
+            f"🔧 Configuration updated: temp={new_temperature}, tokens={new_max_tokens}, llm={llm_label}"
         )
+        if not selected_agent["builtin"]:
+            save_definitions(st.session_state.agents)
         
         st.success(f"✅ Configuration updated for {selected_agent_name}")
         st.rerun()
+    
+    if not selected_agent["builtin"] and st.button(f"🗑️ Remove {selected_agent_name}", key=f"remove_{selected_agent_name}"):
+        st.session_state.agents.remove(selected_agent_name)
+        save_definitions(st.session_state.agents)
+        st.rerun()
 
 with tab3:
     st.subheader("📈 Agent Performance Metrics")
     
-    # Create metrics visualization
-    col1, col2, col3 = st.columns(3)
+    window_label = st.selectbox("Time window", list(METRICS_WINDOWS), index=1)
+    window_s = METRICS_WINDOWS[window_label]
+    by_agent = fetch_call_metrics(window_s, "agent")
+    by_provider = fetch_call_metrics(window_s, "provider")
     
-    total_tasks = sum(agent["tasks_completed"] for agent in st.session_state.agents)
-    active_agents = sum(1 for agent in st.session_state.agents if agent["status"] == "Active")
+    if by_agent is None or by_provider is None:
+        st.warning(f"⚠️ Could not load call metrics from {BACKEND_URL}/metrics/calls")
+    elif not by_agent["totals"]["calls"]:
+        st.info(f"No calls recorded in the {window_label.lower()}. Launch a mission to collect measurements.")
+    else:
+        pd = load_dependency("pandas")
+        totals = by_agent["totals"]
+        col1, col2, col3, col4, col5, col6 = st.columns(6)
+        with col1:
+            st.metric("Calls", totals["calls"])
+        with col2:
+            st.metric("Latency p50 / p95", format_seconds(totals["latency_p50_s"]), delta=f"p95 {format_seconds(totals['latency_p95_s'])}", delta_color="off")
+        with col3:
+            st.metric("Time to First Token p50", format_seconds(totals["ttft_p50_s"]))
+        with col4:
+            st.metric("Tokens/sec", f"{totals['tokens_per_s']:.1f}" if totals["tokens_per_s"] is not None else "—")
+        with col5:
+            st.metric("Prompt Cache Hit Rate", format_rate(totals["cache_hit_rate"]))
+        with col6:
+            st.metric("Error Rate", format_rate(totals["error_rate"]))
+        
+        columns = {
+            "calls": "Calls",
+            "latency_p50_s": "Latency p50 (s)",
+            "latency_p95_s": "Latency p95 (s)",
+            "latency_p99_s": "Latency p99 (s)",
+            "ttft_p50_s": "TTFT p50 (s)",
+            "ttft_p95_s": "TTFT p95 (s)",
+            "tokens_per_s": "Tokens/sec",
+            "cache_hit_rate": "Cache Hit Rate",
+            "error_rate": "Error Rate"
+        }
+        for title, data, field in (("🤖 By Agent", by_agent, "agent"), ("🔌 By Provider", by_provider, "provider")):
+            st.markdown(f"**{title}**")
+            table = pd.DataFrame(data["groups"]).fillna({field: "(none)"}).set_index(field)
+            st.dataframe(table[list(columns)].rename(columns=columns), use_container_width=True)
+        
+        series = pd.DataFrame(by_provider["series"])
+        series["time"] = pd.to_datetime(series["ts"], unit="s")
+        st.markdown(f"**⏱️ Latency p95 by Provider** ({by_provider['interval_s'] / 60:.0f}-minute points)")
+        st.line_chart(series.pivot_table(index="time", columns="provider", values="latency_p95_s"))
+        st.markdown("**⚡ Tokens/sec by Provider**")
+        st.line_chart(series.pivot_table(index="time", columns="provider", values="tokens_per_s"))
     
-    with col1:
-        st.metric("Total Tasks Completed", total_tasks)
-    with col2:
-        st.metric("Active Agents", active_agents, delta=f"{len(st.session_state.agents) - active_agents} idle")
-    with col3:
-        avg_tasks = total_tasks / len(st.session_state.agents) if st.session_state.agents else 0
-        st.metric("Avg Tasks per Agent", f"{avg_tasks:.1f}")
+    mission_cache = get_mission_cache()
+    mission_lookups = mission_cache.hits + mission_cache.misses
+    st.caption(
+        f"♻️ Mission cache: {mission_cache.hits} hits / {mission_cache.misses} misses this server run"
+        + (f" ({mission_cache.hits / mission_lookups:.0%} hit rate)" if mission_lookups else "")
+    )
     
     # Agent performance comparison
     st.markdown("**📊 Agent Task Completion**")
-    agent_names = [agent["name"] for agent in st.session_state.agents]
-    task_counts = [agent["tasks_completed"] for agent in st.session_state.agents]
+    agent_names, task_counts = st.session_state.agents.task_counts(limit=25)
+    if any(task_counts):
+        pd = load_dependency("pandas")
+        chart_data = pd.DataFrame({
+            "Agent": agent_names,
+            "Tasks Completed": task_counts
+        })
+        st.bar_chart(chart_data.set_index("Agent"))
+    else:
+        st.caption("No tasks completed yet.")
     
-    # Simple bar chart using Streamlit's built-in chart
-    import pandas as pd
-    chart_data = pd.DataFrame({
-        "Agent": agent_names,
-        "Tasks Completed": task_counts
-    })
-    st.bar_chart(chart_data.set_index("Agent"))
+    # Execution engine comparison
+    st.markdown("**⏱️ Execution Engine Wall Time**")
+    mission_timings = st.session_state.get("mission_timings", [])
+    if mission_timings:
+        pd = load_dependency("pandas")
+        timing_data = pd.DataFrame([
+            {"Engine": run["engine"], "Wall Time (s)": run["wall_time"], "Summed Task Time (s)": run["task_time"]}
+            for run in mission_timings
+        ])
+        st.dataframe(
+            timing_data.groupby("Engine").agg(["mean", "count"]).round(2),
+            use_container_width=True
+        )
+    else:
+        st.caption("Launch a mission to record engine timings.")
     
     # Real-time monitoring toggle
     st.markdown("**🔄 Real-time Monitoring**")
     auto_refresh = st.checkbox("Enable Auto-refresh (5 seconds)")
     
     if auto_refresh:
-        import time
         time.sleep(5)
         st.rerun()
 
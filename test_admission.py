@@ -0,0 +1,167 @@
+"""
+Test Script for Admission Control
+Exercises the priority queue of the backend's AdmissionController with threads
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.admission import AdmissionController, DeadlineExceededError, QueueFullError
+
+
+def wait_until_queued(controller, count, timeout=5.0):
+    """Block until ``count`` requests wait in the controller's queue"""
+    deadline = time.monotonic() + timeout
+    while controller.stats()['queued'] != count:
+        assert time.monotonic() < deadline, f"queue never reached {count} waiters"
+        time.sleep(0.005)
+
+
+def start_waiter(controller, name, priority, results, timeout=5.0):
+    """Queue a request in a thread; it records its name (or error) once it gets a slot"""
+    def run():
+        try:
+            with controller.slot(priority, timeout):
+                results.append(name)
+        except Exception as e:
+            results.append((name, e))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def assert_idle(controller):
+    """Every slot was returned and nothing is left waiting"""
+    stats = controller.stats()
+    assert stats['in_flight'] == 0, stats
+    assert stats['queued'] == 0, stats
+    return stats
+
+
+def test_fifo_within_class():
+    """Requests of one priority class are served in arrival order"""
+    print("=== Testing FIFO Within A Class ===")
+    controller = AdmissionController(max_concurrent=1, max_queue=8)
+    results = []
+    controller.acquire('batch')
+    threads = []
+    for index, name in enumerate(['first', 'second', 'third'], 1):
+        threads.append(start_waiter(controller, name, 'batch', results))
+        wait_until_queued(controller, index)
+    controller.release()
+    for thread in threads:
+        thread.join(5.0)
+
+    assert results == ['first', 'second', 'third'], results
+    stats = assert_idle(controller)
+    assert stats['admitted'] == 4 and stats['completed'] == 4, stats
+    print(f"  - Served in order: {results} ✓")
+    print()
+
+
+def test_priority_displacement():
+    """A higher priority request takes the place of a queued lower priority one"""
+    print("=== Testing Priority Displacement ===")
+    controller = AdmissionController(max_concurrent=1, max_queue=1)
+    results = []
+    controller.acquire('interactive')
+    batch = start_waiter(controller, 'batch', 'batch', results)
+    wait_until_queued(controller, 1)
+    interactive = start_waiter(controller, 'interactive', 'interactive', results)
+    batch.join(5.0)
+
+    # The batch request was rejected before any slot was released
+    assert len(results) == 1 and results[0][0] == 'batch', results
+    error = results[0][1]
+    assert isinstance(error, QueueFullError) and error.status_code == 429, error
+    wait_until_queued(controller, 1)
+    controller.release()
+    interactive.join(5.0)
+
+    assert results[1] == 'interactive', results
+    stats = assert_idle(controller)
+    assert stats['displaced'] == 1, stats
+    print(f"  - Batch request displaced with {error.status_code} ✓")
+    print()
+
+
+def test_queue_full():
+    """A request is rejected with 429 and a retry hint when the queue is full"""
+    print("=== Testing Full Queue ===")
+    controller = AdmissionController(max_concurrent=1, max_queue=1)
+    results = []
+    controller.acquire('interactive')
+    waiter = start_waiter(controller, 'queued', 'interactive', results)
+    wait_until_queued(controller, 1)
+
+    try:
+        controller.acquire('interactive')
+        raise AssertionError("a full queue admitted another request of the same priority")
+    except QueueFullError as e:
+        assert e.status_code == 429 and e.retry_after >= 1, (e.status_code, e.retry_after)
+        print(f"  - Rejected with {e.status_code}, Retry-After {e.retry_after}s ✓")
+    controller.release()
+    waiter.join(5.0)
+
+    assert results == ['queued'], results
+    stats = assert_idle(controller)
+    assert stats['rejected'] == 1, stats
+    print()
+
+
+def test_queued_request_expires():
+    """A queued request whose deadline passes fails with 504 and leaves the queue"""
+    print("=== Testing Queue Expiry ===")
+    controller = AdmissionController(max_concurrent=1, max_queue=8)
+    controller.acquire('interactive')
+
+    try:
+        controller.acquire('interactive', timeout=0.05)
+        raise AssertionError("a request was admitted while every slot was busy")
+    except DeadlineExceededError as e:
+        assert e.status_code == 504, e.status_code
+        print(f"  - Expired with {e.status_code} ✓")
+    assert controller.stats()['queued'] == 0
+    controller.release()
+
+    stats = assert_idle(controller)
+    assert stats['expired'] == 1, stats
+    # The expired waiter must not be handed the released slot
+    controller.acquire('interactive')
+    controller.release()
+    assert_idle(controller)
+    print("  - in_flight and queued back to 0 ✓")
+    print()
+
+
+def main():
+    """Run all tests"""
+    print("Studio Lite Admission Control Test")
+    print("=" * 50)
+
+    try:
+        test_fifo_within_class()
+        test_priority_displacement()
+        test_queue_full()
+        test_queued_request_expires()
+
+        print("=== Test Summary ===")
+        print("✓ FIFO order within a priority class")
+        print("✓ Displacement by higher priority requests")
+        print("✓ 429 when the queue is full")
+        print("✓ 504 when a queued request expires")
+
+    except Exception as e:
+        print(f"✗ Test failed with error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
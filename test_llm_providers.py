@@ -67,6 +67,31 @@ def test_config_manager():
     print()
 
 
+def test_config_snapshots():
+    """Test that config updates publish new snapshots without touching old ones"""
+    print("=== Testing Configuration Snapshots ===")
+    
+    config_manager = LLMConfigManager(config_path='')
+    before = config_manager.snapshot()
+    
+    config_manager.update_config('ollama', {'base_url': 'http://example:11434'})
+    after = config_manager.snapshot()
+    
+    assert after.version == before.version + 1
+    assert after.provider_version('ollama') == before.provider_version('ollama') + 1
+    assert after.provider_version('openai') == before.provider_version('openai')
+    assert before.get('ollama')['base_url'] != 'http://example:11434'
+    assert after.get('ollama')['base_url'] == 'http://example:11434'
+    
+    # Re-applying identical settings must not publish a new version
+    config_manager.update_config('ollama', {'base_url': 'http://example:11434'})
+    assert config_manager.snapshot().version == after.version
+    
+    print(f"  - Snapshot version: {before.version} -> {after.version}")
+    print("  - Only ollama changed: ✓")
+    print()
+
+
 def test_message_structure():
     """Test the message and response structure"""
     print("=== Testing Message Structure ===")
@@ -123,12 +148,14 @@ def main():
     try:
         test_provider_factory()
         test_config_manager()
+        test_config_snapshots()
         test_message_structure()
         test_provider_methods()
         
         print("=== Test Summary ===")
         print("✓ Provider factory working")
         print("✓ Configuration manager working")
+        print("✓ Configuration snapshots working")
         print("✓ Message structures working")
         print("✓ Provider methods accessible")
         print()